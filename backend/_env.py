@@ -0,0 +1,14 @@
+"""
+Shared environment for the local test scripts
+
+Parses .env once per process (the import cache makes repeat imports free) and
+exposes the keys the scripts need, so rotating a key has a single source.
+"""
+
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+PROXY_KEY = os.getenv("PROXY_KEY")
@@ -0,0 +1,32 @@
+"""
+Shared rate limiting for the local test scripts
+
+Detections started per minute are paced by a token bucket, so bursts up to the
+bucket size go out immediately and slow calls never cause extra waiting.
+"""
+
+import asyncio
+
+
+class TokenBucket:
+    """Async token bucket: acquire() waits only when the bucket is empty"""
+    
+    def __init__(self, rate_per_minute: int, capacity: int):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = None
+        self.lock = asyncio.Lock()
+    
+    async def acquire(self):
+        async with self.lock:
+            loop = asyncio.get_running_loop()
+            now = loop.time()
+            if self.updated is not None:
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self.tokens = 1.0
+                self.updated = loop.time()
+            self.tokens -= 1
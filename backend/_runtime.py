@@ -0,0 +1,53 @@
+"""
+Shared async runtime for the local test scripts
+
+One event loop runner and one pooled HTTP client per process, so every script
+gets the same loop and connection settings from a single place.
+"""
+
+import asyncio
+import httpx
+from openai import AsyncOpenAI
+from _env import OPENAI_API_KEY
+
+# uvloop where available (not on Windows); falls back to the stock event loop
+try:
+    import uvloop
+    run_event_loop = uvloop.run
+except ImportError:
+    run_event_loop = asyncio.run
+
+# Created lazily inside the running event loop and closed when the run ends
+_client = None
+_openai_client = None
+
+
+async def get_client() -> httpx.AsyncClient:
+    """Return the shared HTTP client, creating it on first use"""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            http2=True,
+            timeout=60.0,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=50)
+        )
+    return _client
+
+
+async def get_openai_client() -> AsyncOpenAI:
+    """Return the shared OpenAI client, pooled on the shared HTTP client"""
+    global _openai_client
+    if _openai_client is None:
+        _openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY, http_client=await get_client())
+    return _openai_client
+
+
+async def close_client():
+    """Close the shared clients and their connection pool"""
+    global _client, _openai_client
+    if _openai_client is not None:
+        await _openai_client.close()
+        _openai_client = None
+    if _client is not None:
+        await _client.aclose()
+        _client = None
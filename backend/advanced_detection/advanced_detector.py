@@ -10,6 +10,7 @@ Usage:
 """
 
 from typing import Dict, List, Optional, Any
+import asyncio
 import numpy as np
 from .semantic_entropy import SemanticEntropyDetector
 from .llm_judge import LLMJudge
@@ -17,6 +18,7 @@ from .claim_nli import ClaimNLIDetector
 from .self_consistency import SelfConsistencyDetector
 from .meta_classifier import MetaClassifier
 from .detection_config import DetectionConfig
+from hallucination_detector import HallucinationDetector, calculate_overall_risk_score
 
 
 def convert_numpy_types(obj: Any) -> Any:
@@ -67,7 +69,9 @@ class AdvancedHallucinationDetector:
         answer: str,
         context: Optional[List[str]] = None,
         openai_key: str = None,
-        model: str = "gpt-4o-mini"
+        model: str = "gpt-4o-mini",
+        semantic_entropy: Optional[Dict] = None,
+        precomputed_embeddings: Optional[Dict[str, np.ndarray]] = None
     ) -> Dict:
         """
         Main detection method - runs adaptive pipeline.
@@ -78,6 +82,10 @@ class AdvancedHallucinationDetector:
             context: RAG context chunks (if available)
             openai_key: OpenAI API key
             model: Model used to generate answer
+            semantic_entropy: Precomputed fast-gate result; it only depends on the
+                question, so callers can sample it while the answer is generated
+            precomputed_embeddings: Text -> sentence embedding, e.g. from one batched
+                encode over many answers; the answer's entry skips re-embedding it
             
         Returns:
             Complete detection results with risk score and recommendation
@@ -89,16 +97,34 @@ class AdvancedHallucinationDetector:
             "mode": self.config.mode
         }
         
+        # STEP 0: Local Precheck (no API calls)
+        if self.config.use_local_precheck:
+            # CPU-bound regex work: keep it off the event loop
+            precheck = await asyncio.to_thread(self._local_precheck, question, answer, model)
+            if precheck["risk_score"] >= self.config.local_precheck_threshold:
+                print("⚡ Local precheck flagged high risk, skipping API checks")
+                results["local_precheck"] = precheck
+                return self._finalize(results, {
+                    "risk_probability": precheck["risk_score"],
+                    "risk_level": precheck["risk_level"],
+                    "explanation": "Local precheck: " + "; ".join(
+                        flag["description"] for flag in precheck["flags"]
+                    ),
+                    "action": self.meta_classifier._get_action(precheck["risk_score"])
+                })
+        
         # STEP 1: Fast Gate (Semantic Entropy)
-        if self.config.use_semantic_entropy:
-            print("🔍 Running semantic entropy check...")
-            entropy_result = await self.entropy_detector.detect(
-                question=question,
-                openai_key=openai_key,
-                model=model,
-                k=self.config.entropy_samples
-            )
-            results["semantic_entropy"] = entropy_result
+        async def run_entropy() -> Dict:
+            if semantic_entropy is not None:
+                entropy_result = semantic_entropy
+            else:
+                print("🔍 Running semantic entropy check...")
+                entropy_result = await self.entropy_detector.detect(
+                    question=question,
+                    openai_key=openai_key,
+                    model=model,
+                    k=self.config.entropy_samples
+                )
             
             # Adaptive sampling
             if self.config.adaptive_sampling:
@@ -115,58 +141,115 @@ class AdvancedHallucinationDetector:
                         model=model,
                         k=self.config.entropy_samples + additional
                     )
-                    results["semantic_entropy"] = entropy_result
+            return entropy_result
         
         # STEP 2: Judge Layer (conditional)
-        run_judge = (
-            self.config.use_judge and
-            (self.config.mode == "thorough" or 
-             (self.config.mode == "balanced" and results.get("semantic_entropy", {}).get("suspicious", False)))
-        )
-        
-        if run_judge:
+        async def run_judge() -> Dict:
             print("⚖️  Running LLM-as-judge...")
-            judge_result = await self.judge.judge(
+            return await self.judge.judge(
                 answer=answer,
                 context=context,
                 openai_key=openai_key
             )
-            results["judge"] = judge_result
         
         # STEP 3: Claim-Level NLI (if context available)
-        if self.config.use_claim_nli and context:
+        async def run_claims() -> Dict:
             print("📋 Running claim-level verification...")
-            claims_result = await self.claim_detector.detect(
+            return await self.claim_detector.detect(
                 answer=answer,
                 context=context,
                 openai_key=openai_key if self.config.use_llm_claim_extraction else None
             )
-            results["claims"] = claims_result
         
         # STEP 4: Self-Consistency (fallback or if low support)
-        run_self_check = (
-            self.config.use_self_consistency and
-            (not context or 
-             results.get("claims", {}).get("support_rate", 1.0) < 0.6 or
-             self.config.mode == "thorough")
-        )
-        
-        if run_self_check:
+        async def run_self_check() -> Dict:
             print("🔄 Running self-consistency check...")
-            self_check_result = await self.self_check_detector.detect(
+            return await self.self_check_detector.detect(
                 question=question,
                 answer=answer,
                 openai_key=openai_key,
                 model=model,
-                num_variations=self.config.self_check_variations
+                num_variations=self.config.self_check_variations,
+                answer_embedding=(precomputed_embeddings or {}).get(answer)
+            )
+        
+        # The checks are independent OpenAI round-trips, so each one starts as
+        # soon as the signal it is gated on is known: the judge waits for the
+        # entropy gate only in balanced mode, and self-consistency waits for the
+        # claim support rate only when there is context to check claims against
+        errors = {}
+        
+        async def settle(name: str, task: asyncio.Task):
+            # A failed check is left out of the fusion instead of failing detect()
+            try:
+                results[name] = await task
+            except Exception as e:
+                print(f"⚠️  {name} check failed: {e}")
+                errors[name] = str(e)
+        
+        tasks = []
+        
+        def start(coro) -> asyncio.Task:
+            task = asyncio.create_task(coro)
+            tasks.append(task)
+            return task
+        
+        thorough = self.config.mode == "thorough"
+        try:
+            entropy_task = start(run_entropy()) if self.config.use_semantic_entropy else None
+            claims_task = start(run_claims()) if self.config.use_claim_nli and context else None
+            judge_task = start(run_judge()) if self.config.use_judge and thorough else None
+            self_check_task = (
+                start(run_self_check())
+                if self.config.use_self_consistency and (not context or thorough) else None
             )
-            results["self_check"] = self_check_result
+            
+            if entropy_task:
+                await settle("semantic_entropy", entropy_task)
+            
+            if (judge_task is None and self.config.use_judge and self.config.mode == "balanced"
+                    and results.get("semantic_entropy", {}).get("suspicious", False)):
+                judge_task = start(run_judge())
+            if judge_task:
+                await settle("judge", judge_task)
+            
+            if claims_task:
+                await settle("claims", claims_task)
+            
+            if (self_check_task is None and self.config.use_self_consistency
+                    and results.get("claims", {}).get("support_rate", 1.0) < 0.6):
+                self_check_task = start(run_self_check())
+            if self_check_task:
+                await settle("self_check", self_check_task)
+        finally:
+            # If detect() itself is cancelled (e.g. the caller's wait_for timeout),
+            # stop the checks still in flight instead of letting them keep making
+            # paid API calls, and retrieve the outcome of the ones already done
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()
+        
+        if errors:
+            results["errors"] = errors
         
         # STEP 5: Meta-Classification (Risk Fusion)
         print("🎯 Computing final risk score...")
         features = self.meta_classifier.extract_features(results)
         final_result = self.meta_classifier.predict(features)
         
+        return self._finalize(results, final_result)
+    
+    def _local_precheck(self, question: str, answer: str, model: str) -> Dict:
+        """Score the answer with the rule-based detector (pure CPU, no API calls)."""
+        # A fresh instance per call: analyze() keeps per-call state on self
+        flags = HallucinationDetector().analyze(question, answer, model)
+        risk_score, risk_level = calculate_overall_risk_score(flags)
+        return {"risk_score": risk_score, "risk_level": risk_level, "flags": flags}
+    
+    def _finalize(self, results: Dict, final_result: Dict) -> Dict:
+        """Attach the final assessment and summary to the results."""
         results["final_assessment"] = final_result
         results["risk_probability"] = final_result["risk_probability"]
         results["risk_level"] = final_result["risk_level"]
@@ -192,6 +275,11 @@ class AdvancedHallucinationDetector:
         }
         
         # Track which checks ran
+        if "local_precheck" in results:
+            summary["checks_run"].append("local_precheck")
+            for flag in results["local_precheck"]["flags"]:
+                summary["issues_found"].append(flag["description"])
+        
         if "semantic_entropy" in results:
             summary["checks_run"].append("semantic_entropy")
             if results["semantic_entropy"].get("suspicious"):
@@ -242,8 +330,6 @@ class AdvancedHallucinationDetector:
         Returns:
             List of detection results
         """
-        import asyncio
-        
         tasks = []
         for question, answer, context in zip(questions, answers, contexts):
             task = self.detect(question, answer, context, openai_key, model)
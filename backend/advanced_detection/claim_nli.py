@@ -20,6 +20,17 @@ try:
 except LookupError:
     nltk.download('punkt', quiet=True)
 
+# Sentences containing these are framing, not claims
+META_PHRASES = (
+    "let me", "i will", "here is", "here are",
+    "in summary", "in conclusion", "to summarize"
+)
+
+# A factual claim names an entity or contains a number (a date is either a
+# capitalized month name or a run of digits, so it is covered by these two)
+ENTITY_PATTERN = re.compile(r'[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*')
+NUMBER_PATTERN = re.compile(r'\d+')
+
 
 class ClaimNLIDetector:
     """
@@ -80,11 +91,14 @@ class ClaimNLIDetector:
                 "num_claims": 0
             }
         
+        # Tokenize the context once and reuse it for every claim
+        context_index = self._index_context(context)
+        
         # Check each claim
         claim_results = []
         for claim in claims:
             # Find best evidence
-            evidence = self._find_evidence(claim, context)
+            evidence = self._find_evidence(claim, context_index)
             
             # Run NLI
             verdict = self._check_entailment(claim, evidence)
@@ -140,19 +154,12 @@ class ClaimNLIDetector:
             return False
         
         # Skip meta-statements
-        meta_phrases = [
-            "let me", "i will", "here is", "here are",
-            "in summary", "in conclusion", "to summarize"
-        ]
-        if any(phrase in sentence.lower() for phrase in meta_phrases):
+        sentence_lower = sentence.lower()
+        if any(phrase in sentence_lower for phrase in META_PHRASES):
             return False
         
         # Must contain at least one of: named entity, number, or date
-        has_entity = bool(re.search(r'[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*', sentence))
-        has_number = bool(re.search(r'\d+', sentence))
-        has_date = bool(re.search(r'\b\d{4}\b|\b(?:January|February|March|April|May|June|July|August|September|October|November|December)\b', sentence))
-        
-        return has_entity or has_number or has_date
+        return bool(ENTITY_PATTERN.search(sentence) or NUMBER_PATTERN.search(sentence))
     
     async def _extract_claims_llm(self, answer: str, openai_key: str) -> List[str]:
         """
@@ -206,13 +213,20 @@ Respond with a JSON list of claims:
             print(f"Warning: LLM claim extraction failed: {e}")
             return self._extract_claims_rule_based(answer)
     
-    def _find_evidence(self, claim: str, context: List[str]) -> str:
+    def _index_context(self, context: List[str]) -> Dict:
+        """Pre-split context chunks into word sets (built once per detect call)."""
+        return {
+            "chunks": [(set(chunk.lower().split()), chunk) for chunk in context or []],
+            "text": " ".join(context or [])
+        }
+    
+    def _find_evidence(self, claim: str, context_index: Dict) -> str:
         """
         Find the most relevant evidence for a claim from context.
         
         Uses simple keyword overlap (can be upgraded to semantic search).
         """
-        if not context:
+        if not context_index["chunks"]:
             return ""
         
         # Simple keyword matching - combine ALL relevant chunks
@@ -220,8 +234,7 @@ Respond with a JSON list of claims:
         
         relevant_chunks = []
         
-        for chunk in context:
-            chunk_words = set(chunk.lower().split())
+        for chunk_words, chunk in context_index["chunks"]:
             overlap = len(claim_words & chunk_words)
             
             # Include chunks with any overlap
@@ -230,7 +243,7 @@ Respond with a JSON list of claims:
         
         if not relevant_chunks:
             # No overlap found, return all context
-            return " ".join(context)
+            return context_index["text"]
         
         # Sort by relevance and combine top chunks
         relevant_chunks.sort(reverse=True, key=lambda x: x[0])
@@ -5,10 +5,11 @@ Defines detection modes and parameters for the advanced detector.
 """
 
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Optional
 
 
-@dataclass
+@dataclass(frozen=True)
 class DetectionConfig:
     """
     Configuration for advanced hallucination detection.
@@ -17,6 +18,8 @@ class DetectionConfig:
     - fast: Semantic entropy only (~200ms, $0.001/request)
     - balanced: Entropy + conditional judge + claims (~1-2s, $0.005/request)
     - thorough: All checks enabled (~3-5s, $0.015/request)
+    
+    Instances are frozen so the mode presets can be memoized and shared.
     """
     
     # Mode selection
@@ -39,10 +42,16 @@ class DetectionConfig:
     use_self_consistency: bool = True
     self_check_variations: int = 2  # Number of question variations
     
+    # Local precheck: rule-based scan of the answer (no API calls); answers that
+    # score at or above the threshold are reported as high risk without OpenAI
+    use_local_precheck: bool = False
+    local_precheck_threshold: float = 0.6
+    
     # Meta-classifier settings
     meta_model_path: Optional[str] = None  # Path to trained model (None = use heuristic)
     
     @classmethod
+    @lru_cache(maxsize=None)
     def fast(cls):
         """Fast mode: Semantic entropy only."""
         return cls(
@@ -56,6 +65,7 @@ class DetectionConfig:
         )
     
     @classmethod
+    @lru_cache(maxsize=None)
     def balanced(cls):
         """Balanced mode: Adaptive checks based on signals."""
         return cls(
@@ -69,6 +79,7 @@ class DetectionConfig:
         )
     
     @classmethod
+    @lru_cache(maxsize=None)
     def thorough(cls):
         """Thorough mode: All checks enabled."""
         return cls(
@@ -8,11 +8,32 @@ Based on: Ensemble methods and calibrated classifiers
 """
 
 import numpy as np
+from bisect import bisect_right
 from typing import Dict, List, Optional
 from sklearn.linear_model import LogisticRegression
 from sklearn.calibration import CalibratedClassifierCV
 import pickle
 import os
+import re
+
+
+# Heuristic weights used until a model is trained (literature and intuition);
+# negative weights mean a high value lowers risk
+HEURISTIC_WEIGHTS = {
+    "semantic_entropy": 0.25,
+    "judge_score": -0.30,
+    "claim_support_rate": -0.20,
+    "has_contradiction": 0.15,
+    "self_similarity": -0.10,
+    "num_contradictions": 0.10
+}
+
+# Upper bounds (exclusive) of each risk level; probabilities >= 0.8 are critical
+RISK_THRESHOLDS = (0.2, 0.4, 0.6, 0.8)
+RISK_LEVELS = ("safe", "low", "medium", "high", "critical")
+
+# Bracketed reference numbers like [1, 2] or parenthesized years like (2021)
+CITATION_PATTERN = re.compile(r'\[[\d,\s]+\]|\(\d{4}\)')
 
 
 class MetaClassifier:
@@ -44,6 +65,9 @@ class MetaClassifier:
             "answer_length",
             "citation_density"
         ]
+        self.heuristic_weights = np.array(
+            [HEURISTIC_WEIGHTS.get(name, 0.0) for name in self.feature_names]
+        )
         
         if model_path and os.path.exists(model_path):
             self.load_model(model_path)
@@ -90,8 +114,7 @@ class MetaClassifier:
         features["answer_length"] = min(len(answer.split()) / 500.0, 1.0)
         
         # Citation density (count citations / words)
-        import re
-        citations = len(re.findall(r'\[[\d,\s]+\]|\(\d{4}\)', answer))
+        citations = len(CITATION_PATTERN.findall(answer))
         features["citation_density"] = min(citations / max(len(answer.split()), 1), 1.0)
         
         return features
@@ -106,16 +129,7 @@ class MetaClassifier:
         Returns:
             Dict with risk_probability, risk_level, and explanation
         """
-        # Convert to array
-        X = np.array([[features.get(name, 0.5) for name in self.feature_names]])
-        
-        if hasattr(self, 'use_heuristic') and self.use_heuristic:
-            # Use heuristic scoring until model is trained
-            risk_prob = self._heuristic_score(features)
-        else:
-            # Use trained model
-            risk_prob = self.calibrator.predict_proba(X)[0][1]
-        
+        risk_prob = float(self.predict_proba(self._to_matrix([features]))[0])
         risk_level = self._get_risk_level(risk_prob)
         explanation = self._explain_prediction(features, risk_prob)
         
@@ -127,40 +141,32 @@ class MetaClassifier:
             "action": self._get_action(risk_prob)
         }
     
-    def _heuristic_score(self, features: Dict[str, float]) -> float:
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Risk probability for each row of a (n_samples, n_features) matrix."""
+        if getattr(self, 'use_heuristic', False):
+            # Use heuristic scoring until model is trained
+            return self._heuristic_score(X)
+        # Use trained model
+        return self.calibrator.predict_proba(X)[:, 1]
+    
+    def _to_matrix(self, features_list: List[Dict[str, float]]) -> np.ndarray:
+        """Stack feature dicts into a matrix, defaulting missing features to 0.5."""
+        return np.array(
+            [[features.get(name, 0.5) for name in self.feature_names] for features in features_list],
+            dtype=float
+        )
+    
+    def _heuristic_score(self, X: np.ndarray) -> np.ndarray:
         """
         Heuristic scoring when no trained model available.
         
-        Weighted combination based on literature and intuition.
+        Weighted combination (HEURISTIC_WEIGHTS) around a 0.5 baseline, clipped to [0, 1].
         """
-        weights = {
-            "semantic_entropy": 0.25,
-            "judge_score": -0.30,  # Negative: high score = low risk
-            "claim_support_rate": -0.20,  # Negative: high support = low risk
-            "has_contradiction": 0.15,
-            "self_similarity": -0.10,  # Negative: high similarity = low risk
-            "num_contradictions": 0.10
-        }
-        
-        score = 0.5  # Baseline
-        for feature, weight in weights.items():
-            score += weight * features.get(feature, 0.5)
-        
-        # Clip to [0, 1]
-        return max(0.0, min(1.0, score))
+        return np.clip(0.5 + X @ self.heuristic_weights, 0.0, 1.0)
     
     def _get_risk_level(self, prob: float) -> str:
         """Convert probability to risk level."""
-        if prob < 0.2:
-            return "safe"
-        elif prob < 0.4:
-            return "low"
-        elif prob < 0.6:
-            return "medium"
-        elif prob < 0.8:
-            return "high"
-        else:
-            return "critical"
+        return RISK_LEVELS[bisect_right(RISK_THRESHOLDS, prob)]
     
     def _get_action(self, prob: float) -> str:
         """Recommend action based on risk."""
@@ -37,7 +37,8 @@ class SelfConsistencyDetector:
         answer: str,
         openai_key: str,
         model: str = "gpt-4o-mini",
-        num_variations: int = 2
+        num_variations: int = 2,
+        answer_embedding: Optional[np.ndarray] = None
     ) -> Dict:
         """
         Detect hallucinations via self-consistency checks.
@@ -48,6 +49,7 @@ class SelfConsistencyDetector:
             openai_key: OpenAI API key
             model: Model to use
             num_variations: Number of question variations to try
+            answer_embedding: Precomputed embedding of answer (skips encoding it)
             
         Returns:
             Dict with similarity scores, contradictions, and verdict
@@ -58,7 +60,7 @@ class SelfConsistencyDetector:
         )
         
         # 2. Compare semantic similarity
-        similarity_scores = self._compute_similarities(answer, alt_answers)
+        similarity_scores = self._compute_similarities(answer, alt_answers, answer_embedding)
         avg_similarity = np.mean(similarity_scores)
         
         # 3. Extract key claims from original answer
@@ -144,20 +146,28 @@ class SelfConsistencyDetector:
         result = response.json()
         return result["choices"][0]["message"]["content"]
     
-    def _compute_similarities(self, answer: str, alt_answers: List[str]) -> List[float]:
+    def _compute_similarities(
+        self,
+        answer: str,
+        alt_answers: List[str],
+        answer_embedding: Optional[np.ndarray] = None
+    ) -> List[float]:
         """Compute semantic similarity between original and alternatives."""
         if not alt_answers:
             return [1.0]
         
-        # Embed all answers
-        all_answers = [answer] + alt_answers
-        embeddings = self.embedding_model.encode(all_answers)
+        # Embed all answers (the original only if it wasn't precomputed)
+        if answer_embedding is None:
+            embeddings = self.embedding_model.encode([answer] + alt_answers)
+            original_emb, alt_embeddings = embeddings[0], embeddings[1:]
+        else:
+            original_emb = answer_embedding
+            alt_embeddings = self.embedding_model.encode(alt_answers)
         
         # Compute cosine similarity
-        original_emb = embeddings[0]
         similarities = []
         
-        for alt_emb in embeddings[1:]:
+        for alt_emb in alt_embeddings:
             similarity = np.dot(original_emb, alt_emb) / (
                 np.linalg.norm(original_emb) * np.linalg.norm(alt_emb)
             )
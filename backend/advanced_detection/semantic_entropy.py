@@ -12,7 +12,6 @@ from typing import List, Dict, Optional
 from sentence_transformers import SentenceTransformer
 from sklearn.cluster import HDBSCAN
 from collections import Counter
-import asyncio
 import httpx
 
 
@@ -100,24 +99,13 @@ class SemanticEntropyDetector:
         k: int,
         temperature: float
     ) -> List[str]:
-        """Generate k samples from OpenAI API."""
-        samples = []
-        
+        """Generate k samples from OpenAI API in one batched request (n=k)."""
         async with httpx.AsyncClient(timeout=60.0) as client:
-            tasks = []
-            for _ in range(k):
-                task = self._call_openai(client, question, openai_key, model, temperature)
-                tasks.append(task)
-            
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            for result in results:
-                if isinstance(result, Exception):
-                    print(f"Warning: Sample generation failed: {result}")
-                    continue
-                samples.append(result)
-        
-        return samples
+            try:
+                return await self._call_openai(client, question, openai_key, model, temperature, n=k)
+            except Exception as e:
+                print(f"Warning: Sample generation failed: {e}")
+                return []
     
     async def _call_openai(
         self,
@@ -125,9 +113,10 @@ class SemanticEntropyDetector:
         question: str,
         api_key: str,
         model: str,
-        temperature: float
-    ) -> str:
-        """Single OpenAI API call."""
+        temperature: float,
+        n: int = 1
+    ) -> List[str]:
+        """Single OpenAI API call returning n sampled completions."""
         try:
             response = await client.post(
                 "https://api.openai.com/v1/chat/completions",
@@ -139,7 +128,8 @@ class SemanticEntropyDetector:
                     "model": model,
                     "messages": [{"role": "user", "content": question}],
                     "temperature": temperature,
-                    "max_tokens": 500
+                    "max_tokens": 500,
+                    "n": n
                 }
             )
             
@@ -149,7 +139,7 @@ class SemanticEntropyDetector:
             if "choices" not in result:
                 raise ValueError(f"Invalid API response: {result}")
             
-            return result["choices"][0]["message"]["content"]
+            return [choice["message"]["content"] for choice in result["choices"]]
             
         except Exception as e:
             raise Exception(f"OpenAI API call failed: {str(e)}")
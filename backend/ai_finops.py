@@ -4,8 +4,9 @@ Complete visibility into AI model chains, agents, and workflows
 Track every token, every dollar, every decision
 """
 
+import asyncio
 from dataclasses import dataclass, asdict
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Set
 from datetime import datetime, timedelta
 from collections import defaultdict
 import json
@@ -20,6 +21,102 @@ supabase = create_client(
     os.getenv("SUPABASE_KEY")
 )
 
+class AgentCallBatcher:
+    """
+    Coalesces agent_calls inserts into multi-row writes
+    
+    Rows are flushed every `max_delay` seconds or as soon as `max_batch`
+    rows are queued, whichever comes first. A single multi-row insert is
+    much cheaper than one PostgREST round-trip per call.
+    """
+    
+    def __init__(self, max_batch: int = 50, max_delay: float = 0.1):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Set[asyncio.Future] = set()
+    
+    def submit(self, row: Dict) -> asyncio.Future:
+        """Queue a row for insertion; the future resolves once it is written, or raises if it never is"""
+        loop = asyncio.get_running_loop()
+        
+        # Start (or restart, e.g. after asyncio.run() created a new loop) the flusher
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._pending = set()
+            self._worker = loop.create_task(self._run())
+        
+        future = loop.create_future()
+        self._pending.add(future)
+        future.add_done_callback(self._forget)
+        self._queue.put_nowait((row, future))
+        return future
+    
+    def _forget(self, future: asyncio.Future):
+        # Failures are already logged by _write; mark them retrieved so callers
+        # that never await the future don't get a second "never retrieved" report
+        self._pending.discard(future)
+        if not future.cancelled():
+            future.exception()
+    
+    async def flush(self):
+        """Wait until every queued row has been written"""
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_delay
+            
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            await self._write(batch)
+    
+    async def _write(self, batch: List, attempts: int = 3):
+        """Insert a batch, retrying transient failures and falling back to one row at a time"""
+        rows = [row for row, _ in batch]
+        error = None
+        
+        for attempt in range(attempts):
+            try:
+                # Upsert on call_id so a retry after an ambiguous failure can't duplicate rows
+                result = await asyncio.to_thread(
+                    supabase.table("agent_calls").upsert(rows, on_conflict="call_id", ignore_duplicates=True).execute
+                )
+            except Exception as e:
+                error = e
+                if attempt < attempts - 1:
+                    await asyncio.sleep(0.5 * 2 ** attempt)
+                continue
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(result.data)
+            return
+        
+        if len(batch) > 1:
+            print(f"Error saving {len(rows)} agent calls ({error}), retrying them one by one")
+            for item in batch:
+                await self._write([item], attempts=2)
+            return
+        
+        print(f"Error saving agent call {rows[0].get('call_id')}: {error}")
+        _, future = batch[0]
+        if not future.done():
+            future.set_exception(error)
+
 
 @dataclass
 class AgentCall:
@@ -80,6 +177,7 @@ class AIFinOpsTracker:
     def __init__(self):
         self.active_sessions: Dict[str, UserSession] = {}
         self.active_workflows: Dict[str, WorkflowExecution] = {}
+        self._call_batcher = AgentCallBatcher()
     
     # ============================================
     # TRACKING: Record Usage
@@ -145,8 +243,8 @@ class AIFinOpsTracker:
             workflow.model_breakdown[model]["tokens"] += (input_tokens + output_tokens)
             workflow.model_breakdown[model]["cost"] += cost
         
-        # Save to database
-        await self._save_agent_call(agent_call, workflow_id)
+        # Queue the insert so callers don't wait on the DB round-trip
+        self._save_agent_call(agent_call, workflow_id)
         
         return agent_call
     
@@ -208,6 +306,9 @@ class AIFinOpsTracker:
             session.total_tokens += workflow.total_tokens
             session.total_calls += workflow.total_calls
         
+        # Make sure the workflow's calls are persisted before the workflow row
+        await self.flush()
+        
         # Save to database
         await self._save_workflow(workflow)
         
@@ -250,6 +351,10 @@ class AIFinOpsTracker:
         
         return session
     
+    async def flush(self):
+        """Wait for all queued agent call writes to finish"""
+        await self._call_batcher.flush()
+    
     # ============================================
     # ANALYTICS: Get Insights
     # ============================================
@@ -643,24 +748,21 @@ class AIFinOpsTracker:
         # Default pricing if model not found
         return ((input_tokens + output_tokens) / 1_000_000) * 1.0
     
-    async def _save_agent_call(self, call: AgentCall, workflow_id: str):
-        """Save agent call to database"""
-        try:
-            supabase.table("agent_calls").insert({
-                "call_id": call.call_id,
-                "workflow_id": workflow_id,
-                "agent_name": call.agent_name,
-                "model": call.model,
-                "input_tokens": call.input_tokens,
-                "output_tokens": call.output_tokens,
-                "latency_ms": call.latency_ms,
-                "cost_usd": call.cost_usd,
-                "parent_call_id": call.parent_call_id,
-                "metadata": call.metadata,
-                "created_at": datetime.utcnow().isoformat()
-            }).execute()
-        except Exception as e:
-            print(f"Error saving agent call: {e}")
+    def _save_agent_call(self, call: AgentCall, workflow_id: str) -> asyncio.Future:
+        """Queue agent call for a batched database insert"""
+        return self._call_batcher.submit({
+            "call_id": call.call_id,
+            "workflow_id": workflow_id,
+            "agent_name": call.agent_name,
+            "model": call.model,
+            "input_tokens": call.input_tokens,
+            "output_tokens": call.output_tokens,
+            "latency_ms": call.latency_ms,
+            "cost_usd": call.cost_usd,
+            "parent_call_id": call.parent_call_id,
+            "metadata": call.metadata,
+            "created_at": datetime.utcnow().isoformat()
+        })
     
     async def _save_workflow(self, workflow: WorkflowExecution):
         """Save workflow to database"""
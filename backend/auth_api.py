@@ -10,6 +10,7 @@ import os
 from dotenv import load_dotenv
 from supabase import create_client, Client
 from auth import get_current_user
+from database import invalidate_user_key_cache
 
 load_dotenv()
 
@@ -241,6 +242,7 @@ async def update_profile(
     
     if update_data:
         supabase.table("users").update(update_data).eq("id", user_id).execute()
+        invalidate_user_key_cache(user_id)
     
     return {
         "success": True,
@@ -0,0 +1,39 @@
+"""
+Build identifier reported in the X-Build-SHA response header
+
+Resolved once per server start: the gunicorn master (on_starting) or the
+multi-worker `python main.py` parent stores it in the environment, and every
+worker process inherits that value instead of computing its own. Under
+RELOAD=true nothing is stored, so each reloaded process computes a fresh one.
+"""
+
+import os
+import subprocess
+import time
+
+BUILD_ID_ENV = "LLM_PROXY_BUILD_ID"
+
+
+def resolve_build_id(persist: bool = False) -> str:
+    """Commit of the running code plus the server start time; persist=True shares it with child processes"""
+    build_id = os.getenv(BUILD_ID_ENV)
+    if build_id:
+        return build_id
+    
+    sha = os.getenv("BUILD_SHA")
+    if not sha:
+        try:
+            sha = subprocess.run(
+                ["git", "rev-parse", "HEAD"],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                capture_output=True,
+                text=True,
+                timeout=2
+            ).stdout.strip()
+        except Exception:
+            sha = ""
+    # The start time makes a restart always change it, even with uncommitted edits
+    build_id = f"{sha[:12] or 'unknown'}.{int(time.time()):x}"
+    if persist:
+        os.environ[BUILD_ID_ENV] = build_id
+    return build_id
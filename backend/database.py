@@ -1,48 +1,82 @@
 # backend/database.py
 from supabase import create_client, Client
+from supabase.lib.client_options import SyncClientOptions
 import os
+import time
+import uuid
+import asyncio
+import asyncpg
+import httpx
+import orjson
 from dotenv import load_dotenv
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple, Any
 from cryptography.fernet import Fernet
 import base64
 import hashlib
 
 load_dotenv()
 
+# One keep-alive pool for all PostgREST/storage calls made through this client
+supabase_http = httpx.Client(
+    limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+    timeout=10.0,
+    http2=True,
+    follow_redirects=True
+)
+
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+
 # Initialize Supabase client
 supabase: Client = create_client(
-    os.getenv("SUPABASE_URL"),
-    os.getenv("SUPABASE_KEY")
+    SUPABASE_URL,
+    SUPABASE_KEY,
+    options=SyncClientOptions(httpx_client=supabase_http)
+)
+
+# Async PostgREST client for hot-path writes that shouldn't block the event
+# loop (the supabase SDK client above is synchronous)
+supabase_rest = httpx.AsyncClient(
+    base_url=f"{SUPABASE_URL}/rest/v1",
+    headers={"apikey": SUPABASE_KEY, "Authorization": f"Bearer {SUPABASE_KEY}"},
+    limits=httpx.Limits(max_keepalive_connections=50, max_connections=200),
+    timeout=10.0,
+    http2=True
 )
 
 # Encryption key for API keys (in production, use a secure key management service)
 ENCRYPTION_KEY = os.getenv("ENCRYPTION_KEY", Fernet.generate_key().decode())
 cipher_suite = Fernet(ENCRYPTION_KEY.encode() if isinstance(ENCRYPTION_KEY, str) else ENCRYPTION_KEY)
 
-async def log_request(run_id: str, request_body: dict, response_body: dict, latency_ms: int):
-    """Log request to Supabase"""
-    
+# (input, output) USD per token, i.e. the per-1k price already divided by 1000
+MODEL_PRICING: Dict[str, Tuple[float, float]] = {
+    "gpt-4o": (0.0025 / 1000, 0.01 / 1000),
+    "gpt-4o-mini": (0.00015 / 1000, 0.0006 / 1000),
+    "gpt-4-turbo": (0.01 / 1000, 0.03 / 1000),
+    "gpt-3.5-turbo": (0.0005 / 1000, 0.0015 / 1000),
+}
+DEFAULT_MODEL_PRICING = (0.001 / 1000, 0.002 / 1000)
+
+
+def calculate_cost_usd(model: Optional[str], prompt_tokens: int, completion_tokens: int) -> float:
+    """Cost of one completion from the MODEL_PRICING table"""
+    price_in, price_out = MODEL_PRICING.get(model, DEFAULT_MODEL_PRICING)
+    return prompt_tokens * price_in + completion_tokens * price_out
+
+
+def build_log_rows(run_id: str, request_body: dict, response_body: dict, latency_ms: int) -> Tuple[Dict, Dict]:
+    """Build the runs and payloads rows for one proxied request"""
     model = request_body.get("model")
     usage = response_body.get("usage", {})
     
-    # Calculate cost
-    cost_per_1k = {
-        "gpt-4o": {"input": 0.0025, "output": 0.01},
-        "gpt-4o-mini": {"input": 0.00015, "output": 0.0006},
-    }
-    model_costs = cost_per_1k.get(model, {"input": 0.001, "output": 0.002})
-    cost_usd = (
-        (usage.get("prompt_tokens", 0) / 1000 * model_costs["input"]) +
-        (usage.get("completion_tokens", 0) / 1000 * model_costs["output"])
-    )
+    cost_usd = calculate_cost_usd(model, usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
     
     # Extract response text
     response_text = ""
     if "choices" in response_body and len(response_body["choices"]) > 0:
         response_text = response_body["choices"][0]["message"]["content"]
     
-    # Insert run
-    supabase.table("runs").insert({
+    run_row = {
         "id": run_id,
         "model": model,
         "prompt_tokens": usage.get("prompt_tokens", 0),
@@ -50,16 +84,28 @@ async def log_request(run_id: str, request_body: dict, response_body: dict, late
         "total_tokens": usage.get("total_tokens", 0),
         "cost_usd": cost_usd,
         "latency_ms": latency_ms
-    }).execute()
-    
-    # Insert payload
-    supabase.table("payloads").insert({
+    }
+    payload_row = {
         "run_id": run_id,
         "messages": request_body.get("messages"),
         "response": response_text,
         "full_request": request_body,
         "full_response": response_body
-    }).execute()
+    }
+    return run_row, payload_row
+
+
+def insert_log_rows(run_rows: List[Dict], payload_rows: List[Dict]):
+    """Bulk-insert runs and their payloads, one PostgREST request per table"""
+    # Runs are upserted so a retry after the payload insert failed doesn't hit duplicate ids
+    supabase.table("runs").upsert(run_rows, ignore_duplicates=True).execute()
+    supabase.table("payloads").insert(payload_rows).execute()
+
+
+async def log_request(run_id: str, request_body: dict, response_body: dict, latency_ms: int):
+    """Log request to Supabase"""
+    run_row, payload_row = build_log_rows(run_id, request_body, response_body, latency_ms)
+    insert_log_rows([run_row], [payload_row])
 
 async def get_runs(limit: int = 50, offset: int = 0, model: str = None):
     """Get list of runs"""
@@ -93,6 +139,62 @@ def decrypt_api_key(encrypted_key: str) -> str:
     return cipher_suite.decrypt(encrypted_key.encode()).decode()
 
 
+# Hot per-request lookups are cached in memory for a short TTL so repeat
+# proxy calls skip the Supabase round-trips. Only hits are cached. The cache
+# is per process: invalidation only reaches the worker that handled the change,
+# so with several workers a revoked key can keep working for up to the TTL.
+KEY_CACHE_TTL_SECONDS = 60
+
+_proxy_key_cache: Dict[str, Tuple[float, Dict]] = {}
+_openai_key_cache: Dict[str, Tuple[float, str]] = {}
+
+
+def _cache_get(cache: Dict[str, Tuple[float, Any]], key: str) -> Optional[Any]:
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    if entry[0] < time.monotonic():
+        cache.pop(key, None)
+        return None
+    return entry[1]
+
+
+def _cache_set(cache: Dict[str, Tuple[float, Any]], key: str, value: Any, ttl: float = KEY_CACHE_TTL_SECONDS):
+    cache[key] = (time.monotonic() + ttl, value)
+
+
+def invalidate_user_key_cache(user_id: str):
+    """Drop cached key lookups for a user after their keys change"""
+    _openai_key_cache.pop(user_id, None)
+    for proxy_key, (_, data) in list(_proxy_key_cache.items()):
+        if data.get("user_id") == user_id:
+            _proxy_key_cache.pop(proxy_key, None)
+
+
+# Read endpoints polled by the dashboard (runs, stats, dashboard) cache their
+# serialized body + ETag per user; any write for that user drops the entries.
+RESPONSE_CACHE_TTL_SECONDS = 5
+
+_response_cache: Dict[str, Tuple[float, Tuple[bytes, str]]] = {}
+
+
+def get_cached_response(user_id: str, key: str) -> Optional[Tuple[bytes, str]]:
+    """Return a cached (body, etag) pair for a user's read endpoint"""
+    return _cache_get(_response_cache, f"{user_id}:{key}")
+
+
+def set_cached_response(user_id: str, key: str, body: bytes, etag: str):
+    """Cache a serialized response body and its ETag"""
+    _cache_set(_response_cache, f"{user_id}:{key}", (body, etag), RESPONSE_CACHE_TTL_SECONDS)
+
+
+def invalidate_user_response_cache(user_id: str):
+    """Drop cached read responses for a user after new runs or flag changes"""
+    prefix = f"{user_id}:"
+    for key in [k for k in _response_cache if k.startswith(prefix)]:
+        _response_cache.pop(key, None)
+
+
 def hash_proxy_key(key: str) -> str:
     """Hash a proxy key for lookup"""
     return hashlib.sha256(key.encode()).hexdigest()
@@ -124,36 +226,162 @@ async def create_proxy_key(user_id: str, key_name: str) -> Dict:
         "api_key": proxy_key
     }).execute()
     
+    invalidate_user_key_cache(user_id)
+    
     return {"proxy_key": proxy_key, **result.data[0]} if result.data else None
 
 
+async def revoke_proxy_key(key_id: str, user_id: str):
+    """Deactivate one of a user's proxy keys"""
+    result = supabase.table("proxy_keys").update({"is_active": False}).eq("id", key_id).eq("user_id", user_id).execute()
+    
+    invalidate_user_key_cache(user_id)
+    
+    return result.data
+
+
 async def get_user_by_proxy_key(proxy_key: str) -> Optional[Dict]:
-    """Get user information from proxy key"""
+    """Get user information from proxy key (cached for KEY_CACHE_TTL_SECONDS)"""
+    cached = _cache_get(_proxy_key_cache, proxy_key)
+    if cached is not None:
+        return cached
+    
     # Find the proxy key
     key_result = supabase.table("proxy_keys").select("*, users(*)").eq("api_key", proxy_key).eq("is_active", True).single().execute()
     
     if not key_result.data:
         return None
     
-    # Update last_used_at
+    # Update last_used_at (at most once per cache TTL)
     supabase.table("proxy_keys").update({"last_used_at": "now()"}).eq("api_key", proxy_key).execute()
     
+    _cache_set(_proxy_key_cache, proxy_key, key_result.data)
     return key_result.data
 
 
 async def get_user_openai_key(user_id: str) -> Optional[str]:
-    """Get decrypted OpenAI API key for a user"""
+    """Get decrypted OpenAI API key for a user (kept in memory only, never logged)"""
+    cached = _cache_get(_openai_key_cache, user_id)
+    if cached is not None:
+        return cached
+    
     result = supabase.table("users").select("encrypted_api_key").eq("id", user_id).single().execute()
     
     if result.data:
-        return decrypt_api_key(result.data["encrypted_api_key"])
+        openai_key = decrypt_api_key(result.data["encrypted_api_key"])
+        _cache_set(_openai_key_cache, user_id, openai_key)
+        return openai_key
     return None
 
 
+# ============================================
+# Direct Postgres Pool (write path)
+# ============================================
+
+# Optional direct connection (e.g. the Supavisor pooler URL); without it writes go through PostgREST
+SUPABASE_DB_URL = os.getenv("SUPABASE_DB_URL")
+
+# Pool size is per worker process: total connections = workers x PG_POOL_MAX_SIZE
+PG_POOL_MIN_SIZE = int(os.getenv("PG_POOL_MIN_SIZE", "2"))
+PG_POOL_MAX_SIZE = int(os.getenv("PG_POOL_MAX_SIZE", "10"))
+
+_pg_pool: Optional[asyncpg.Pool] = None
+
+_RUN_COLUMNS = (
+    "id", "user_id", "proxy_key_id", "model", "prompt_tokens", "completion_tokens",
+    "total_tokens", "cost_usd", "latency_ms", "status"
+)
+_PAYLOAD_COLUMNS = ("run_id", "messages", "response", "full_request", "full_response")
+_FLAG_COLUMNS = ("run_id", "flag_type", "severity", "confidence_score", "description", "details")
+
+
+def _insert_sql(table: str, columns: Tuple[str, ...]) -> str:
+    placeholders = ", ".join(f"${i}" for i in range(1, len(columns) + 1))
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+
+
+_INSERT_RUN_SQL = _insert_sql("runs", _RUN_COLUMNS)
+_INSERT_PAYLOAD_SQL = _insert_sql("payloads", _PAYLOAD_COLUMNS)
+_INSERT_FLAG_SQL = _insert_sql("flags", _FLAG_COLUMNS)
+
+# Buffered writes: flush every 200ms or 500 runs, whichever comes first
+WRITE_BATCH_INTERVAL_SECONDS = 0.2
+WRITE_BATCH_MAX_ROWS = 500
+WRITE_QUEUE_MAX_SIZE = 10_000
+WRITE_QUEUE_PUT_TIMEOUT_SECONDS = 0.05
+
+# A failed batch is retried with exponential backoff, then split into single runs
+# so one bad row (or user) doesn't take the rest of the batch down with it
+WRITE_BATCH_ATTEMPTS = 3
+WRITE_RETRY_BASE_SECONDS = 0.5
+
+_write_queue: Optional[asyncio.Queue] = None
+_writer_task: Optional[asyncio.Task] = None
+
+
+async def _init_pg_connection(conn):
+    """Accept plain Python objects for JSONB and float for NUMERIC parameters"""
+    await conn.set_type_codec(
+        "jsonb",
+        encoder=lambda value: orjson.dumps(value).decode(),
+        decoder=orjson.loads,
+        schema="pg_catalog"
+    )
+    await conn.set_type_codec("numeric", encoder=str, decoder=float, schema="pg_catalog", format="text")
+
+
+async def init_pg_pool() -> Optional[asyncpg.Pool]:
+    """Create the shared asyncpg pool if SUPABASE_DB_URL is set"""
+    global _pg_pool
+    if SUPABASE_DB_URL and _pg_pool is None:
+        _pg_pool = await asyncpg.create_pool(
+            SUPABASE_DB_URL,
+            min_size=PG_POOL_MIN_SIZE,
+            max_size=PG_POOL_MAX_SIZE,
+            max_inactive_connection_lifetime=300,
+            statement_cache_size=0,  # Supavisor transaction mode can't keep prepared statements
+            init=_init_pg_connection
+        )
+    return _pg_pool
+
+
+async def close_pg_pool():
+    """Close the shared asyncpg pool"""
+    global _pg_pool
+    if _pg_pool is not None:
+        await _pg_pool.close()
+        _pg_pool = None
+
+
 # ============================================
 # Enhanced Logging with User Context
 # ============================================
 
+# Run ids are UUIDv7 (48-bit ms timestamp + random bits) so runs.id inserts land at
+# the right edge of the primary-key btree. Random bytes come from a pre-read
+# os.urandom buffer so most ids cost no syscall.
+_UUID7_RANDOM_BYTES = 10
+_UUID7_BUFFER_IDS = 256
+
+_uuid7_buffer = b""
+_uuid7_offset = 0
+
+
+def uuid7() -> uuid.UUID:
+    """Generate a time-ordered UUIDv7"""
+    global _uuid7_buffer, _uuid7_offset
+    if _uuid7_offset >= len(_uuid7_buffer):
+        _uuid7_buffer = os.urandom(_UUID7_RANDOM_BYTES * _UUID7_BUFFER_IDS)
+        _uuid7_offset = 0
+    rand = int.from_bytes(_uuid7_buffer[_uuid7_offset:_uuid7_offset + _UUID7_RANDOM_BYTES], "big")
+    _uuid7_offset += _UUID7_RANDOM_BYTES
+    
+    value = ((time.time_ns() // 1_000_000) & 0xFFFF_FFFF_FFFF) << 80 | rand
+    value = (value & ~(0xF << 76)) | (0x7 << 76)  # version 7
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)  # RFC 4122 variant
+    return uuid.UUID(int=value)
+
+
 async def log_request_with_flags(
     run_id: str,
     user_id: str,
@@ -168,18 +396,7 @@ async def log_request_with_flags(
     model = request_body.get("model")
     usage = response_body.get("usage", {})
     
-    # Calculate cost
-    cost_per_1k = {
-        "gpt-4o": {"input": 0.0025, "output": 0.01},
-        "gpt-4o-mini": {"input": 0.00015, "output": 0.0006},
-        "gpt-4-turbo": {"input": 0.01, "output": 0.03},
-        "gpt-3.5-turbo": {"input": 0.0005, "output": 0.0015},
-    }
-    model_costs = cost_per_1k.get(model, {"input": 0.001, "output": 0.002})
-    cost_usd = (
-        (usage.get("prompt_tokens", 0) / 1000 * model_costs["input"]) +
-        (usage.get("completion_tokens", 0) / 1000 * model_costs["output"])
-    )
+    cost_usd = calculate_cost_usd(model, usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
     
     # Extract response text
     response_text = ""
@@ -193,40 +410,158 @@ async def log_request_with_flags(
         if high_severity_flags:
             status = "flagged"
     
-    # Insert run
-    supabase.table("runs").insert({
-        "id": run_id,
-        "user_id": user_id,
-        "proxy_key_id": proxy_key_id,
-        "model": model,
-        "prompt_tokens": usage.get("prompt_tokens", 0),
-        "completion_tokens": usage.get("completion_tokens", 0),
-        "total_tokens": usage.get("total_tokens", 0),
-        "cost_usd": cost_usd,
-        "latency_ms": latency_ms,
-        "status": status
-    }).execute()
-    
-    # Insert payload
-    supabase.table("payloads").insert({
-        "run_id": run_id,
-        "messages": request_body.get("messages"),
-        "response": response_text,
-        "full_request": request_body,
-        "full_response": response_body
-    }).execute()
-    
-    # Insert flags if any
-    if flags:
-        for flag in flags:
-            supabase.table("flags").insert({
-                "run_id": run_id,
-                "flag_type": flag["flag_type"],
-                "severity": flag["severity"],
-                "confidence_score": flag["confidence_score"],
-                "description": flag["description"],
-                "details": flag.get("details", {})
-            }).execute()
+    run_row = (
+        run_id,
+        user_id,
+        proxy_key_id,
+        model,
+        usage.get("prompt_tokens", 0),
+        usage.get("completion_tokens", 0),
+        usage.get("total_tokens", 0),
+        cost_usd,
+        latency_ms,
+        status
+    )
+    payload_row = (
+        run_id,
+        request_body.get("messages"),
+        response_text,
+        request_body,
+        response_body
+    )
+    flag_rows = [
+        (
+            run_id,
+            flag["flag_type"],
+            flag["severity"],
+            flag["confidence_score"],
+            flag["description"],
+            flag.get("details", {})
+        )
+        for flag in flags or []
+    ]
+    
+    item = (run_row, payload_row, flag_rows)
+    if _write_queue is None:
+        await _write_batch([item])
+        return
+    
+    try:
+        _write_queue.put_nowait(item)
+    except asyncio.QueueFull:
+        try:
+            await asyncio.wait_for(_write_queue.put(item), timeout=WRITE_QUEUE_PUT_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            print(f"⚠️ Write queue full ({_write_queue.qsize()} pending), writing run {run_id} inline")
+            await _write_batch([item])
+
+
+async def _write_batch(items: List[Tuple[tuple, tuple, List[tuple]]]):
+    """Write a batch of (run, payload, flags) rows in one round-trip per table"""
+    run_rows = [run_row for run_row, _, _ in items]
+    payload_rows = [payload_row for _, payload_row, _ in items]
+    flag_rows = [flag_row for _, _, rows in items for flag_row in rows]
+    
+    if _pg_pool is not None:
+        await _write_runs_pg(run_rows, payload_rows, flag_rows)
+    else:
+        await asyncio.to_thread(_write_runs_rest, run_rows, payload_rows, flag_rows)
+    
+    for user_id in {run_row[1] for run_row in run_rows}:
+        invalidate_user_response_cache(user_id)
+
+
+async def _write_runs_pg(run_rows: List[tuple], payload_rows: List[tuple], flag_rows: List[tuple]):
+    """Write runs, payloads and flags in one pooled transaction"""
+    async with _pg_pool.acquire() as conn, conn.transaction():
+        await conn.executemany(_INSERT_RUN_SQL, run_rows)
+        await conn.executemany(_INSERT_PAYLOAD_SQL, payload_rows)
+        if flag_rows:
+            await conn.executemany(_INSERT_FLAG_SQL, flag_rows)
+
+
+def _write_runs_rest(run_rows: List[tuple], payload_rows: List[tuple], flag_rows: List[tuple]):
+    """Fallback write through PostgREST when no SUPABASE_DB_URL is configured"""
+    # Not atomic: runs are upserted so a retry after a later table failed doesn't
+    # trip over the runs that already landed
+    supabase.table("runs").upsert(
+        [dict(zip(_RUN_COLUMNS, row)) for row in run_rows],
+        ignore_duplicates=True
+    ).execute()
+    supabase.table("payloads").insert([dict(zip(_PAYLOAD_COLUMNS, row)) for row in payload_rows]).execute()
+    if flag_rows:
+        supabase.table("flags").insert([dict(zip(_FLAG_COLUMNS, row)) for row in flag_rows]).execute()
+
+
+async def _write_batch_with_retry(items: List[Tuple[tuple, tuple, List[tuple]]], attempts: int = WRITE_BATCH_ATTEMPTS):
+    """Write a batch, retrying transient failures and isolating runs the batch can't take"""
+    error = None
+    for attempt in range(attempts):
+        try:
+            await _write_batch(items)
+            return
+        except (asyncpg.IntegrityConstraintViolationError, asyncpg.DataError) as e:
+            # Rejected data fails the same way on a retry
+            error = e
+            break
+        except Exception as e:
+            error = e
+        if attempt < attempts - 1:
+            await asyncio.sleep(WRITE_RETRY_BASE_SECONDS * 2 ** attempt)
+    
+    if len(items) == 1:
+        print(f"❌ Run {items[0][0][0]} dropped: {error}")
+        return
+    
+    print(f"⚠️ Batch of {len(items)} runs failed ({error}), writing them one by one")
+    for item in items:
+        await _write_batch_with_retry([item], attempts=2)
+
+
+async def _writer_loop(queue: asyncio.Queue):
+    """Drain queued runs and flush them every WRITE_BATCH_INTERVAL_SECONDS or WRITE_BATCH_MAX_ROWS"""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await queue.get()]
+        deadline = loop.time() + WRITE_BATCH_INTERVAL_SECONDS
+        while len(batch) < WRITE_BATCH_MAX_ROWS:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        
+        try:
+            await _write_batch_with_retry(batch)
+        finally:
+            for _ in batch:
+                queue.task_done()
+
+
+def start_run_writer() -> asyncio.Queue:
+    """Start the background writer; log_request_with_flags enqueues from then on"""
+    global _write_queue, _writer_task
+    if _write_queue is None:
+        _write_queue = asyncio.Queue(maxsize=WRITE_QUEUE_MAX_SIZE)
+        _writer_task = asyncio.create_task(_writer_loop(_write_queue))
+    return _write_queue
+
+
+async def stop_run_writer():
+    """Flush everything still queued, then stop the background writer"""
+    global _write_queue, _writer_task
+    if _write_queue is None:
+        return
+    await _write_queue.join()
+    _writer_task.cancel()
+    try:
+        await _writer_task
+    except asyncio.CancelledError:
+        pass
+    _write_queue = None
+    _writer_task = None
 
 
 # ============================================
@@ -244,7 +579,9 @@ async def get_flags_for_user(user_id: str, is_resolved: bool = None, severity: s
         query = query.eq("severity", severity)
     
     query = query.order("created_at", desc=True).limit(limit)
-    result = query.execute()
+    
+    # Run the blocking client call in a thread so callers can gather() it
+    result = await asyncio.to_thread(query.execute)
     
     return result.data
 
@@ -257,6 +594,8 @@ async def resolve_flag(flag_id: str, user_id: str):
         "resolved_at": "now()"
     }).eq("id", flag_id).execute()
     
+    invalidate_user_response_cache(user_id)
+    
     return result.data
 
 
@@ -445,6 +445,9 @@ async def main():
     # print("\n7. API Integration")
     # await example_api_integration()
     
+    # Call records are persisted in the background; wait for them before exiting
+    await tracker.flush()
+    
     print("\n" + "=" * 60)
     print("✅ All examples completed!")
     print("=" * 60)
@@ -0,0 +1,29 @@
+"""
+Gunicorn settings for production: one Uvicorn worker (own event loop, httpx
+pool and Postgres pool) per process, WEB_CONCURRENCY processes (default 2).
+Set BIND=unix:/tmp/llmproxy.sock to serve behind nginx/Caddy on a UNIX socket.
+
+Each worker is a separate process, so keep the count small and scale it with
+care: every worker opens its own Postgres pool (PG_POOL_MAX_SIZE connections)
+and loads its own detector models, and in-memory state is per worker - the
+proxy/OpenAI key caches (a revoked key keeps working on other workers for up
+to KEY_CACHE_TTL_SECONDS) and the advanced detection mode set through
+POST /v1/detection/config (applies to the worker that served the request).
+"""
+
+import os
+from build_info import resolve_build_id
+
+bind = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+# A fixed default rather than 2n+1: os.cpu_count() in a container is the host's core count
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+# UvicornWorker runs uvloop + httptools ("auto") since both are in requirements.txt
+worker_class = "uvicorn.workers.UvicornWorker"
+keepalive = 75
+timeout = 120
+graceful_timeout = 30
+
+
+def on_starting(server):
+    """Resolve the build id once in the master so every worker reports the same one"""
+    resolve_build_id(persist=True)
@@ -7,6 +7,23 @@ import re
 from typing import List, Dict, Tuple
 from datetime import datetime
 import json
+import numpy as np
+
+
+# Severity weights used when aggregating flags into a risk score
+SEVERITY_WEIGHTS = {
+    "low": 0.2,
+    "medium": 0.5,
+    "high": 0.8,
+    "critical": 1.0
+}
+
+# Above this many flags the score is computed with NumPy instead of a Python loop
+VECTORIZE_MIN_FLAGS = 256
+
+# A sentence runs until a terminator followed by whitespace or end of text,
+# so "3.14" or "e.g.x" don't split mid-sentence
+SENTENCE_PATTERN = re.compile(r'(?:[^.!?]|[.!?](?=\S))+')
 
 
 class HallucinationDetector:
@@ -32,12 +49,12 @@ class HallucinationDetector:
         "my knowledge cutoff", "i cannot access", "i'm not able to verify"
     ]
     
-    # Fabrication patterns (specific dates, numbers without context)
-    FABRICATION_PATTERNS = [
+    # Fabrication patterns (specific dates, numbers without context), compiled once
+    FABRICATION_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in (
         r'\b(?:on|in)\s+(?:january|february|march|april|may|june|july|august|september|october|november|december)\s+\d{1,2},?\s+\d{4}\b',
         r'\b\d{1,3}(?:,\d{3})+\s+(?:people|users|customers|dollars|deaths|cases)\b',
         r'\bexactly\s+\d+(?:\.\d+)?\s*%\b'
-    ]
+    )]
     
     def __init__(self):
         self.flags = []
@@ -126,7 +143,7 @@ class HallucinationDetector:
         fabrications = []
         
         for pattern in self.FABRICATION_PATTERNS:
-            matches = re.findall(pattern, response, re.IGNORECASE)
+            matches = pattern.findall(response)
             if matches:
                 fabrications.extend(matches)
         
@@ -164,11 +181,17 @@ class HallucinationDetector:
     
     def _check_repetition(self, response: str):
         """Detect repetitive content"""
-        sentences = [s.strip() for s in response.split('.') if s.strip()]
+        sentence_count = 0
+        unique_sentences = set()
+        
+        for match in SENTENCE_PATTERN.finditer(response):
+            sentence = match.group().strip()
+            if sentence:
+                sentence_count += 1
+                unique_sentences.add(sentence)
         
-        if len(sentences) > 5:
-            unique_sentences = set(sentences)
-            repetition_ratio = 1 - (len(unique_sentences) / len(sentences))
+        if sentence_count > 5:
+            repetition_ratio = 1 - (len(unique_sentences) / sentence_count)
             
             if repetition_ratio > 0.3:
                 self._add_flag(
@@ -231,18 +254,25 @@ def calculate_overall_risk_score(flags: List[Dict]) -> Tuple[float, str]:
     if not flags:
         return 0.0, "safe"
     
-    severity_weights = {
-        "low": 0.2,
-        "medium": 0.5,
-        "high": 0.8,
-        "critical": 1.0
-    }
-    
-    total_score = 0.0
-    for flag in flags:
-        severity_weight = severity_weights.get(flag["severity"], 0.5)
-        confidence = flag["confidence_score"]
-        total_score += severity_weight * confidence
+    if len(flags) >= VECTORIZE_MIN_FLAGS:
+        # Large batches (e.g. aggregating a whole workflow): vectorized dot product
+        weights = np.fromiter(
+            (SEVERITY_WEIGHTS.get(f["severity"], 0.5) for f in flags),
+            dtype=np.float64,
+            count=len(flags)
+        )
+        confidences = np.fromiter(
+            (f["confidence_score"] for f in flags),
+            dtype=np.float64,
+            count=len(flags)
+        )
+        total_score = float(np.dot(weights, confidences))
+    else:
+        total_score = 0.0
+        for flag in flags:
+            severity_weight = SEVERITY_WEIGHTS.get(flag["severity"], 0.5)
+            confidence = flag["confidence_score"]
+            total_score += severity_weight * confidence
     
     # Normalize by number of flags (but cap at 1.0)
     risk_score = min(total_score / max(len(flags), 1), 1.0)
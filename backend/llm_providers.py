@@ -5,10 +5,11 @@ Supports OpenAI, Anthropic Claude, Google Gemini, DeepSeek, and more
 
 import httpx
 import os
-from typing import Dict, Any, Optional
-from openai import OpenAI
+from functools import lru_cache
+from typing import Dict, Any, Optional, AsyncIterator
+from openai import OpenAI, AsyncOpenAI
 try:
-    from anthropic import Anthropic
+    from anthropic import Anthropic, AsyncAnthropic
     ANTHROPIC_AVAILABLE = True
 except ImportError:
     ANTHROPIC_AVAILABLE = False
@@ -20,6 +21,19 @@ except ImportError:
     GOOGLE_AVAILABLE = False
 
 
+@lru_cache(maxsize=32)
+def _get_gemini_model(model: str, api_key: str):
+    """Reuse GenerativeModel instances per (model, key) instead of rebuilding each call"""
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(model)
+
+
+@lru_cache(maxsize=32)
+def _get_async_openai_client(api_key: str, base_url: Optional[str] = None) -> AsyncOpenAI:
+    """Reuse one pooled AsyncOpenAI client per (key, base URL) instead of opening one per stream"""
+    return AsyncOpenAI(api_key=api_key, base_url=base_url)
+
+
 class LLMProvider:
     """Base class for LLM providers"""
     
@@ -67,6 +81,95 @@ class LLMProvider:
         else:
             raise ValueError(f"Unsupported provider: {provider}")
     
+    @staticmethod
+    async def call_llm_stream(
+        provider: str,
+        model: str,
+        messages: list,
+        api_key: str,
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """
+        Streaming variant of call_llm
+        Yields content chunks as they are generated so callers can forward
+        the first tokens without waiting for the full completion
+        """
+        
+        if provider == 'openai':
+            stream = LLMProvider._call_openai_stream(model, messages, api_key, **kwargs)
+        elif provider == 'anthropic':
+            stream = LLMProvider._call_anthropic_stream(model, messages, api_key, **kwargs)
+        elif provider == 'deepseek':
+            stream = LLMProvider._call_openai_stream(
+                model, messages, api_key, base_url="https://api.deepseek.com/v1", **kwargs
+            )
+        elif provider == 'openrouter':
+            stream = LLMProvider._call_openai_stream(
+                model, messages, api_key, base_url="https://openrouter.ai/api/v1", **kwargs
+            )
+        elif provider == 'google':
+            # Gemini SDK call is blocking; fall back to a single chunk
+            response = await LLMProvider._call_google(model, messages, api_key, **kwargs)
+            yield response['content']
+            return
+        else:
+            raise ValueError(f"Unsupported provider: {provider}")
+        
+        async for chunk in stream:
+            yield chunk
+    
+    @staticmethod
+    async def _call_openai_stream(
+        model: str,
+        messages: list,
+        api_key: str,
+        base_url: Optional[str] = None,
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """Stream from OpenAI (or any OpenAI-compatible API)"""
+        client = _get_async_openai_client(api_key, base_url)
+        
+        stream = await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            stream=True,
+            **kwargs
+        )
+        
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    
+    @staticmethod
+    async def _call_anthropic_stream(model: str, messages: list, api_key: str, **kwargs) -> AsyncIterator[str]:
+        """Stream from Anthropic Claude API"""
+        if not ANTHROPIC_AVAILABLE:
+            raise ImportError("Anthropic library not installed. Run: pip install anthropic")
+        
+        client = AsyncAnthropic(api_key=api_key)
+        
+        # Convert OpenAI format to Anthropic format
+        system_message = None
+        anthropic_messages = []
+        
+        for msg in messages:
+            if msg['role'] == 'system':
+                system_message = msg['content']
+            else:
+                anthropic_messages.append({
+                    'role': msg['role'],
+                    'content': msg['content']
+                })
+        
+        async with client.messages.stream(
+            model=model,
+            max_tokens=kwargs.get('max_tokens', 1024),
+            system=system_message if system_message else None,
+            messages=anthropic_messages
+        ) as stream:
+            async for text in stream.text_stream:
+                yield text
+    
     @staticmethod
     async def _call_openai(model: str, messages: list, api_key: str, **kwargs) -> Dict[str, Any]:
         """Call OpenAI API"""
@@ -137,11 +240,10 @@ class LLMProvider:
         if not GOOGLE_AVAILABLE:
             raise ImportError("Google Generative AI library not installed. Run: pip install google-generativeai")
         
-        genai.configure(api_key=api_key)
-        model_instance = genai.GenerativeModel(model)
+        model_instance = _get_gemini_model(model, api_key)
         
         # Convert messages to Gemini format
-        prompt = "\n".join([f"{msg['role']}: {msg['content']}" for msg in messages])
+        prompt = "\n".join(f"{msg['role']}: {msg['content']}" for msg in messages)
         
         response = model_instance.generate_content(prompt)
         
@@ -5,26 +5,48 @@ Multi-tenant proxy with hallucination detection and safety monitoring
 
 import os
 import time
-import uuid
+import asyncio
+import hashlib
 import httpx
-from fastapi import FastAPI, Request, HTTPException, Header, Depends
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from uuid import UUID
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, HTTPException, Header, Depends, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from starlette.datastructures import MutableHeaders
 from dotenv import load_dotenv
-from typing import Optional
+from typing import Dict, Optional, Tuple
 from datetime import datetime, timedelta
 
 from database import (
     supabase,
+    supabase_http,
+    supabase_rest,
     create_user,
     create_proxy_key,
+    revoke_proxy_key,
     get_user_by_proxy_key,
     get_user_openai_key,
     log_request_with_flags,
+    calculate_cost_usd,
+    uuid7,
+    init_pg_pool,
+    close_pg_pool,
+    start_run_writer,
+    stop_run_writer,
     get_flags_for_user,
     resolve_flag,
-    get_flag_stats
+    get_flag_stats,
+    get_cached_response,
+    set_cached_response,
+    RESPONSE_CACHE_TTL_SECONDS
 )
 from hallucination_detector import HallucinationDetector, calculate_overall_risk_score
+from build_info import resolve_build_id
 from auth import get_current_user, verify_api_key
 from auth_api import router as auth_router
 
@@ -77,7 +99,7 @@ except ImportError:
 
 # Import Waitlist API (public endpoint)
 try:
-    from waitlist_api import router as waitlist_router
+    from waitlist_api import router as waitlist_router, start_waitlist_writer, stop_waitlist_writer
     WAITLIST_ENABLED = True
 except ImportError:
     WAITLIST_ENABLED = False
@@ -85,12 +107,90 @@ except ImportError:
 
 load_dotenv()
 
+
+def _warm_up_detectors():
+    """Run each detector once on a throwaway input"""
+    try:
+        HallucinationDetector().analyze("warmup", "This is a warmup response. It is probably fine.", "warmup")
+        if app.state.advanced_detector:
+            app.state.advanced_detector.entropy_detector.embedding_model.encode(["warmup"])
+    except Exception as e:
+        print(f"⚠️  Detector warmup failed: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create shared resources on startup and release them on shutdown"""
+    # One pooled client for all OpenAI calls so TCP+TLS sessions are reused
+    app.state.openai_client = httpx.AsyncClient(
+        base_url="https://api.openai.com",
+        timeout=httpx.Timeout(60.0),
+        limits=httpx.Limits(
+            max_keepalive_connections=20,
+            max_connections=100,
+            keepalive_expiry=30.0
+        ),
+        http2=True
+    )
+    # Direct Postgres pool for the run/flag write path (skipped without SUPABASE_DB_URL)
+    await init_pg_pool()
+    # Run/flag writes are buffered and flushed in batches by a background task
+    app.state.write_queue = start_run_writer()
+    # Waitlist signups are coalesced into bulk inserts the same way
+    if WAITLIST_ENABLED:
+        start_waitlist_writer()
+    # Pay regex and embedding-model cold starts now rather than on the first chat call
+    await asyncio.get_running_loop().run_in_executor(app.state.cpu_pool, _warm_up_detectors)
+    
+    yield
+    
+    await stop_run_writer()
+    if FINOPS_ENABLED and finops_tracker:
+        await finops_tracker.flush()
+    if WAITLIST_ENABLED:
+        await stop_waitlist_writer()
+    await app.state.openai_client.aclose()
+    await close_pg_pool()
+    supabase_http.close()
+    await supabase_rest.aclose()
+    app.state.cpu_pool.shutdown(wait=False, cancel_futures=True)
+
+
 app = FastAPI(
     title="LLM Observability Platform",
     description="AI Safety Monitoring with Hallucination Detection + Enterprise Features",
-    version="2.1.0"
+    version="2.1.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
+# Resolved once per server start and inherited by every worker (see build_info.py);
+# clients compare it to skip work already verified against this exact server build
+# (see test_platform.py)
+BUILD_ID = resolve_build_id()
+
+
+class BuildHeaderMiddleware:
+    """Pure ASGI middleware adding X-Build-SHA to every HTTP response"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        async def send_with_build(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("X-Build-SHA", BUILD_ID)
+            await send(message)
+        
+        await self.app(scope, receive, send_with_build)
+
+
+app.add_middleware(BuildHeaderMiddleware)
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -100,9 +200,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress JSON bodies (runs, dashboard, chat results); SSE streams are excluded by default
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # Initialize detectors
 detector = HallucinationDetector()  # Keep for backward compatibility
-advanced_detector = AdvancedHallucinationDetector(DetectionConfig.balanced()) if ADVANCED_DETECTION_ENABLED else None  # New advanced detector (optional)
+
+# Dedicated pool for detector.analyze so it never queues behind blocking
+# Supabase calls on the default to_thread executor
+app.state.cpu_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="detector")
+
+# Advanced detector (optional). Each mode's detector is built once and reused;
+# mode switches swap app.state.advanced_detector under a lock.
+ADVANCED_DETECTION_CONFIGS = {
+    "fast": DetectionConfig.fast,
+    "balanced": DetectionConfig.balanced,
+    "thorough": DetectionConfig.thorough
+} if ADVANCED_DETECTION_ENABLED else {}
+
+app.state.advanced_detector = AdvancedHallucinationDetector(DetectionConfig.balanced()) if ADVANCED_DETECTION_ENABLED else None
+app.state.advanced_detectors = {"balanced": app.state.advanced_detector} if ADVANCED_DETECTION_ENABLED else {}
+app.state.advanced_detector_lock = asyncio.Lock()
 
 # Include authentication router (REQUIRED)
 app.include_router(auth_router)
@@ -161,9 +279,9 @@ def health_check():
     }
 
 
-@app.get("/health")
+@app.api_route("/health", methods=["GET", "HEAD"])
 def health():
-    """Simple health check"""
+    """Simple health check (HEAD for probes that only need the status)"""
     return {"status": "healthy"}
 
 
@@ -173,8 +291,7 @@ async def get_public_stats():
     # This is a temporary endpoint for testing
     # In production, you should remove this or add rate limiting
     
-    now = datetime.utcnow()
-    since = (now - timedelta(hours=24)).isoformat()
+    since = _stats_since("24h")
     
     result = (
         supabase.table("runs")
@@ -185,10 +302,20 @@ async def get_public_stats():
     
     runs = result.data or []
     total_requests = len(runs)
-    total_tokens = sum(r.get("total_tokens", 0) for r in runs)
-    total_cost = sum(float(r.get("cost_usd", 0) or 0) for r in runs)
-    avg_latency = round(sum(r.get("latency_ms", 0) for r in runs) / total_requests, 2) if total_requests else 0
-    flagged_requests = len([r for r in runs if r.get("status") == "flagged"])
+    
+    # Single pass over the rows for all accumulators
+    total_tokens = 0
+    total_cost = 0.0
+    total_latency = 0
+    flagged_requests = 0
+    for r in runs:
+        total_tokens += r.get("total_tokens", 0)
+        total_cost += float(r.get("cost_usd", 0) or 0)
+        total_latency += r.get("latency_ms", 0)
+        if r.get("status") == "flagged":
+            flagged_requests += 1
+    
+    avg_latency = round(total_latency / total_requests, 2) if total_requests else 0
     
     return {
         "last_24h": {
@@ -279,13 +406,235 @@ async def create_new_proxy_key(
         raise HTTPException(status_code=500, detail=f"Failed to create key: {str(e)}")
 
 
+@app.post("/v1/keys/{key_id}/revoke")
+async def revoke_key(
+    key_id: str,
+    user: dict = Depends(get_current_user)
+):
+    """Deactivate one of the authenticated user's proxy keys"""
+    revoked = await revoke_proxy_key(key_id, user["user_id"])
+    
+    if not revoked:
+        raise HTTPException(status_code=404, detail="Key not found")
+    
+    return {
+        "success": True,
+        "key_id": key_id
+    }
+
+
 # ============================================
 # Main Proxy Endpoint with Detection
 # ============================================
 
+async def _log_run(**kwargs):
+    """Background task: persist the run, payload and flags"""
+    try:
+        await log_request_with_flags(**kwargs)
+    except Exception as e:
+        print(f"⚠️  Logging run {kwargs.get('run_id')} failed: {e}")
+
+
+async def _track_finops(user: dict, run_id: str, body: dict, usage: dict, latency_ms: int):
+    """Background task: record the call in the FinOps tracker"""
+    user_id = user["user_id"]
+    
+    try:
+        # Get organization_id from user record or fall back to user_id
+        organization_id = (user.get("user_data") or {}).get("organization_id") or user_id
+        
+        # Start workflow if not exists
+        workflow_id = f"user_{user_id}_session"
+        if workflow_id not in finops_tracker.active_workflows:
+            await finops_tracker.start_workflow(
+                workflow_id=workflow_id,
+                workflow_name="API Requests",
+                user_id=user_id,
+                session_id=user_id
+            )
+        
+        # Track the call
+        await finops_tracker.track_agent_call(
+            call_id=run_id,
+            agent_name=body.get("agent_name", "default"),
+            model=body.get("model", "unknown"),
+            input_tokens=usage.get("prompt_tokens", 0),
+            output_tokens=usage.get("completion_tokens", 0),
+            latency_ms=latency_ms,
+            workflow_id=workflow_id,
+            metadata={
+                "user_id": user_id,
+                "organization_id": organization_id
+            }
+        )
+    except Exception as e:
+        print(f"⚠️  FinOps tracking failed: {e}")
+
+
+# Advanced detection costs several OpenAI calls, so it is skipped for trivially
+# short answers and memoized for repeated (prompt, response, context) inputs
+ADVANCED_MIN_RESPONSE_CHARS = 40
+ADVANCED_CACHE_MAX_ENTRIES = 10_000
+ADVANCED_CACHE_TTL_SECONDS = 3600
+
+# Total wall-clock budget for a buffered proxy call: upstream completion plus
+# advanced detection. Detection gets whatever the upstream call leaves over.
+PROXY_REQUEST_BUDGET_SECONDS = 60.0
+
+_advanced_result_cache: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+
+
+def _advanced_cache_key(mode: str, prompt_text: str, response_text: str, context: Optional[list]) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (mode, prompt_text, response_text, *(context or [])):
+        digest.update(str(part).encode())
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def _get_cached_advanced_result(key: str) -> Optional[dict]:
+    entry = _advanced_result_cache.get(key)
+    if entry is None:
+        return None
+    if entry[0] < time.monotonic():
+        _advanced_result_cache.pop(key, None)
+        return None
+    _advanced_result_cache.move_to_end(key)
+    return entry[1]
+
+
+def _set_cached_advanced_result(key: str, result: dict):
+    _advanced_result_cache[key] = (time.monotonic() + ADVANCED_CACHE_TTL_SECONDS, result)
+    _advanced_result_cache.move_to_end(key)
+    while len(_advanced_result_cache) > ADVANCED_CACHE_MAX_ENTRIES:
+        _advanced_result_cache.popitem(last=False)
+
+
+async def _run_detection(
+    prompt_text: str,
+    response_text: str,
+    model: str,
+    openai_api_key: Optional[str] = None,
+    context: Optional[list] = None,
+    advanced_timeout: Optional[float] = None
+):
+    """
+    Run basic (and, given an OpenAI key, advanced) hallucination detection
+    
+    Advanced detection is abandoned after advanced_timeout seconds.
+    Returns: (flags, advanced_result)
+    """
+    flags = []
+    advanced_result = None
+    
+    if not response_text:
+        return flags, advanced_result
+    
+    # Basic detection is CPU-bound: run it on the CPU pool while the advanced
+    # checks wait on OpenAI. A fresh instance is used because analyze()
+    # keeps per-call state on self.
+    loop = asyncio.get_running_loop()
+    detection_tasks = [
+        loop.run_in_executor(app.state.cpu_pool, HallucinationDetector().analyze, prompt_text, response_text, model)
+    ]
+    advanced_detector = app.state.advanced_detector
+    cache_key = None
+    if advanced_detector and openai_api_key and len(response_text) >= ADVANCED_MIN_RESPONSE_CHARS:
+        cache_key = _advanced_cache_key(advanced_detector.config.mode, prompt_text, response_text, context)
+        advanced_result = _get_cached_advanced_result(cache_key)
+        if advanced_result is None:
+            detection_tasks.append(asyncio.wait_for(
+                advanced_detector.detect(
+                    question=prompt_text,
+                    answer=response_text,
+                    openai_key=openai_api_key,
+                    context=context
+                ),
+                timeout=advanced_timeout
+            ))
+    
+    basic_result, *advanced = await asyncio.gather(*detection_tasks, return_exceptions=True)
+    
+    if isinstance(basic_result, Exception):
+        print(f"⚠️  Basic detection failed: {basic_result}")
+    else:
+        flags = basic_result
+    
+    if advanced and isinstance(advanced[0], asyncio.TimeoutError):
+        print(f"⚠️  Advanced detection skipped: over the {advanced_timeout:.1f}s budget")
+    elif advanced and isinstance(advanced[0], Exception):
+        print(f"⚠️  Advanced detection failed: {advanced[0]}")
+    elif advanced:
+        advanced_result = advanced[0]
+        # A verdict fused around failed checks (e.g. an OpenAI 429) is returned
+        # but not cached, so the next identical request retries the checks
+        if not advanced_result.get("errors"):
+            _set_cached_advanced_result(cache_key, advanced_result)
+    
+    return flags, advanced_result
+
+
+async def _finish_streamed_run(
+    user: dict,
+    run_id: str,
+    body: dict,
+    prompt_text: str,
+    stream_state: dict
+):
+    """Background task: analyze and log a streamed completion once it has ended"""
+    response_text = "".join(stream_state["content"])
+    usage = stream_state["usage"] or {}
+    
+    # Only basic detection here: advanced results could no longer reach the client
+    flags, _ = await _run_detection(prompt_text, response_text, body.get("model", "unknown"))
+    
+    # Reassemble a non-streaming shaped body for the payload log
+    response_body = {
+        "choices": [{"message": {"role": "assistant", "content": response_text}}],
+        "usage": usage
+    }
+    
+    await _log_run(
+        run_id=run_id,
+        user_id=user["user_id"],
+        proxy_key_id=user.get("proxy_key_id"),
+        request_body=body,
+        response_body=response_body,
+        latency_ms=stream_state["latency_ms"],
+        flags=flags
+    )
+    
+    if FINOPS_ENABLED and finops_tracker and usage:
+        await _track_finops(user, run_id, body, usage, stream_state["latency_ms"])
+
+
+def _collect_sse_line(line: bytes, stream_state: dict):
+    """Pull content deltas and usage out of one OpenAI SSE line"""
+    if not line.startswith(b"data:"):
+        return
+    
+    data = line[5:].strip()
+    if not data or data == b"[DONE]":
+        return
+    
+    try:
+        chunk = orjson.loads(data)
+    except ValueError:
+        return
+    
+    for choice in chunk.get("choices") or []:
+        content = (choice.get("delta") or {}).get("content")
+        if content:
+            stream_state["content"].append(content)
+    
+    if chunk.get("usage"):
+        stream_state["usage"] = chunk["usage"]
+
+
 @app.post("/v1/chat/completions")
 async def proxy_chat_completions(
     request: Request,
+    background_tasks: BackgroundTasks,
     user: dict = Depends(get_current_user)
 ):
     """
@@ -293,9 +642,10 @@ async def proxy_chat_completions(
     
     Usage: Same as OpenAI API, but use your proxy key in Authorization header
     """
-    body = await request.json()
-    start_time = time.time()
-    run_id = str(uuid.uuid4())
+    body = orjson.loads(await request.body())
+    start_time = time.perf_counter()
+    deadline = asyncio.get_running_loop().time() + PROXY_REQUEST_BUDGET_SECONDS
+    run_id = str(uuid7())
     
     # Extract user info
     user_id = user["user_id"]
@@ -307,47 +657,91 @@ async def proxy_chat_completions(
         raise HTTPException(status_code=500, detail="OpenAI API key not found for user")
     
     try:
-        # Forward request to OpenAI
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                json=body,
-                headers={
-                    "Authorization": f"Bearer {openai_api_key}",
-                    "Content-Type": "application/json",
-                },
-                timeout=60.0,
-            )
+        client = request.app.state.openai_client
+        headers = {
+            "Authorization": f"Bearer {openai_api_key}",
+            "Content-Type": "application/json",
+        }
         
-        result = response.json()
-        latency_ms = int((time.time() - start_time) * 1000)
+        model = body.get("model", "unknown")
         
-        # Extract prompt and response for analysis
+        # Extract prompt for analysis
         messages = body.get("messages", [])
-        prompt_text = " ".join([m.get("content", "") for m in messages if m.get("role") == "user"])
+        prompt_text = " ".join(
+            m["content"] for m in messages if m.get("role") == "user" and m.get("content")
+        )
+        
+        if body.get("stream"):
+            # Pipe SSE chunks straight through; detection and logging run on the
+            # accumulated text once the stream has closed
+            upstream = await client.send(
+                client.build_request("POST", "/v1/chat/completions", content=orjson.dumps(body), headers=headers),
+                stream=True
+            )
+            stream_state = {"content": [], "usage": None, "latency_ms": 0}
+            
+            async def relay():
+                pending = b""
+                try:
+                    async for chunk in upstream.aiter_bytes():
+                        yield chunk
+                        pending += chunk
+                        *lines, pending = pending.split(b"\n")
+                        for line in lines:
+                            _collect_sse_line(line, stream_state)
+                    _collect_sse_line(pending, stream_state)
+                finally:
+                    stream_state["latency_ms"] = int((time.perf_counter() - start_time) * 1000)
+                    await upstream.aclose()
+            
+            if upstream.status_code == 200:
+                background_tasks.add_task(
+                    _finish_streamed_run, user, run_id, body, prompt_text, stream_state
+                )
+            
+            return StreamingResponse(
+                relay(),
+                status_code=upstream.status_code,
+                media_type=upstream.headers.get("content-type", "text/event-stream"),
+                headers={"X-Run-Id": run_id},
+                background=background_tasks
+            )
+        
+        # Forward request to OpenAI over the shared connection pool
+        async with asyncio.timeout_at(deadline):
+            response = await client.post("/v1/chat/completions", content=orjson.dumps(body), headers=headers)
+        
+        result = orjson.loads(response.content)
+        latency_ms = int((time.perf_counter() - start_time) * 1000)
         
         response_text = ""
         if "choices" in result and len(result["choices"]) > 0:
             response_text = result["choices"][0]["message"]["content"]
         
-        # Run ADVANCED hallucination detection
-        flags = []
-        advanced_result = None
-        if response_text:
-            # Run basic detection for backward compatibility
-            flags = detector.analyze(prompt_text, response_text, body.get("model", "unknown"))
-            
-            # Run advanced detection
-            try:
-                advanced_result = await advanced_detector.detect(
-                    question=prompt_text,
-                    answer=response_text,
-                    openai_key=openai_key,
-                    context=body.get("context", None)  # Optional RAG context
-                )
-            except Exception as e:
-                print(f"⚠️  Advanced detection failed: {e}")
-                advanced_result = None
+        if await request.is_disconnected():
+            # Nobody will read the advanced verdict: record the run with basic flags only
+            flags, _ = await _run_detection(prompt_text, response_text, model)
+            await _log_run(
+                run_id=run_id,
+                user_id=user_id,
+                proxy_key_id=user.get("proxy_key_id"),
+                request_body=body,
+                response_body=result,
+                latency_ms=latency_ms,
+                flags=flags
+            )
+            return {"run_id": run_id, **result}
+        
+        # Run basic and ADVANCED hallucination detection concurrently, within
+        # whatever is left of the request budget
+        flags, advanced_result = await _run_detection(
+            prompt_text,
+            response_text,
+            model,
+            openai_api_key=openai_api_key,
+            context=body.get("context", None),  # Optional RAG context
+            advanced_timeout=max(deadline - asyncio.get_running_loop().time(), 0.0)
+        )
         
         # Calculate risk score (use advanced if available, fallback to basic)
         if advanced_result:
@@ -356,11 +750,12 @@ async def proxy_chat_completions(
         else:
             risk_score, risk_level = calculate_overall_risk_score(flags)
         
-        # Log to database with flags
-        await log_request_with_flags(
+        # Log to database with flags after the response is sent
+        background_tasks.add_task(
+            _log_run,
             run_id=run_id,
             user_id=user_id,
-            proxy_key_id=proxy_key_id,
+            proxy_key_id=user.get("proxy_key_id"),
             request_body=body,
             response_body=result,
             latency_ms=latency_ms,
@@ -368,46 +763,14 @@ async def proxy_chat_completions(
         )
         
         # Track in FinOps system
-        if FINOPS_ENABLED and finops_tracker and "usage" in result:
-            try:
-                # Get organization_id from user context or use user_id
-                organization_id = user_context.get("users", {}).get("organization_id") or user_id
-                
-                # Start workflow if not exists
-                workflow_id = f"user_{user_id}_session"
-                session_id = user_context.get("users", {}).get("id", user_id)
-                if workflow_id not in finops_tracker.active_workflows:
-                    await finops_tracker.start_workflow(
-                        workflow_id=workflow_id,
-                        workflow_name="API Requests",
-                        user_id=user_id,
-                        session_id=session_id
-                    )
-                
-                # Track the call
-                await finops_tracker.track_agent_call(
-                    call_id=run_id,
-                    agent_name=body.get("agent_name", "default"),
-                    model=body.get("model", "unknown"),
-                    input_tokens=result["usage"].get("prompt_tokens", 0),
-                    output_tokens=result["usage"].get("completion_tokens", 0),
-                    latency_ms=latency_ms,
-                    workflow_id=workflow_id,
-                    metadata={
-                        "user_id": user_id,
-                        "organization_id": organization_id
-                    }
-                )
-            except Exception as e:
-                print(f"⚠️  FinOps tracking failed: {e}")
+        usage = result.get("usage")
+        if FINOPS_ENABLED and finops_tracker and usage is not None:
+            background_tasks.add_task(_track_finops, user, run_id, body, usage, latency_ms)
         
         # Calculate cost for observability
         cost_usd = 0.0
-        if "usage" in result:
-            # Simple cost calculation (gpt-4o-mini pricing)
-            input_tokens = result["usage"].get("prompt_tokens", 0)
-            output_tokens = result["usage"].get("completion_tokens", 0)
-            cost_usd = (input_tokens * 0.00015 / 1000) + (output_tokens * 0.0006 / 1000)
+        if usage is not None:
+            cost_usd = calculate_cost_usd(model, usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
         
         # Add observability metadata to response
         observability_data = {
@@ -416,7 +779,7 @@ async def proxy_chat_completions(
             "risk_level": risk_level,
             "flags": flags if flags else [],
             "cost_usd": cost_usd,
-            "tokens": result.get("usage", {})
+            "tokens": usage or {}
         }
         
         # Add advanced detection results if available
@@ -441,6 +804,8 @@ async def proxy_chat_completions(
             **result
         }
     
+    except TimeoutError:
+        raise HTTPException(status_code=504, detail=f"OpenAI did not respond within {PROXY_REQUEST_BUDGET_SECONDS:.0f}s")
     except httpx.HTTPError as e:
         raise HTTPException(status_code=500, detail=f"OpenAI API error: {str(e)}")
     except Exception as e:
@@ -453,30 +818,62 @@ async def proxy_chat_completions(
 
 @app.get("/v1/runs")
 async def get_runs(
+    request: Request,
     limit: int = 50,
-    offset: int = 0,
+    cursor: Optional[str] = None,
     model: Optional[str] = None,
     status: Optional[str] = None,
     user: dict = Depends(get_current_user)
 ):
-    """Get list of runs for authenticated user"""
-    user_id = user["user_id"]
-    
-    query = supabase.table("runs").select("*").eq("user_id", user_id)
+    """
+    Get list of runs for authenticated user, newest first
     
-    if model:
-        query = query.eq("model", model)
+    Keyset-paginated: pass the previous page's next_cursor ("<created_at>,<id>")
+    as ?cursor= to fetch the following page.
+    """
+    user_id = user["user_id"]
     
-    if status:
-        query = query.eq("status", status)
+    cursor_created_at = cursor_id = None
+    if cursor:
+        try:
+            cursor_created_at, cursor_id = cursor.rsplit(",", 1)
+            datetime.fromisoformat(cursor_created_at)
+            cursor_id = str(UUID(cursor_id))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
     
-    query = query.order("created_at", desc=True).limit(limit).offset(offset)
-    result = query.execute()
+    async def build():
+        query = supabase.table("runs").select("*").eq("user_id", user_id)
+        
+        if model:
+            query = query.eq("model", model)
+        
+        if status:
+            query = query.eq("status", status)
+        
+        if cursor:
+            # Rows strictly after the cursor in (created_at DESC, id DESC) order
+            query = query.or_(
+                f'created_at.lt."{cursor_created_at}",'
+                f'and(created_at.eq."{cursor_created_at}",id.lt.{cursor_id})'
+            )
+        
+        query = query.order("created_at", desc=True).order("id", desc=True).limit(limit)
+        result = await asyncio.to_thread(query.execute)
+        runs = result.data or []
+        
+        next_cursor = None
+        if len(runs) == limit:
+            next_cursor = f"{runs[-1]['created_at']},{runs[-1]['id']}"
+        
+        return {
+            "runs": runs,
+            "total": len(runs),
+            "next_cursor": next_cursor
+        }
     
-    return {
-        "runs": result.data,
-        "total": len(result.data) if result.data else 0
-    }
+    cache_key = f"runs:{limit}:{cursor}:{model}:{status}"
+    return await _cached_json_response(request, user_id, cache_key, build)
 
 
 @app.get("/v1/runs/{run_id}")
@@ -537,101 +934,124 @@ async def resolve_flag_endpoint(
     }
 
 
-@app.get("/v1/stats")
-async def get_stats(
-    time_range: str = "24h",
-    user: dict = Depends(get_current_user)
-):
-    """Get aggregate statistics for authenticated user"""
-    user_id = user["user_id"]
-    
-    now = datetime.utcnow()
-    
-    # Calculate time delta based on time_range
-    if time_range == "1h":
-        since = (now - timedelta(hours=1)).isoformat()
-    elif time_range == "24h":
-        since = (now - timedelta(hours=24)).isoformat()
-    elif time_range == "7d":
-        since = (now - timedelta(days=7)).isoformat()
-    elif time_range == "30d":
-        since = (now - timedelta(days=30)).isoformat()
-    elif time_range == "all":
-        since = None  # No time filter
+async def _cached_json_response(request: Request, user_id: str, cache_key: str, build) -> Response:
+    """Serve a per-user read endpoint from the short TTL cache with a strong ETag"""
+    cached = get_cached_response(user_id, cache_key)
+    if cached is None:
+        body = orjson.dumps(await build(), default=str)
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        set_cached_response(user_id, cache_key, body, etag)
     else:
-        since = (now - timedelta(hours=24)).isoformat()
-    
-    # Fetch runs based on time range
-    query = supabase.table("runs").select("*").eq("user_id", user_id)
+        body, etag = cached
     
-    if since:
-        query = query.gte("created_at", since)
-    
-    result = query.execute()
-    
-    runs = result.data or []
-    total_requests = len(runs)
-    total_tokens = sum(r.get("total_tokens", 0) for r in runs)
-    total_cost = sum(float(r.get("cost_usd", 0) or 0) for r in runs)
-    avg_latency = round(sum(r.get("latency_ms", 0) for r in runs) / total_requests, 2) if total_requests else 0
-    
-    flagged_requests = len([r for r in runs if r.get("status") == "flagged"])
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={RESPONSE_CACHE_TTL_SECONDS}"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+# Stats windows only need minute precision, so each window's start timestamp
+# is formatted once per minute and reused
+STATS_WINDOWS = {
+    "1h": timedelta(hours=1),
+    "24h": timedelta(hours=24),
+    "7d": timedelta(days=7),
+    "30d": timedelta(days=30),
+}
+_since_cache: Dict[str, Tuple[int, str]] = {}
+
+
+def _stats_since(time_range: str) -> Optional[str]:
+    """Start of the stats window as an ISO timestamp (None = all time)"""
+    if time_range == "all":
+        return None  # No time filter
+    if time_range not in STATS_WINDOWS:
+        time_range = "24h"
     
-    # Get flag statistics
-    flag_stats = await get_flag_stats(user_id)
+    minute = int(time.time() // 60)
+    cached = _since_cache.get(time_range)
+    if cached is None or cached[0] != minute:
+        since = (datetime.utcfromtimestamp(minute * 60) - STATS_WINDOWS[time_range]).isoformat()
+        cached = _since_cache[time_range] = (minute, since)
+    return cached[1]
+
+
+async def get_stats_impl(user_id: str, time_range: str = "24h") -> dict:
+    """Aggregate statistics for a user (shared by /v1/stats and /v1/dashboard)"""
+    since = _stats_since(time_range)
     
-    # Group by model
-    model_stats = {}
-    for r in runs:
-        model = r.get("model", "unknown")
-        if model not in model_stats:
-            model_stats[model] = {"model": model, "count": 0, "tokens": 0, "cost": 0}
-        model_stats[model]["count"] += 1
-        model_stats[model]["tokens"] += r.get("total_tokens", 0)
-        model_stats[model]["cost"] += float(r.get("cost_usd", 0) or 0)
+    # Aggregate in Postgres (see migrations/004_user_stats_rpc.sql) while
+    # the flag statistics are fetched
+    result, flag_stats = await asyncio.gather(
+        asyncio.to_thread(
+            supabase.rpc("get_user_stats", {"p_user_id": user_id, "p_since": since}).execute
+        ),
+        get_flag_stats(user_id)
+    )
+    stats = result.data or {}
     
     return {
         "last_24h": {
-            "total_requests": total_requests,
-            "flagged_requests": flagged_requests,
-            "total_tokens": total_tokens,
-            "total_cost": round(total_cost, 6),
-            "avg_latency": avg_latency
+            "total_requests": stats.get("total_requests", 0),
+            "flagged_requests": stats.get("flagged_requests", 0),
+            "total_tokens": stats.get("total_tokens", 0),
+            "total_cost": round(float(stats.get("total_cost") or 0), 6),
+            "avg_latency": float(stats.get("avg_latency") or 0)
         },
         "flags": flag_stats,
-        "by_model": list(model_stats.values())
+        "by_model": [
+            {**m, "cost": float(m["cost"] or 0)}
+            for m in stats.get("by_model", [])
+        ]
     }
 
 
+@app.get("/v1/stats")
+async def get_stats(
+    request: Request,
+    time_range: str = "24h",
+    user: dict = Depends(get_current_user)
+):
+    """Get aggregate statistics for authenticated user"""
+    user_id = user["user_id"]
+    return await _cached_json_response(
+        request, user_id, f"stats:{time_range}", lambda: get_stats_impl(user_id, time_range)
+    )
+
+
 @app.get("/v1/dashboard")
 async def get_dashboard(
+    request: Request,
     user: dict = Depends(get_current_user)
 ):
     """Get comprehensive dashboard data"""
     user_id = user["user_id"]
     
-    # Get stats
-    stats = await get_stats(user_context)
-    
-    # Get recent flagged runs
-    flagged_runs = (
-        supabase.table("runs")
-        .select("*, flags(*)")
-        .eq("user_id", user_id)
-        .eq("status", "flagged")
-        .order("created_at", desc=True)
-        .limit(10)
-        .execute()
-    )
-    
-    # Get unresolved flags
-    unresolved_flags = await get_flags_for_user(user_id, is_resolved=False, limit=20)
+    async def build():
+        # Recent flagged runs
+        flagged_runs_query = (
+            supabase.table("runs")
+            .select("*, flags(*)")
+            .eq("user_id", user_id)
+            .eq("status", "flagged")
+            .order("created_at", desc=True)
+            .limit(10)
+        )
+        
+        # Stats, flagged runs and unresolved flags are independent: fetch them concurrently
+        stats, flagged_runs, unresolved_flags = await asyncio.gather(
+            get_stats_impl(user_id),
+            asyncio.to_thread(flagged_runs_query.execute),
+            get_flags_for_user(user_id, is_resolved=False, limit=20)
+        )
+        
+        return {
+            "stats": stats,
+            "recent_flagged_runs": flagged_runs.data if flagged_runs.data else [],
+            "unresolved_flags": unresolved_flags
+        }
     
-    return {
-        "stats": stats,
-        "recent_flagged_runs": flagged_runs.data if flagged_runs.data else [],
-        "unresolved_flags": unresolved_flags
-    }
+    return await _cached_json_response(request, user_id, "dashboard", build)
 
 
 # ============================================
@@ -667,21 +1087,28 @@ async def update_detection_config(
     request: Request,
     user: dict = Depends(get_current_user)
 ):
-    """Update advanced detection configuration"""
-    global advanced_detector
+    """
+    Update advanced detection configuration
+    
+    The mode lives in this process's app.state, so under several workers it
+    only changes for the worker that served this request
+    """
+    if not ADVANCED_DETECTION_ENABLED:
+        raise HTTPException(status_code=503, detail="Advanced detection is not available")
     
     body = await request.json()
     mode = body.get("mode", "balanced")
+    if mode not in ADVANCED_DETECTION_CONFIGS:
+        mode = "balanced"
     
-    # Update detector with new config
-    if mode == "fast":
-        config = DetectionConfig.fast()
-    elif mode == "thorough":
-        config = DetectionConfig.thorough()
-    else:
-        config = DetectionConfig.balanced()
-    
-    advanced_detector = AdvancedHallucinationDetector(config)
+    # Build each mode's detector at most once, then swap it in atomically
+    async with app.state.advanced_detector_lock:
+        new_detector = app.state.advanced_detectors.get(mode)
+        if new_detector is None:
+            config = ADVANCED_DETECTION_CONFIGS[mode]()
+            new_detector = await asyncio.to_thread(AdvancedHallucinationDetector, config)
+            app.state.advanced_detectors[mode] = new_detector
+        app.state.advanced_detector = new_detector
     
     return {
         "success": True,
@@ -692,4 +1119,19 @@ async def update_detection_config(
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    # One worker on uvloop + httptools when they are installed ("auto");
+    # RELOAD=true for auto-reload, WEB_CONCURRENCY=N to opt into N workers
+    # (per-process caches and detection mode, see gunicorn.conf.py)
+    reload = os.getenv("RELOAD", "false").lower() == "true"
+    if not reload:
+        # Workers inherit one build id; reloaded processes must each resolve their own
+        resolve_build_id(persist=True)
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=int(os.getenv("PORT", "8000")),
+        loop="auto",
+        http="auto",
+        reload=reload,
+        workers=None if reload else int(os.getenv("WEB_CONCURRENCY", "1"))
+    )
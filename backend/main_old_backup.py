@@ -1,88 +1,119 @@
-"""
-
-
-# backend/main.py
-from fastapi import FastAPI, Request
-from fastapi.middleware.cors import CORSMiddleware
-import httpx
-import time
-import uuid
-from datetime import datetime
-import os
-from dotenv import load_dotenv
-
-load_dotenv() 
-
-app = FastAPI(title="LLM Proxy")
-
-# Enable CORS for frontend
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-@app.get("/health")
-async def health():
-    return {"status": "ok"}
-
-@app.post("/proxy/openai/chat/completions")
-async def proxy_openai(request: Request):
-    """"Forward request to OpenAI and log it""""
-    
-    # Parse request
-    body = await request.json()
-    start_time = time.time()
-    
-    # Forward to OpenAI
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            "https://api.openai.com/v1/chat/completions",
-            json=body,
-            headers={
-                "Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}",
-                "Content-Type": "application/json"
-            },
-            timeout=60.0
-        )
-        result = response.json()
-    
-    # Calculate metrics
-    latency_ms = int((time.time() - start_time) * 1000)
-    run_id = str(uuid.uuid4())
-    
-    # Log to database (we'll add this next)
-    # await log_request(run_id, body, result, latency_ms)
-    
-    return {
-        "run_id": run_id,
-        **result
-    }
-
-if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
-
-"""    
-
 # backend/main.py
 import os
 import time
 import uuid
+import asyncio
 import httpx
-from fastapi import FastAPI, Request
+import orjson
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
 from dotenv import load_dotenv
-from typing import Optional
-from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
 from database import supabase  
-from database import log_request  # ✅ only import log_request (get_pool not defined in your db.py)
+from database import build_log_rows, insert_log_rows
 
 load_dotenv()
 
-app = FastAPI()
+
+# Logged runs are queued and bulk-inserted every LOG_FLUSH_INTERVAL seconds or
+# LOG_BATCH_SIZE runs, whichever comes first
+LOG_BATCH_SIZE = 100
+LOG_FLUSH_INTERVAL = 0.5
+LOG_INSERT_ATTEMPTS = 3
+LOG_RETRY_BASE_SECONDS = 0.5
+
+
+async def _insert_log_batch(batch: list, attempts: int = LOG_INSERT_ATTEMPTS):
+    """Insert a batch, retrying transient failures and falling back to one run at a time"""
+    error = None
+    for attempt in range(attempts):
+        try:
+            await asyncio.to_thread(
+                insert_log_rows,
+                [run_row for run_row, _ in batch],
+                [payload_row for _, payload_row in batch],
+            )
+            return
+        except Exception as e:
+            error = e
+        if attempt < attempts - 1:
+            await asyncio.sleep(LOG_RETRY_BASE_SECONDS * 2 ** attempt)
+
+    if len(batch) == 1:
+        print(f"❌ Error logging run {batch[0][0]['id']}: {error}")
+        return
+
+    print(f"⚠️ Error logging {len(batch)} runs ({error}), retrying them one by one")
+    for item in batch:
+        await _insert_log_batch([item], attempts=2)
+
+
+async def _log_flusher(queue: asyncio.Queue):
+    """Drain the log queue in batches, one insert per table per batch"""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await queue.get()]
+        deadline = loop.time() + LOG_FLUSH_INTERVAL
+        while len(batch) < LOG_BATCH_SIZE:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+
+        try:
+            await _insert_log_batch(batch)
+        finally:
+            for _ in batch:
+                queue.task_done()
+
+
+def _probe_run_details() -> bool:
+    """Check once whether the run_details view (see schema.sql) is available"""
+    try:
+        supabase.table("run_details").select("id").limit(1).execute()
+        return True
+    except Exception as e:
+        print(f"❌ run_details view unavailable, falling back to runs + payloads: {e}")
+        return False
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """One pooled OpenAI client and one log flusher for the life of the app"""
+    app.state.http_client = httpx.AsyncClient(
+        http2=True,
+        timeout=httpx.Timeout(connect=5.0, read=60.0, write=10.0, pool=5.0),
+        limits=httpx.Limits(
+            max_connections=200,
+            max_keepalive_connections=50,
+            keepalive_expiry=60.0,
+        ),
+        headers={
+            "Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}",
+            "Content-Type": "application/json",
+        },
+    )
+    app.state.has_run_details = await asyncio.to_thread(_probe_run_details)
+    app.state.log_queue = asyncio.Queue()
+    flusher = asyncio.create_task(_log_flusher(app.state.log_queue))
+    yield
+    # Flush queued runs before shutting down
+    await app.state.log_queue.join()
+    flusher.cancel()
+    try:
+        await flusher
+    except asyncio.CancelledError:
+        pass
+    await app.state.http_client.aclose()
+
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 
 # Allow CORS (optional but useful for frontend)
 app.add_middleware(
@@ -94,33 +125,102 @@ app.add_middleware(
 )
 
 
+async def _enqueue_log(queue: asyncio.Queue, run_id: str, body: dict, result: dict, latency_ms: int):
+    """Hand a finished run to the log flusher (async, so it runs on the event loop that owns the queue)"""
+    queue.put_nowait(build_log_rows(run_id, body, result, latency_ms))
+
+
+def _splice_run_id(raw: bytes, run_id: str) -> bytes:
+    """Prepend "run_id" to an upstream JSON object without re-encoding it"""
+    body = raw.lstrip()
+    if not body.startswith(b"{"):
+        return raw
+    rest = body[1:].lstrip()
+    separator = b"" if rest.startswith(b"}") else b","
+    return b'{"run_id":"' + run_id.encode() + b'"' + separator + rest
+
+
+def _sniff_sse_line(line: bytes, collected: dict):
+    """Collect content deltas and usage from one OpenAI SSE line"""
+    data = line[5:].strip() if line.startswith(b"data:") else b""
+    if not data or data == b"[DONE]":
+        return
+    try:
+        chunk = orjson.loads(data)
+    except ValueError:
+        return
+    for choice in chunk.get("choices") or []:
+        content = (choice.get("delta") or {}).get("content")
+        if content:
+            collected["content"].append(content)
+    if chunk.get("usage"):
+        collected["usage"] = chunk["usage"]
+
+
 @app.post("/proxy/openai/chat/completions")
-async def proxy_openai(request: Request):
+async def proxy_openai(request: Request, background: BackgroundTasks):
     """Forward request to OpenAI and log it."""
-    body = await request.json()
+    body = orjson.loads(await request.body())
     start_time = time.time()
     run_id = str(uuid.uuid4())
 
     try:
-        # Forward request to OpenAI
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                json=body,
-                headers={
-                    "Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}",
-                    "Content-Type": "application/json",
-                },
-                timeout=60.0,
+        # Forward request to OpenAI over the shared client
+        client = request.app.state.http_client
+
+        if body.get("stream"):
+            # Relay SSE bytes as they arrive; log once the stream has ended
+            upstream = await client.send(
+                client.build_request("POST", "https://api.openai.com/v1/chat/completions", content=orjson.dumps(body)),
+                stream=True,
             )
+            collected = {"content": [], "usage": {}, "latency_ms": 0}
+
+            async def relay():
+                pending = b""
+                try:
+                    async for chunk in upstream.aiter_bytes():
+                        yield chunk
+                        pending += chunk
+                        *lines, pending = pending.split(b"\n")
+                        for line in lines:
+                            _sniff_sse_line(line, collected)
+                    _sniff_sse_line(pending, collected)
+                finally:
+                    collected["latency_ms"] = int((time.time() - start_time) * 1000)
+                    await upstream.aclose()
+
+            async def log_stream():
+                result = {
+                    "choices": [{"message": {"role": "assistant", "content": "".join(collected["content"])}}],
+                    "usage": collected["usage"],
+                }
+                await _enqueue_log(request.app.state.log_queue, run_id, body, result, collected["latency_ms"])
+
+            return StreamingResponse(
+                relay(),
+                status_code=upstream.status_code,
+                media_type="text/event-stream",
+                headers={"x-run-id": run_id},
+                background=BackgroundTask(log_stream),
+            )
+
+        response = await client.post("https://api.openai.com/v1/chat/completions", content=orjson.dumps(body))
 
-        result = response.json()
+        raw = response.content
+        result = orjson.loads(raw)
         latency_ms = int((time.time() - start_time) * 1000)
 
-        # Log to Supabase
-        await log_request(run_id, body, result, latency_ms)
+        # Log to Supabase after the response has been sent
+        background.add_task(_enqueue_log, request.app.state.log_queue, run_id, body, result, latency_ms)
 
-        return {"run_id": run_id, **result}
+        return Response(
+            content=_splice_run_id(raw, run_id),
+            status_code=response.status_code,
+            media_type="application/json",
+            headers={"x-run-id": run_id},
+            background=background,
+        )
 
     except Exception as e:
         print(f"❌ Error in proxy_openai: {e}")
@@ -132,6 +232,29 @@ def health_check():
     """Simple health check endpoint."""
     return {"status": "ok", "message": "LLM Proxy is running!"}
 
+# In-process TTL cache for the polled read endpoints. Concurrent misses on the
+# same key wait on one lock so only one of them queries Supabase.
+STATS_CACHE_TTL = 10.0
+RUNS_CACHE_TTL = 2.0
+
+_CACHE: Dict[Tuple, Tuple[float, Any]] = {}
+_CACHE_LOCKS: Dict[Tuple, asyncio.Lock] = {}
+
+
+async def _cached(key: Tuple, ttl: float, compute: Callable[[], Any]) -> Any:
+    entry = _CACHE.get(key)
+    if entry and time.monotonic() - entry[0] < ttl:
+        return entry[1]
+
+    async with _CACHE_LOCKS.setdefault(key, asyncio.Lock()):
+        entry = _CACHE.get(key)
+        if entry and time.monotonic() - entry[0] < ttl:
+            return entry[1]
+        data = await asyncio.to_thread(compute)
+        _CACHE[key] = (time.monotonic(), data)
+        return data
+
+
 @app.get("/v1/runs")
 async def get_runs(
     limit: int = 50,
@@ -139,91 +262,91 @@ async def get_runs(
     model: Optional[str] = None,
     status: Optional[str] = None
 ):
-    """Get list of runs with optional filters (via Supabase)"""
+    """Get list of runs with optional filters (via Supabase, cached for RUNS_CACHE_TTL)"""
 
-    query = supabase.table("runs").select("*")
+    def query_runs():
+        # count="exact" returns the true filtered total in the same response
+        query = supabase.table("runs").select("*", count="exact")
 
-    if model:
-        query = query.eq("model", model)
+        if model:
+            query = query.eq("model", model)
 
-    if status:
-        query = query.eq("status", status)
+        if status:
+            query = query.eq("status", status)
 
-    query = query.order("created_at", desc=True).limit(limit).offset(offset)
-    result = query.execute()
+        query = query.order("created_at", desc=True).range(offset, offset + limit - 1)
+        result = query.execute()
 
-    return {
-        "runs": result.data,
-        "total": len(result.data) if result.data else 0
-    }
+        return {
+            "runs": result.data,
+            "total": result.count or 0
+        }
+
+    return await _cached(("runs", limit, offset, model, status), RUNS_CACHE_TTL, query_runs)
 
 
 @app.get("/v1/runs/{run_id}")
-async def get_run(run_id: str):
+async def get_run(run_id: str, request: Request):
     """Get detailed view of a single run (with payloads via join)"""
 
-    # Try to use the view `run_details` if available
-    try:
-        result = supabase.table("run_details").select("*").eq("id", run_id).single().execute()
-        if result.data:
-            return result.data
-    except Exception:
-        pass  # fallback if view doesn’t exist
+    # One roundtrip through the run_details view when the startup probe found it
+    if request.app.state.has_run_details:
+        result = await asyncio.to_thread(
+            supabase.table("run_details").select("*").eq("id", run_id).limit(1).execute
+        )
+        if not result.data:
+            return {"error": "Run not found"}, 404
+        return result.data[0]
 
     # Fallback: fetch manually from runs + payloads
-    run = supabase.table("runs").select("*").eq("id", run_id).single().execute()
-    payload = supabase.table("payloads").select("*").eq("run_id", run_id).single().execute()
+    run, payload = await asyncio.gather(
+        asyncio.to_thread(supabase.table("runs").select("*").eq("id", run_id).limit(1).execute),
+        asyncio.to_thread(supabase.table("payloads").select("*").eq("run_id", run_id).limit(1).execute),
+    )
 
     if not run.data:
         return {"error": "Run not found"}, 404
 
-    return {**run.data, "payload": payload.data}
+    return {**run.data[0], "payload": payload.data[0] if payload.data else None}
 
 
 @app.get("/v1/stats")
 async def get_stats():
-    """Get aggregate statistics for the last 24 hours"""
-
-    now = datetime.utcnow()
-    since = (now - timedelta(hours=24)).isoformat()
-
-    # Fetch runs created in last 24 hours
-    result = (
-        supabase.table("runs")
-        .select("*")
-        .gte("created_at", since)
-        .execute()
-    )
-
-    runs = result.data or []
-    total_requests = len(runs)
-    total_tokens = sum(r.get("total_tokens", 0) for r in runs)
-    total_cost = sum(float(r.get("cost_usd", 0) or 0) for r in runs)
-    avg_latency = round(sum(r.get("latency_ms", 0) for r in runs) / total_requests, 2) if total_requests else 0
-    unique_models = len(set(r.get("model") for r in runs if r.get("model")))
-
-    # Group by model
-    model_stats = {}
-    for r in runs:
-        model = r.get("model", "unknown")
-        if model not in model_stats:
-            model_stats[model] = {"model": model, "count": 0, "tokens": 0, "cost": 0}
-        model_stats[model]["count"] += 1
-        model_stats[model]["tokens"] += r.get("total_tokens", 0)
-        model_stats[model]["cost"] += float(r.get("cost_usd", 0) or 0)
+    """Get aggregate statistics for the last 24 hours (cached for STATS_CACHE_TTL)"""
+    return await _cached(("stats",), STATS_CACHE_TTL, _compute_stats)
+
+
+def _compute_stats():
+    """Sum the per-model rows of the runs_stats_24h materialized view"""
+    model_stats = supabase.table("runs_stats_24h").select("*").execute().data or []
+
+    # One pass over the per-model rows for the totals and the by_model list
+    total_requests = total_tokens = unique_models = 0
+    total_cost = total_latency = 0.0
+    by_model = []
+    for m in model_stats:
+        count, tokens, cost = m["count"], m["tokens"], float(m["cost"])
+        total_requests += count
+        total_tokens += tokens
+        total_cost += cost
+        total_latency += (m["avg_latency"] or 0) * count
+        if m["model"] != "unknown":
+            unique_models += 1
+        by_model.append({"model": m["model"], "count": count, "tokens": tokens, "cost": cost})
 
     return {
         "last_24h": {
             "total_requests": total_requests,
             "total_tokens": total_tokens,
             "total_cost": total_cost,
-            "avg_latency": avg_latency,
+            "avg_latency": round(total_latency / total_requests, 2) if total_requests else 0,
             "unique_models": unique_models
         },
-        "by_model": list(model_stats.values())
+        "by_model": by_model
     }
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    # Development only; production runs under gunicorn (see gunicorn.conf.py)
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=os.getenv("RELOAD", "false").lower() == "true")
@@ -0,0 +1,46 @@
+-- Aggregate run statistics in Postgres
+-- /v1/stats used to download every run in the window and sum them in Python.
+-- Run this in your Supabase SQL editor
+
+-- Composite index so the per-user time-window scan is an index range scan
+CREATE INDEX IF NOT EXISTS idx_runs_user_created_at ON runs(user_id, created_at DESC);
+
+-- Function: get_user_stats
+-- Returns totals plus a per-model breakdown for one user.
+-- p_since = NULL means all time.
+CREATE OR REPLACE FUNCTION get_user_stats(p_user_id UUID, p_since TIMESTAMP DEFAULT NULL)
+RETURNS JSON AS $$
+    WITH scoped AS (
+        SELECT COALESCE(model, 'unknown') AS model, total_tokens, cost_usd, latency_ms, status
+        FROM runs
+        WHERE user_id = p_user_id
+          AND (p_since IS NULL OR created_at >= p_since)
+    ),
+    totals AS (
+        SELECT
+            COUNT(*) AS total_requests,
+            COUNT(*) FILTER (WHERE status = 'flagged') AS flagged_requests,
+            COALESCE(SUM(total_tokens), 0) AS total_tokens,
+            COALESCE(SUM(cost_usd), 0) AS total_cost,
+            COALESCE(ROUND(AVG(latency_ms)::NUMERIC, 2), 0) AS avg_latency
+        FROM scoped
+    ),
+    by_model AS (
+        SELECT
+            model,
+            COUNT(*) AS count,
+            COALESCE(SUM(total_tokens), 0) AS tokens,
+            COALESCE(SUM(cost_usd), 0) AS cost
+        FROM scoped
+        GROUP BY model
+    )
+    SELECT json_build_object(
+        'total_requests', totals.total_requests,
+        'flagged_requests', totals.flagged_requests,
+        'total_tokens', totals.total_tokens,
+        'total_cost', totals.total_cost,
+        'avg_latency', totals.avg_latency,
+        'by_model', (SELECT COALESCE(json_agg(by_model), '[]'::JSON) FROM by_model)
+    )
+    FROM totals;
+$$ LANGUAGE sql STABLE;
@@ -0,0 +1,6 @@
+-- Keyset pagination for /v1/runs
+-- The runs list pages on (created_at DESC, id DESC) instead of OFFSET, so each
+-- page is an index seek no matter how deep it is.
+-- Run this in your Supabase SQL editor
+
+CREATE INDEX IF NOT EXISTS runs_user_created_idx ON runs(user_id, created_at DESC, id DESC);
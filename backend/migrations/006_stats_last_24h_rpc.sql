@@ -0,0 +1,40 @@
+-- Global 24h statistics in Postgres (legacy single-tenant API, main_old_backup.py)
+-- /v1/stats used to download every run from the last 24 hours and sum them in Python.
+-- Run this in your Supabase SQL editor
+--
+-- The scan uses idx_runs_created_at (schema.sql). A partial index bounded by
+-- now() is not possible: index predicates must be immutable.
+
+-- Function: stats_last_24h
+-- Returns the exact /v1/stats response body: last_24h totals plus by_model.
+CREATE OR REPLACE FUNCTION stats_last_24h()
+RETURNS JSON AS $$
+    WITH scoped AS (
+        SELECT model, total_tokens, cost_usd, latency_ms
+        FROM runs
+        WHERE created_at >= NOW() - INTERVAL '24 hours'
+    ),
+    totals AS (
+        SELECT
+            COUNT(*) AS total_requests,
+            COALESCE(SUM(total_tokens), 0) AS total_tokens,
+            COALESCE(SUM(cost_usd), 0) AS total_cost,
+            COALESCE(ROUND(AVG(latency_ms)::NUMERIC, 2), 0) AS avg_latency,
+            COUNT(DISTINCT model) AS unique_models
+        FROM scoped
+    ),
+    by_model AS (
+        SELECT
+            COALESCE(model, 'unknown') AS model,
+            COUNT(*) AS count,
+            COALESCE(SUM(total_tokens), 0) AS tokens,
+            COALESCE(SUM(cost_usd), 0) AS cost
+        FROM scoped
+        GROUP BY COALESCE(model, 'unknown')
+    )
+    SELECT json_build_object(
+        'last_24h', row_to_json(totals),
+        'by_model', (SELECT COALESCE(json_agg(by_model), '[]'::JSON) FROM by_model)
+    )
+    FROM totals;
+$$ LANGUAGE sql STABLE;
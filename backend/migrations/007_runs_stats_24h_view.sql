@@ -0,0 +1,27 @@
+-- Pre-aggregated 24h statistics (legacy single-tenant API, main_old_backup.py)
+-- /v1/stats reads a handful of per-model rows instead of scanning and grouping
+-- the last 24 hours of runs on every dashboard poll.
+-- Run this in your Supabase SQL editor (requires the pg_cron extension)
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS runs_stats_24h AS
+SELECT
+    COALESCE(model, 'unknown') AS model,
+    COUNT(*) AS count,
+    COALESCE(SUM(total_tokens), 0) AS tokens,
+    COALESCE(SUM(cost_usd), 0) AS cost,
+    AVG(latency_ms) AS avg_latency
+FROM runs
+WHERE created_at > NOW() - INTERVAL '24 hours'
+GROUP BY COALESCE(model, 'unknown');
+
+-- REFRESH ... CONCURRENTLY needs a unique index
+CREATE UNIQUE INDEX IF NOT EXISTS runs_stats_24h_model_idx ON runs_stats_24h(model);
+
+-- Refresh every minute without blocking readers
+CREATE EXTENSION IF NOT EXISTS pg_cron;
+
+SELECT cron.schedule(
+    'refresh-runs-stats-24h',
+    '* * * * *',
+    $$REFRESH MATERIALIZED VIEW CONCURRENTLY runs_stats_24h$$
+);
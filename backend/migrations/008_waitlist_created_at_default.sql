@@ -0,0 +1,7 @@
+-- Let Postgres stamp waitlist signups
+-- /api/waitlist no longer sends created_at; the column defaults to the
+-- database clock instead.
+-- Run this in your Supabase SQL editor
+
+ALTER TABLE waitlist
+ALTER COLUMN created_at SET DEFAULT now();
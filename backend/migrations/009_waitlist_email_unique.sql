@@ -0,0 +1,6 @@
+-- One waitlist row per email
+-- /api/waitlist upserts with ON CONFLICT (email) DO NOTHING, which needs a
+-- unique index on the conflict column.
+-- Run this in your Supabase SQL editor
+
+CREATE UNIQUE INDEX IF NOT EXISTS waitlist_email_idx ON waitlist(email);
@@ -4,11 +4,32 @@ Core mission: Make AI reliable enough for mission-critical business operations
 """
 
 import re
+from functools import lru_cache
 from typing import Dict, List, Tuple
 from dataclasses import dataclass
 
 
-@dataclass
+# General best practices appended to every improvement list
+_GENERAL_IMPROVEMENTS = (
+    "✓ Always provide context before asking questions",
+    "✓ Specify the exact format you want for the response",
+    "✓ Tell the AI what to do when it's uncertain",
+    "✓ Use specific, measurable language instead of vague terms",
+    "✓ Request confidence levels for each claim",
+    "✓ Ask for sources or reasoning behind answers"
+)
+
+# Analyses are memoized per input string; longer inputs bypass the cache
+ANALYSIS_CACHE_SIZE = 4096
+ANALYSIS_CACHE_MAX_CHARS = 8192
+
+# Prompts shorter than this, or with no letters at all, skip analysis and are
+# reported as trivial
+MIN_PROMPT_CHARS = 8
+_HAS_LETTER = re.compile(r"[^\W\d_]")
+
+
+@dataclass(frozen=True, slots=True)
 class PromptIssue:
     """Represents an issue found in a prompt"""
     issue_type: str
@@ -18,7 +39,7 @@ class PromptIssue:
     example: str
 
 
-@dataclass
+@dataclass(slots=True)
 class OptimizedPrompt:
     """Result of prompt optimization"""
     original_prompt: str
@@ -28,18 +49,50 @@ class OptimizedPrompt:
     improvements: List[str]
 
 
+_TOO_SHORT_ISSUE = PromptIssue(
+    issue_type="too_short",
+    severity="critical",
+    description="Prompt is empty or trivial",
+    suggestion="Provide a real request",
+    example=""
+)
+
+
 class PromptOptimizer:
     """
     Analyzes prompts and suggests improvements to reduce hallucinations
     """
     
+    # Keyword lists for the prompt checks; each is compiled into one alternation
+    # in __init__ so a check is a single C-level scan of the lowercased prompt
+    VAGUE_WORDS = ["maybe", "possibly", "could you", "might", "perhaps", "kind of", "sort of"]
+    CONTEXT_INDICATORS = ["given", "context", "background", "considering", "based on"]
+    OPEN_STARTERS = ["tell me about", "explain", "describe", "what do you know about"]
+    SPECULATION_WORDS = ["predict", "guess", "speculate", "what if", "will happen", "in the future"]
+    FORMAT_INDICATORS = ["format", "structure", "list", "numbered", "bullet points", "json", "table"]
+    UNCERTAINTY_PHRASES = [
+        "if uncertain", "if you don't know", "if unsure",
+        "only if confident", "don't guess", "don't speculate"
+    ]
+    
     def __init__(self):
         self.hallucination_triggers = self._load_hallucination_triggers()
         self.best_practices = self._load_best_practices()
+        self._open_starters = tuple(self.OPEN_STARTERS)
     
-    def _load_hallucination_triggers(self) -> Dict:
-        """Common patterns that trigger hallucinations"""
-        return {
+    @staticmethod
+    def _contains_any(text: str, keywords: List[str]) -> bool:
+        """Substring check for any keyword; str's search beats a regex alternation here"""
+        for keyword in keywords:
+            if keyword in text:
+                return True
+        return False
+    
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _load_hallucination_triggers() -> Dict[str, re.Pattern]:
+        """Common patterns that trigger hallucinations, one compiled alternation per category (built once per process)"""
+        triggers = {
             "vague_questions": [
                 r"\bwhat do you think\b",
                 r"\bmaybe\b",
@@ -56,18 +109,12 @@ class PromptOptimizer:
                 r"\bguess\b",
                 r"\bspeculate\b",
                 r"\bwhat if\b",
-            ],
-            "missing_context": [
-                r"^(?!.*context)(?!.*background)(?!.*given).*",  # No context provided
-            ],
-            "ambiguous_pronouns": [
-                r"\bit\b",
-                r"\bthey\b",
-                r"\bthem\b",
-                r"\bthis\b",
-                r"\bthat\b",
             ]
         }
+        return {
+            category: re.compile("|".join(f"(?:{pattern})" for pattern in patterns))
+            for category, patterns in triggers.items()
+        }
     
     def _load_best_practices(self) -> Dict:
         """Best practices for reliable prompts"""
@@ -98,11 +145,38 @@ class PromptOptimizer:
         """
         Analyze a prompt and return optimization suggestions
         """
+        if len(prompt.strip()) < MIN_PROMPT_CHARS or not _HAS_LETTER.search(prompt):
+            optimized, issues, score, improvements = prompt, (_TOO_SHORT_ISSUE,), 0.0, ()
+        elif prompt in _TEMPLATE_ANALYSES:
+            optimized, issues, score, improvements = _TEMPLATE_ANALYSES[prompt]
+        elif len(prompt) > ANALYSIS_CACHE_MAX_CHARS:
+            optimized, issues, score, improvements = self._analyze_prompt_uncached(prompt)
+        else:
+            optimized, issues, score, improvements = _analyze_prompt_cached(prompt)
+        
+        return OptimizedPrompt(
+            original_prompt=prompt,
+            optimized_prompt=optimized,
+            issues_found=list(issues),
+            reliability_score=score,
+            improvements=list(improvements)
+        )
+    
+    def analyze_batch(self, prompts: List[str]) -> List[OptimizedPrompt]:
+        """Analyze several prompts in one call, analyzing repeated prompts once"""
+        analyzed = {prompt: self.analyze_prompt(prompt) for prompt in dict.fromkeys(prompts)}
+        return [analyzed[prompt] for prompt in prompts]
+    
+    def _analyze_prompt_uncached(self, prompt: str) -> Tuple[str, Tuple[PromptIssue, ...], float, Tuple[str, ...]]:
+        """Run the full prompt analysis, returning immutable results safe to cache"""
         issues = []
         improvements = []
+        prompt_lower = prompt.lower()
+        has_output_format = self._has_output_format(prompt_lower)
+        has_uncertainty_handling = self._has_uncertainty_handling(prompt_lower)
         
         # Check for vague language
-        if self._has_vague_language(prompt):
+        if self._has_vague_language(prompt_lower):
             issues.append(PromptIssue(
                 issue_type="vague_language",
                 severity="high",
@@ -112,7 +186,7 @@ class PromptOptimizer:
             ))
         
         # Check for missing context
-        if self._missing_context(prompt):
+        if self._missing_context(prompt_lower):
             issues.append(PromptIssue(
                 issue_type="missing_context",
                 severity="critical",
@@ -122,7 +196,7 @@ class PromptOptimizer:
             ))
         
         # Check for open-ended questions
-        if self._is_open_ended(prompt):
+        if self._is_open_ended(prompt_lower):
             issues.append(PromptIssue(
                 issue_type="open_ended",
                 severity="medium",
@@ -132,7 +206,7 @@ class PromptOptimizer:
             ))
         
         # Check for speculation requests
-        if self._requests_speculation(prompt):
+        if self._requests_speculation(prompt_lower):
             issues.append(PromptIssue(
                 issue_type="speculation",
                 severity="critical",
@@ -142,7 +216,7 @@ class PromptOptimizer:
             ))
         
         # Check for missing output format
-        if not self._has_output_format(prompt):
+        if not has_output_format:
             issues.append(PromptIssue(
                 issue_type="no_format",
                 severity="medium",
@@ -152,7 +226,7 @@ class PromptOptimizer:
             ))
         
         # Check for missing uncertainty handling
-        if not self._has_uncertainty_handling(prompt):
+        if not has_uncertainty_handling:
             issues.append(PromptIssue(
                 issue_type="no_uncertainty_handling",
                 severity="high",
@@ -165,51 +239,38 @@ class PromptOptimizer:
         optimized = self._generate_optimized_prompt(prompt, issues)
         
         # Calculate reliability score
-        reliability_score = self._calculate_reliability_score(prompt, issues)
+        reliability_score = self._calculate_reliability_score(
+            prompt_lower, issues, has_output_format, has_uncertainty_handling
+        )
         
         # Generate improvement list
         improvements = self._generate_improvements(issues)
         
-        return OptimizedPrompt(
-            original_prompt=prompt,
-            optimized_prompt=optimized,
-            issues_found=issues,
-            reliability_score=reliability_score,
-            improvements=improvements
-        )
+        return optimized, tuple(issues), reliability_score, tuple(improvements)
     
-    def _has_vague_language(self, prompt: str) -> bool:
+    def _has_vague_language(self, prompt_lower: str) -> bool:
         """Check for vague language"""
-        vague_words = ["maybe", "possibly", "could you", "might", "perhaps", "kind of", "sort of"]
-        return any(word in prompt.lower() for word in vague_words)
+        return self._contains_any(prompt_lower, self.VAGUE_WORDS)
     
-    def _missing_context(self, prompt: str) -> bool:
+    def _missing_context(self, prompt_lower: str) -> bool:
         """Check if prompt lacks context"""
-        context_indicators = ["given", "context", "background", "considering", "based on"]
-        return not any(indicator in prompt.lower() for indicator in context_indicators) and len(prompt.split()) < 15
+        return not self._contains_any(prompt_lower, self.CONTEXT_INDICATORS) and len(prompt_lower.split()) < 15
     
-    def _is_open_ended(self, prompt: str) -> bool:
+    def _is_open_ended(self, prompt_lower: str) -> bool:
         """Check if question is too open-ended"""
-        open_starters = ["tell me about", "explain", "describe", "what do you know about"]
-        return any(prompt.lower().startswith(starter) for starter in open_starters)
+        return prompt_lower.startswith(self._open_starters)
     
-    def _requests_speculation(self, prompt: str) -> bool:
+    def _requests_speculation(self, prompt_lower: str) -> bool:
         """Check if prompt asks for speculation"""
-        speculation_words = ["predict", "guess", "speculate", "what if", "will happen", "in the future"]
-        return any(word in prompt.lower() for word in speculation_words)
+        return self._contains_any(prompt_lower, self.SPECULATION_WORDS)
     
-    def _has_output_format(self, prompt: str) -> bool:
+    def _has_output_format(self, prompt_lower: str) -> bool:
         """Check if output format is specified"""
-        format_indicators = ["format", "structure", "list", "numbered", "bullet points", "json", "table"]
-        return any(indicator in prompt.lower() for indicator in format_indicators)
+        return self._contains_any(prompt_lower, self.FORMAT_INDICATORS)
     
-    def _has_uncertainty_handling(self, prompt: str) -> bool:
+    def _has_uncertainty_handling(self, prompt_lower: str) -> bool:
         """Check if uncertainty handling is specified"""
-        uncertainty_phrases = [
-            "if uncertain", "if you don't know", "if unsure",
-            "only if confident", "don't guess", "don't speculate"
-        ]
-        return any(phrase in prompt.lower() for phrase in uncertainty_phrases)
+        return self._contains_any(prompt_lower, self.UNCERTAINTY_PHRASES)
     
     def _generate_optimized_prompt(self, original: str, issues: List[PromptIssue]) -> str:
         """Generate an optimized version of the prompt"""
@@ -236,7 +297,13 @@ class PromptOptimizer:
         
         return optimized
     
-    def _calculate_reliability_score(self, prompt: str, issues: List[PromptIssue]) -> float:
+    def _calculate_reliability_score(
+        self,
+        prompt_lower: str,
+        issues: List[PromptIssue],
+        has_output_format: bool,
+        has_uncertainty_handling: bool
+    ) -> float:
         """Calculate how reliable responses to this prompt will be"""
         base_score = 1.0
         
@@ -252,11 +319,11 @@ class PromptOptimizer:
             base_score -= severity_penalties.get(issue.severity, 0.1)
         
         # Bonus for good practices
-        if self._has_output_format(prompt):
+        if has_output_format:
             base_score += 0.1
-        if self._has_uncertainty_handling(prompt):
+        if has_uncertainty_handling:
             base_score += 0.15
-        if "specific" in prompt.lower() or "exactly" in prompt.lower():
+        if "specific" in prompt_lower or "exactly" in prompt_lower:
             base_score += 0.1
         
         return max(0.0, min(1.0, base_score))
@@ -269,16 +336,9 @@ class PromptOptimizer:
             improvements.append(f"✓ {issue.suggestion}")
         
         # Add general best practices
-        improvements.extend([
-            "✓ Always provide context before asking questions",
-            "✓ Specify the exact format you want for the response",
-            "✓ Tell the AI what to do when it's uncertain",
-            "✓ Use specific, measurable language instead of vague terms",
-            "✓ Request confidence levels for each claim",
-            "✓ Ask for sources or reasoning behind answers"
-        ])
+        improvements.extend(_GENERAL_IMPROVEMENTS)
         
-        return list(set(improvements))  # Remove duplicates
+        return list(dict.fromkeys(improvements))  # Remove duplicates, keep order
 
 
 def get_prompt_templates() -> Dict[str, str]:
@@ -374,39 +434,90 @@ Summary:"""
     }
 
 
+# Backs the module-level analysis cache; PromptOptimizer holds no per-instance state
+_SHARED_OPTIMIZER = PromptOptimizer()
+
+# The built-in templates are analyzed once at import
+_TEMPLATE_ANALYSES = {
+    template: _SHARED_OPTIMIZER._analyze_prompt_uncached(template)
+    for template in get_prompt_templates().values()
+}
+
+
+# Phrase lists for analyze_response_reliability, scanned in one pass by _RESPONSE_RE
+_RESPONSE_PHRASES = {
+    # Hedging phrases (good - shows appropriate uncertainty)
+    "hedging_phrases": ["may", "might", "could", "possibly", "likely", "probably", "appears to", "seems to"],
+    # Uncertainty markers (good - acknowledges limitations)
+    "uncertainty_markers": ["i don't know", "uncertain", "unclear", "not enough information", "cannot determine"],
+    # Vague language (bad - indicates potential hallucination)
+    "vague_language": ["very", "quite", "rather", "somewhat", "fairly", "pretty", "kind of", "sort of"],
+    # Confidence statements (check if appropriate)
+    "confidence_statements": ["definitely", "certainly", "absolutely", "without doubt", "guaranteed"],
+    # Specific facts (good - concrete information)
+    "sources": ["according to", "source:", "based on", "study", "research"],
+}
+
+# Zero-width lookahead so every start position is tried, matching the old
+# per-phrase substring checks even where phrases overlap
+_RESPONSE_RE = re.compile("(?=" + "|".join(
+    [
+        f"(?P<{name}>{'|'.join(re.escape(phrase) for phrase in phrases)})"
+        for name, phrases in _RESPONSE_PHRASES.items()
+    ] + [
+        r"(?P<dates>\b(?:19|20)\d{2}\b)",
+        r"(?P<numbers>\d)",
+    ]
+) + ")")
+
+
+@lru_cache(maxsize=ANALYSIS_CACHE_SIZE)
+def _analyze_prompt_cached(prompt: str) -> Tuple[str, Tuple[PromptIssue, ...], float, Tuple[str, ...]]:
+    """Memoized prompt analysis shared by all optimizer instances"""
+    return _SHARED_OPTIMIZER._analyze_prompt_uncached(prompt)
+
+
+@lru_cache(maxsize=ANALYSIS_CACHE_SIZE)
+def _analyze_response_cached(response: str) -> Dict:
+    """Memoized response analysis; never returned to callers directly"""
+    return _analyze_response_uncached(response)
+
+
 def analyze_response_reliability(response: str) -> Dict:
     """
     Analyze an AI response for reliability indicators
     """
-    reliability_indicators = {
-        "hedging_phrases": 0,
-        "uncertainty_markers": 0,
-        "specific_facts": 0,
-        "vague_language": 0,
-        "confidence_statements": 0
-    }
+    if len(response) > ANALYSIS_CACHE_MAX_CHARS:
+        result = _analyze_response_uncached(response)
+    else:
+        result = _analyze_response_cached(response)
     
-    # Hedging phrases (good - shows appropriate uncertainty)
-    hedging = ["may", "might", "could", "possibly", "likely", "probably", "appears to", "seems to"]
-    reliability_indicators["hedging_phrases"] = sum(1 for phrase in hedging if phrase in response.lower())
-    
-    # Uncertainty markers (good - acknowledges limitations)
-    uncertainty = ["i don't know", "uncertain", "unclear", "not enough information", "cannot determine"]
-    reliability_indicators["uncertainty_markers"] = sum(1 for marker in uncertainty if marker in response.lower())
-    
-    # Specific facts (good - concrete information)
-    has_numbers = bool(re.search(r'\d+', response))
-    has_dates = bool(re.search(r'\b(19|20)\d{2}\b', response))
-    has_sources = bool(re.search(r'(according to|source:|based on|study|research)', response.lower()))
-    reliability_indicators["specific_facts"] = sum([has_numbers, has_dates, has_sources])
+    # Hand out copies so callers can't mutate the cached result
+    return {
+        **result,
+        "indicators": dict(result["indicators"]),
+        "concerns": list(result["concerns"])
+    }
+
+
+def _analyze_response_uncached(response: str) -> Dict:
+    """Score a response's reliability indicators without memoization"""
+    # Distinct phrases seen per category, from a single scan of the lowercased text
+    found = {name: set() for name in (*_RESPONSE_PHRASES, "dates", "numbers")}
+    for match in _RESPONSE_RE.finditer(response.lower()):
+        found[match.lastgroup].add(match.group(match.lastgroup))
     
-    # Vague language (bad - indicates potential hallucination)
-    vague = ["very", "quite", "rather", "somewhat", "fairly", "pretty", "kind of", "sort of"]
-    reliability_indicators["vague_language"] = sum(1 for word in vague if word in response.lower())
+    has_dates = bool(found["dates"])
+    has_numbers = has_dates or bool(found["numbers"])
+    has_sources = bool(found["sources"])
     
-    # Confidence statements (check if appropriate)
-    confidence = ["definitely", "certainly", "absolutely", "without doubt", "guaranteed"]
-    reliability_indicators["confidence_statements"] = sum(1 for phrase in confidence if phrase in response.lower())
+    reliability_indicators = {
+        "hedging_phrases": len(found["hedging_phrases"]),
+        "uncertainty_markers": len(found["uncertainty_markers"]),
+        "specific_facts": sum([has_numbers, has_dates, has_sources]),
+        "vague_language": len(found["vague_language"]),
+        "confidence_statements": len(found["confidence_statements"])
+    }
     
     # Calculate overall reliability score
     score = 0.5  # Start neutral
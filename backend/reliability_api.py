@@ -3,20 +3,54 @@ Reliability & Prompt Optimization API
 Core mission: Make AI reliable for mission-critical business operations
 """
 
+import asyncio
+import hashlib
+from bisect import bisect_left
+import orjson
 from fastapi import APIRouter, Request, HTTPException
-from typing import Optional
+from fastapi.responses import Response
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
 from prompt_optimizer import (
     PromptOptimizer,
     get_prompt_templates,
     analyze_response_reliability
 )
-from database import supabase
 
 router = APIRouter(prefix="/v1/reliability", tags=["reliability"])
 
 # Initialize optimizer
 optimizer = PromptOptimizer()
 
+# Serialized /analyze-* responses, keyed by a digest of the exact input text
+ANALYSIS_CACHE_MAX_ENTRIES = 10_000
+_analysis_cache: "OrderedDict[bytes, bytes]" = OrderedDict()
+
+
+async def _cached_analysis(kind: str, text: str, build: Callable[[str], dict]) -> Response:
+    """Serve an analysis payload from the LRU cache, building it off the event loop on a miss"""
+    key = hashlib.blake2b(f"{kind}\x00{text}".encode(), digest_size=16).digest()
+    body = _analysis_cache.get(key)
+    if body is None:
+        body = await asyncio.to_thread(lambda: orjson.dumps(build(text)))
+        _analysis_cache[key] = body
+        while len(_analysis_cache) > ANALYSIS_CACHE_MAX_ENTRIES:
+            _analysis_cache.popitem(last=False)
+    else:
+        _analysis_cache.move_to_end(key)
+    return Response(content=body, media_type="application/json")
+
+
+async def _analyze_cached(prompt: str):
+    """Analyze a prompt off the event loop; results are shared with /analyze-prompt
+    through prompt_optimizer's per-string cache, so repeat calls skip the analysis"""
+    return await asyncio.to_thread(optimizer.analyze_prompt, prompt)
+
+
+def _json_response(data: dict) -> Response:
+    """Serialize a plain-JSON payload with orjson, skipping FastAPI's jsonable_encoder pass"""
+    return Response(content=orjson.dumps(data), media_type="application/json")
+
 
 @router.post("/analyze-prompt")
 async def analyze_prompt_endpoint(request: Request):
@@ -25,13 +59,17 @@ async def analyze_prompt_endpoint(request: Request):
     
     This is the CORE feature - helps companies write prompts that reduce hallucinations
     """
-    body = await request.json()
+    body = orjson.loads(await request.body())
     prompt = body.get("prompt")
     
     if not prompt:
         raise HTTPException(status_code=400, detail="Prompt is required")
     
-    # Analyze the prompt
+    return await _cached_analysis("prompt", prompt, _prompt_analysis_payload)
+
+
+def _prompt_analysis_payload(prompt: str) -> dict:
+    """Analyze a prompt and shape the /analyze-prompt response"""
     result = optimizer.analyze_prompt(prompt)
     
     return {
@@ -59,12 +97,17 @@ async def analyze_response_endpoint(request: Request):
     """
     Analyze an AI response for reliability indicators
     """
-    body = await request.json()
+    body = orjson.loads(await request.body())
     response_text = body.get("response")
     
     if not response_text:
         raise HTTPException(status_code=400, detail="Response text is required")
     
+    return await _cached_analysis("response", response_text, _response_analysis_payload)
+
+
+def _response_analysis_payload(response_text: str) -> dict:
+    """Analyze a response and shape the /analyze-response response"""
     analysis = analyze_response_reliability(response_text)
     
     return {
@@ -77,24 +120,12 @@ async def analyze_response_endpoint(request: Request):
 
 
 @router.get("/templates")
-async def get_templates():
+async def get_templates(request: Request):
     """
     Get pre-built prompt templates for common use cases
     These templates are optimized to minimize hallucinations
     """
-    templates = get_prompt_templates()
-    
-    return {
-        "templates": [
-            {
-                "name": name,
-                "template": template,
-                "use_case": _get_use_case_description(name),
-                "reliability_score": 0.9  # Pre-optimized templates
-            }
-            for name, template in templates.items()
-        ]
-    }
+    return _static_response(request, *_TEMPLATES_RESPONSE)
 
 
 @router.post("/test-prompt")
@@ -102,7 +133,7 @@ async def test_prompt_endpoint(request: Request):
     """
     Test a prompt with actual API call and analyze results
     """
-    body = await request.json()
+    body = orjson.loads(await request.body())
     prompt = body.get("prompt")
     organization_id = body.get("organization_id")
     
@@ -110,20 +141,20 @@ async def test_prompt_endpoint(request: Request):
         raise HTTPException(status_code=400, detail="Prompt and organization_id required")
     
     # First, analyze the prompt
-    prompt_analysis = optimizer.analyze_prompt(prompt)
+    prompt_analysis = await _analyze_cached(prompt)
     
     # TODO: Make actual API call and analyze response
     # For now, return analysis
     
-    return {
+    return _json_response({
         "prompt_analysis": {
             "reliability_score": prompt_analysis.reliability_score,
             "issues": len(prompt_analysis.issues_found),
-            "critical_issues": len([i for i in prompt_analysis.issues_found if i.severity == "critical"])
+            "critical_issues": _count_critical(prompt_analysis.issues_found)
         },
         "recommendation": "Test with optimized prompt" if prompt_analysis.reliability_score < 0.7 else "Prompt is reliable",
         "optimized_prompt": prompt_analysis.optimized_prompt
-    }
+    })
 
 
 @router.post("/compare-prompts")
@@ -131,191 +162,85 @@ async def compare_prompts_endpoint(request: Request):
     """
     Compare two prompts and recommend the better one
     """
-    body = await request.json()
+    body = orjson.loads(await request.body())
     prompt_a = body.get("prompt_a")
     prompt_b = body.get("prompt_b")
     
     if not prompt_a or not prompt_b:
         raise HTTPException(status_code=400, detail="Both prompts required")
     
-    # Analyze both prompts
-    analysis_a = optimizer.analyze_prompt(prompt_a)
-    analysis_b = optimizer.analyze_prompt(prompt_b)
+    # Identical prompts only need one analysis and always tie
+    if prompt_a == prompt_b:
+        analysis = await _analyze_cached(prompt_a)
+        summary = _comparison_summary(analysis)
+        return _json_response({
+            "prompt_a": summary,
+            "prompt_b": summary,
+            "winner": "tie",
+            "recommendation": "Both prompts are identical - they have the same reliability",
+            "improvement_suggestions": analysis.improvements
+        })
+    
+    # Analyze both prompts in one worker-thread hop (the GIL serializes them anyway)
+    analysis_a, analysis_b = await asyncio.to_thread(optimizer.analyze_batch, [prompt_a, prompt_b])
     
     winner = "A" if analysis_a.reliability_score > analysis_b.reliability_score else "B"
     
-    return {
-        "prompt_a": {
-            "reliability_score": analysis_a.reliability_score,
-            "issues_count": len(analysis_a.issues_found),
-            "critical_issues": len([i for i in analysis_a.issues_found if i.severity == "critical"])
-        },
-        "prompt_b": {
-            "reliability_score": analysis_b.reliability_score,
-            "issues_count": len(analysis_b.issues_found),
-            "critical_issues": len([i for i in analysis_b.issues_found if i.severity == "critical"])
-        },
+    return _json_response({
+        "prompt_a": _comparison_summary(analysis_a),
+        "prompt_b": _comparison_summary(analysis_b),
         "winner": winner,
         "recommendation": f"Use Prompt {winner} - it has {abs(analysis_a.reliability_score - analysis_b.reliability_score):.2%} higher reliability",
         "improvement_suggestions": analysis_a.improvements if winner == "A" else analysis_b.improvements
-    }
+    })
 
 
 @router.get("/best-practices")
-async def get_best_practices():
+async def get_best_practices(request: Request):
     """
     Get best practices for writing reliable prompts
     """
-    return {
-        "best_practices": [
-            {
-                "category": "Specificity",
-                "principle": "Be specific about what you want",
-                "bad_example": "Tell me about AI",
-                "good_example": "List 5 key components of modern AI systems with brief descriptions",
-                "why": "Specific requests reduce ambiguity and speculation"
-            },
-            {
-                "category": "Context",
-                "principle": "Always provide relevant context",
-                "bad_example": "What should we do?",
-                "good_example": "Given our Q4 sales data showing 20% decline, what are 3 specific actions to improve revenue?",
-                "why": "Context grounds the AI in facts, reducing hallucinations"
-            },
-            {
-                "category": "Constraints",
-                "principle": "Set clear boundaries and constraints",
-                "bad_example": "Explain the market",
-                "good_example": "Based only on the attached market report, summarize the top 3 trends",
-                "why": "Constraints prevent the AI from inventing information"
-            },
-            {
-                "category": "Format",
-                "principle": "Specify the exact output format",
-                "bad_example": "Give me some ideas",
-                "good_example": "Provide 3 ideas in this format: 1. [Idea] - [Benefit] - [Risk]",
-                "why": "Structured output is easier to verify and less prone to hallucination"
-            },
-            {
-                "category": "Uncertainty Handling",
-                "principle": "Tell AI what to do when uncertain",
-                "bad_example": "What will happen next year?",
-                "good_example": "Based on historical data, what patterns exist? If uncertain, state 'Insufficient data'",
-                "why": "Explicit uncertainty handling prevents guessing"
-            },
-            {
-                "category": "Verification",
-                "principle": "Request confidence levels and sources",
-                "bad_example": "Is this true?",
-                "good_example": "Verify this claim and provide: 1) Confidence level 2) Supporting evidence 3) Contradicting evidence",
-                "why": "Forces AI to self-assess and provide evidence"
-            },
-            {
-                "category": "Avoid Speculation",
-                "principle": "Never ask AI to predict or speculate",
-                "bad_example": "What will the stock price be tomorrow?",
-                "good_example": "What factors historically influenced this stock price? List with evidence.",
-                "why": "Speculation is the #1 cause of hallucinations"
-            }
-        ],
-        "quick_checklist": [
-            "✓ Does your prompt provide context?",
-            "✓ Is the request specific and measurable?",
-            "✓ Have you specified the output format?",
-            "✓ Did you tell AI what to do when uncertain?",
-            "✓ Are you asking for facts, not speculation?",
-            "✓ Have you set clear boundaries?",
-            "✓ Did you request confidence levels?"
-        ]
-    }
+    return _static_response(request, *_BEST_PRACTICES_RESPONSE)
 
 
 @router.get("/hallucination-patterns")
-async def get_hallucination_patterns():
+async def get_hallucination_patterns(request: Request):
     """
     Get common hallucination patterns to watch for
     """
+    return _static_response(request, *_HALLUCINATION_PATTERNS_RESPONSE)
+
+
+def _comparison_summary(analysis) -> dict:
+    """Per-prompt block of the /compare-prompts response"""
     return {
-        "patterns": [
-            {
-                "pattern": "Fabricated Statistics",
-                "description": "AI invents specific numbers without source",
-                "example": "Studies show that 73.4% of users prefer...",
-                "red_flags": ["Overly specific percentages", "No source cited", "Round numbers"],
-                "prevention": "Always ask for sources: 'Cite the source for any statistics'"
-            },
-            {
-                "pattern": "Invented Dates",
-                "description": "AI creates specific dates for events",
-                "example": "On March 15, 2023, the company announced...",
-                "red_flags": ["Specific dates without verification", "Recent dates for historical events"],
-                "prevention": "Add: 'Only include dates you can verify from provided context'"
-            },
-            {
-                "pattern": "Fake Citations",
-                "description": "AI invents academic papers or sources",
-                "example": "According to Smith et al. (2022) in the Journal of...",
-                "red_flags": ["Academic citations without verification", "Plausible-sounding but fake sources"],
-                "prevention": "Request: 'Only cite sources from the provided list'"
-            },
-            {
-                "pattern": "Overconfident Claims",
-                "description": "AI states uncertain things with certainty",
-                "example": "This will definitely increase revenue by 50%",
-                "red_flags": ["Absolute language", "Predictions stated as facts", "No caveats"],
-                "prevention": "Require: 'State confidence level for each claim'"
-            },
-            {
-                "pattern": "Logical Inconsistencies",
-                "description": "AI contradicts itself within response",
-                "example": "X is true because Y. However, Y is false because...",
-                "red_flags": ["Internal contradictions", "Circular reasoning"],
-                "prevention": "Ask: 'Check for logical consistency before responding'"
-            },
-            {
-                "pattern": "Temporal Confusion",
-                "description": "AI mixes up timelines or causality",
-                "example": "The 2025 event caused the 2020 change...",
-                "red_flags": ["Reversed causality", "Anachronisms"],
-                "prevention": "Specify: 'Maintain chronological order and verify causality'"
-            },
-            {
-                "pattern": "Attribute Errors",
-                "description": "AI attributes quotes or actions to wrong people",
-                "example": "As Einstein said, 'To be or not to be'",
-                "red_flags": ["Misattributed quotes", "Wrong person for achievement"],
-                "prevention": "Require: 'Verify attribution before including quotes'"
-            },
-            {
-                "pattern": "Scope Creep",
-                "description": "AI answers beyond what was asked",
-                "example": "Asked about X, but AI also explains Y, Z, and makes predictions",
-                "red_flags": ["Unsolicited information", "Going beyond scope"],
-                "prevention": "Constrain: 'Answer only what is asked, nothing more'"
-            }
-        ],
-        "detection_tips": [
-            "🔍 Always verify specific numbers and dates",
-            "🔍 Check citations against real sources",
-            "🔍 Look for hedging language (or lack thereof)",
-            "🔍 Verify logical consistency",
-            "🔍 Cross-reference claims across multiple responses",
-            "🔍 Be suspicious of overly specific details",
-            "🔍 Watch for confident predictions about uncertain things"
-        ]
+        "reliability_score": analysis.reliability_score,
+        "issues_count": len(analysis.issues_found),
+        "critical_issues": _count_critical(analysis.issues_found)
     }
 
 
+def _count_critical(issues) -> int:
+    """Count critical issues without building a filtered list"""
+    critical = 0
+    for issue in issues:
+        critical += issue.severity == "critical"
+    return critical
+
+
+# Recommendation for scores in (-inf, 0.4], (0.4, 0.6], (0.6, 0.8], (0.8, inf)
+_RECOMMENDATION_THRESHOLDS = (0.4, 0.6, 0.8)
+_RECOMMENDATIONS = (
+    "High risk of hallucinations. Please revise prompt using the optimized version before use.",
+    "Moderate reliability. Significant improvements recommended before using in production.",
+    "Good prompt with minor improvements needed. Review the suggestions to increase reliability.",
+    "Excellent prompt! This should produce reliable results. Consider using this as a template."
+)
+
+
 def _generate_recommendation(score: float) -> str:
     """Generate recommendation based on reliability score"""
-    if score > 0.8:
-        return "Excellent prompt! This should produce reliable results. Consider using this as a template."
-    elif score > 0.6:
-        return "Good prompt with minor improvements needed. Review the suggestions to increase reliability."
-    elif score > 0.4:
-        return "Moderate reliability. Significant improvements recommended before using in production."
-    else:
-        return "High risk of hallucinations. Please revise prompt using the optimized version before use."
+    return _RECOMMENDATIONS[bisect_left(_RECOMMENDATION_THRESHOLDS, score)]
 
 
 def _generate_response_recommendation(analysis: dict) -> str:
@@ -331,14 +256,185 @@ def _generate_response_recommendation(analysis: dict) -> str:
         return "Response shows low reliability. Do not use without thorough verification."
 
 
+_USE_CASE_DESCRIPTIONS = {
+    "factual_qa": "Use for factual questions where accuracy is critical. Prevents speculation.",
+    "data_analysis": "Use for analyzing data sets. Ensures AI sticks to provided data only.",
+    "decision_support": "Use for decision-making scenarios. Provides structured evaluation.",
+    "content_generation": "Use for creating content. Maintains factual accuracy.",
+    "code_review": "Use for reviewing code. Focuses on specific, actionable feedback.",
+    "summarization": "Use for summarizing text. Prevents adding information not in source."
+}
+
+
 def _get_use_case_description(template_name: str) -> str:
     """Get description for template use case"""
-    descriptions = {
-        "factual_qa": "Use for factual questions where accuracy is critical. Prevents speculation.",
-        "data_analysis": "Use for analyzing data sets. Ensures AI sticks to provided data only.",
-        "decision_support": "Use for decision-making scenarios. Provides structured evaluation.",
-        "content_generation": "Use for creating content. Maintains factual accuracy.",
-        "code_review": "Use for reviewing code. Focuses on specific, actionable feedback.",
-        "summarization": "Use for summarizing text. Prevents adding information not in source."
-    }
-    return descriptions.get(template_name, "General purpose template")
+    return _USE_CASE_DESCRIPTIONS.get(template_name, "General purpose template")
+
+
+# ============================================
+# Static Payloads
+# ============================================
+
+# The read-only endpoints above serve constant content, so their bodies are
+# serialized once at import and revalidated by ETag
+STATIC_CACHE_MAX_AGE_SECONDS = 3600
+
+
+def _static_payload(data: dict) -> Tuple[bytes, str]:
+    """Serialize a constant response body and derive its ETag"""
+    body = orjson.dumps(data)
+    return body, f'"{hashlib.md5(body).hexdigest()}"'
+
+
+def _static_response(request: Request, body: bytes, etag: str) -> Response:
+    """Serve a pre-serialized body, answering 304 when the client has it"""
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={STATIC_CACHE_MAX_AGE_SECONDS}"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+_BEST_PRACTICES_RESPONSE = _static_payload({
+    "best_practices": [
+        {
+            "category": "Specificity",
+            "principle": "Be specific about what you want",
+            "bad_example": "Tell me about AI",
+            "good_example": "List 5 key components of modern AI systems with brief descriptions",
+            "why": "Specific requests reduce ambiguity and speculation"
+        },
+        {
+            "category": "Context",
+            "principle": "Always provide relevant context",
+            "bad_example": "What should we do?",
+            "good_example": "Given our Q4 sales data showing 20% decline, what are 3 specific actions to improve revenue?",
+            "why": "Context grounds the AI in facts, reducing hallucinations"
+        },
+        {
+            "category": "Constraints",
+            "principle": "Set clear boundaries and constraints",
+            "bad_example": "Explain the market",
+            "good_example": "Based only on the attached market report, summarize the top 3 trends",
+            "why": "Constraints prevent the AI from inventing information"
+        },
+        {
+            "category": "Format",
+            "principle": "Specify the exact output format",
+            "bad_example": "Give me some ideas",
+            "good_example": "Provide 3 ideas in this format: 1. [Idea] - [Benefit] - [Risk]",
+            "why": "Structured output is easier to verify and less prone to hallucination"
+        },
+        {
+            "category": "Uncertainty Handling",
+            "principle": "Tell AI what to do when uncertain",
+            "bad_example": "What will happen next year?",
+            "good_example": "Based on historical data, what patterns exist? If uncertain, state 'Insufficient data'",
+            "why": "Explicit uncertainty handling prevents guessing"
+        },
+        {
+            "category": "Verification",
+            "principle": "Request confidence levels and sources",
+            "bad_example": "Is this true?",
+            "good_example": "Verify this claim and provide: 1) Confidence level 2) Supporting evidence 3) Contradicting evidence",
+            "why": "Forces AI to self-assess and provide evidence"
+        },
+        {
+            "category": "Avoid Speculation",
+            "principle": "Never ask AI to predict or speculate",
+            "bad_example": "What will the stock price be tomorrow?",
+            "good_example": "What factors historically influenced this stock price? List with evidence.",
+            "why": "Speculation is the #1 cause of hallucinations"
+        }
+    ],
+    "quick_checklist": [
+        "✓ Does your prompt provide context?",
+        "✓ Is the request specific and measurable?",
+        "✓ Have you specified the output format?",
+        "✓ Did you tell AI what to do when uncertain?",
+        "✓ Are you asking for facts, not speculation?",
+        "✓ Have you set clear boundaries?",
+        "✓ Did you request confidence levels?"
+    ]
+})
+
+_HALLUCINATION_PATTERNS_RESPONSE = _static_payload({
+    "patterns": [
+        {
+            "pattern": "Fabricated Statistics",
+            "description": "AI invents specific numbers without source",
+            "example": "Studies show that 73.4% of users prefer...",
+            "red_flags": ["Overly specific percentages", "No source cited", "Round numbers"],
+            "prevention": "Always ask for sources: 'Cite the source for any statistics'"
+        },
+        {
+            "pattern": "Invented Dates",
+            "description": "AI creates specific dates for events",
+            "example": "On March 15, 2023, the company announced...",
+            "red_flags": ["Specific dates without verification", "Recent dates for historical events"],
+            "prevention": "Add: 'Only include dates you can verify from provided context'"
+        },
+        {
+            "pattern": "Fake Citations",
+            "description": "AI invents academic papers or sources",
+            "example": "According to Smith et al. (2022) in the Journal of...",
+            "red_flags": ["Academic citations without verification", "Plausible-sounding but fake sources"],
+            "prevention": "Request: 'Only cite sources from the provided list'"
+        },
+        {
+            "pattern": "Overconfident Claims",
+            "description": "AI states uncertain things with certainty",
+            "example": "This will definitely increase revenue by 50%",
+            "red_flags": ["Absolute language", "Predictions stated as facts", "No caveats"],
+            "prevention": "Require: 'State confidence level for each claim'"
+        },
+        {
+            "pattern": "Logical Inconsistencies",
+            "description": "AI contradicts itself within response",
+            "example": "X is true because Y. However, Y is false because...",
+            "red_flags": ["Internal contradictions", "Circular reasoning"],
+            "prevention": "Ask: 'Check for logical consistency before responding'"
+        },
+        {
+            "pattern": "Temporal Confusion",
+            "description": "AI mixes up timelines or causality",
+            "example": "The 2025 event caused the 2020 change...",
+            "red_flags": ["Reversed causality", "Anachronisms"],
+            "prevention": "Specify: 'Maintain chronological order and verify causality'"
+        },
+        {
+            "pattern": "Attribute Errors",
+            "description": "AI attributes quotes or actions to wrong people",
+            "example": "As Einstein said, 'To be or not to be'",
+            "red_flags": ["Misattributed quotes", "Wrong person for achievement"],
+            "prevention": "Require: 'Verify attribution before including quotes'"
+        },
+        {
+            "pattern": "Scope Creep",
+            "description": "AI answers beyond what was asked",
+            "example": "Asked about X, but AI also explains Y, Z, and makes predictions",
+            "red_flags": ["Unsolicited information", "Going beyond scope"],
+            "prevention": "Constrain: 'Answer only what is asked, nothing more'"
+        }
+    ],
+    "detection_tips": [
+        "🔍 Always verify specific numbers and dates",
+        "🔍 Check citations against real sources",
+        "🔍 Look for hedging language (or lack thereof)",
+        "🔍 Verify logical consistency",
+        "🔍 Cross-reference claims across multiple responses",
+        "🔍 Be suspicious of overly specific details",
+        "🔍 Watch for confident predictions about uncertain things"
+    ]
+})
+
+_TEMPLATES_RESPONSE = _static_payload({
+    "templates": [
+        {
+            "name": name,
+            "template": template,
+            "use_case": _get_use_case_description(name),
+            "reliability_score": 0.9  # Pre-optimized templates
+        }
+        for name, template in get_prompt_templates().items()
+    ]
+})
@@ -69,5 +69,6 @@ Write-Host ""
 Write-Host "Press Ctrl+C to stop the server" -ForegroundColor Yellow
 Write-Host ""
 
-# Start the server
+# Start the server (with auto-reload for development)
+$env:RELOAD = "true"
 python main.py
@@ -3,22 +3,11 @@ Test script for Advanced Hallucination Detection System
 """
 
 import asyncio
-import os
-from dotenv import load_dotenv
 from advanced_detection import AdvancedHallucinationDetector, DetectionConfig
-
-# Load environment variables from .env file
-load_dotenv()
-
-# Set your OpenAI API key
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+from _env import OPENAI_API_KEY
 
 async def test_fast_mode():
     """Test fast mode (semantic entropy only)"""
-    print("\n" + "="*60)
-    print("TEST 1: FAST MODE (Semantic Entropy Only)")
-    print("="*60)
-    
     config = DetectionConfig.fast()
     detector = AdvancedHallucinationDetector(config)
     
@@ -28,6 +17,10 @@ async def test_fast_mode():
         openai_key=OPENAI_API_KEY
     )
     
+    print("\n" + "="*60)
+    print("TEST 1: FAST MODE (Semantic Entropy Only)")
+    print("="*60)
+    
     print(f"\n✅ Risk Level: {result['risk_level']}")
     print(f"📊 Risk Probability: {result['risk_probability']}")
     print(f"💡 Explanation: {result['explanation']}")
@@ -38,10 +31,6 @@ async def test_fast_mode():
 
 async def test_with_hallucination():
     """Test with a likely hallucination"""
-    print("\n" + "="*60)
-    print("TEST 2: DETECTING HALLUCINATION")
-    print("="*60)
-    
     config = DetectionConfig.fast()
     detector = AdvancedHallucinationDetector(config)
     
@@ -52,6 +41,10 @@ async def test_with_hallucination():
         openai_key=OPENAI_API_KEY
     )
     
+    print("\n" + "="*60)
+    print("TEST 2: DETECTING HALLUCINATION")
+    print("="*60)
+    
     print(f"\n✅ Risk Level: {result['risk_level']}")
     print(f"📊 Risk Probability: {result['risk_probability']}")
     print(f"💡 Explanation: {result['explanation']}")
@@ -65,10 +58,6 @@ async def test_with_hallucination():
 
 async def test_balanced_mode_with_context():
     """Test balanced mode with RAG context"""
-    print("\n" + "="*60)
-    print("TEST 3: BALANCED MODE WITH CONTEXT")
-    print("="*60)
-    
     config = DetectionConfig.balanced()
     detector = AdvancedHallucinationDetector(config)
     
@@ -85,6 +74,10 @@ async def test_balanced_mode_with_context():
         openai_key=OPENAI_API_KEY
     )
     
+    print("\n" + "="*60)
+    print("TEST 3: BALANCED MODE WITH CONTEXT")
+    print("="*60)
+    
     print(f"\n✅ Risk Level: {result['risk_level']}")
     print(f"📊 Risk Probability: {result['risk_probability']}")
     print(f"💡 Explanation: {result['explanation']}")
@@ -110,10 +103,12 @@ async def main():
         return
     
     try:
-        # Run tests
-        await test_fast_mode()
-        await test_with_hallucination()
-        await test_balanced_mode_with_context()
+        # Run tests concurrently; each prints its block once its detection returns
+        await asyncio.gather(
+            test_fast_mode(),
+            test_with_hallucination(),
+            test_balanced_mode_with_context()
+        )
         
         print("\n" + "="*60)
         print("✅ ALL TESTS COMPLETED!")
@@ -2,17 +2,15 @@
 Direct test without proxy - just test advanced detection
 """
 import asyncio
-from openai import AsyncOpenAI
-from dotenv import load_dotenv
 import os
 import sys
 
 # Add current directory to path
 sys.path.insert(0, os.path.dirname(__file__))
 
-from advanced_detection import AdvancedHallucinationDetector
-
-load_dotenv()
+from advanced_detection import AdvancedHallucinationDetector, DetectionConfig
+from _env import OPENAI_API_KEY
+from _runtime import get_openai_client, close_client, run_event_loop
 
 async def test_detection():
     print("\n" + "="*80)
@@ -20,10 +18,11 @@ async def test_detection():
     print("="*80)
     
     # Initialize detector
-    detector = AdvancedHallucinationDetector(mode="balanced")
+    detector = AdvancedHallucinationDetector(DetectionConfig.balanced())
+    openai_key = OPENAI_API_KEY
     
-    # Initialize OpenAI client
-    client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    # Shared OpenAI client
+    client = await get_openai_client()
     
     # Test prompts
     tests = [
@@ -32,30 +31,53 @@ async def test_detection():
         ("How many moons does Earth have?", "Should catch if wrong"),
     ]
     
-    for i, (prompt, expected) in enumerate(tests, 1):
-        print(f"\n{'='*80}")
-        print(f"TEST {i}/{len(tests)}: {expected}")
-        print(f"{'='*80}")
-        print(f"❓ Prompt: {prompt}")
-        
-        # Get response from OpenAI
-        response = await client.chat.completions.create(
+    async def run_case(i, prompt, expected):
+        # The semantic entropy gate only needs the question, so sample it
+        # while the answer streams in
+        entropy_task = asyncio.create_task(detector.entropy_detector.detect(
+            question=prompt,
+            openai_key=openai_key,
             model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7
-        )
+            k=detector.config.entropy_samples
+        ))
         
-        answer = response.choices[0].message.content
-        print(f"\n💬 Answer: {answer}")
+        try:
+            # Get response from OpenAI (cases run concurrently, sharing one client)
+            stream = await client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.7,
+                stream=True
+            )
+            parts = []
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+            answer = "".join(parts)
+            semantic_entropy = await entropy_task
+        finally:
+            # If the completion call or the stream fails, stop the sampling too
+            if not entropy_task.done():
+                entropy_task.cancel()
+            elif not entropy_task.cancelled():
+                entropy_task.exception()
         
         # Run advanced detection
-        print(f"\n🔬 Running advanced detection...")
         detection = await detector.detect(
-            prompt=prompt,
-            response=answer,
-            context=[]
+            question=prompt,
+            answer=answer,
+            context=[],
+            openai_key=openai_key,
+            semantic_entropy=semantic_entropy
         )
         
+        # Print each case in one block once it finishes
+        print(f"\n{'='*80}")
+        print(f"TEST {i}/{len(tests)}: {expected}")
+        print(f"{'='*80}")
+        print(f"❓ Prompt: {prompt}")
+        print(f"\n💬 Answer: {answer}")
+        
         # Display results
         print(f"\n📊 DETECTION RESULTS:")
         print(f"   Risk Level: {detection['risk_level'].upper()}")
@@ -88,9 +110,20 @@ async def test_detection():
             if judge.get('reasoning'):
                 print(f"      Reasoning: {judge['reasoning']}")
     
+    await asyncio.gather(*[
+        run_case(i, prompt, expected)
+        for i, (prompt, expected) in enumerate(tests, 1)
+    ])
+    
     print("\n" + "="*80)
     print("✅ TEST COMPLETE!")
     print("="*80)
 
+async def main():
+    try:
+        await test_detection()
+    finally:
+        await close_client()
+
 if __name__ == "__main__":
-    asyncio.run(test_detection())
+    run_event_loop(main())
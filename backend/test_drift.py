@@ -10,6 +10,7 @@ PROXY_URL = "http://localhost:8000/v1/chat/completions"
 DRIFT_CHECK_URL = "http://localhost:8000/v1/drift/check"
 PROXY_KEY = "llm_obs_SCg21yZUM-rbFE2-mUgBTFoB9ncVDM-xtcXP6fWwd5s"
 MODEL = "gpt-4o-mini"
+CONCURRENCY = 20
 
 
 async def send_request(session, max_tokens, temperature=0.7):
@@ -39,6 +40,23 @@ async def send_request(session, max_tokens, temperature=0.7):
             return False
 
 
+async def send_batch(session, count, max_tokens):
+    """Send `count` requests concurrently, at most CONCURRENCY in flight"""
+    sem = asyncio.Semaphore(CONCURRENCY)
+    done = 0
+    
+    async def bounded():
+        nonlocal done
+        async with sem:
+            result = await send_request(session, max_tokens=max_tokens)
+        done += 1
+        if done % 10 == 0:
+            print(f"Progress: {done}/{count}")
+        return result
+    
+    return await asyncio.gather(*[bounded() for _ in range(count)])
+
+
 async def check_drift(session):
     """Check for drift"""
     headers = {
@@ -66,16 +84,13 @@ async def main():
     print("DRIFT DETECTION TEST")
     print("=" * 60)
     
-    async with aiohttp.ClientSession() as session:
+    connector = aiohttp.TCPConnector(limit=50, keepalive_timeout=60)
+    async with aiohttp.ClientSession(connector=connector) as session:
         # Phase 1: Establish baseline
         print("\n📊 PHASE 1: Establishing Baseline (100 requests, max_tokens=600)")
         print("-" * 60)
         
-        for i in range(100):
-            await send_request(session, max_tokens=600)
-            if (i + 1) % 10 == 0:
-                print(f"Progress: {i + 1}/100")
-            await asyncio.sleep(0.1)
+        await send_batch(session, 100, max_tokens=600)
         
         print("\n✅ Baseline established!")
         
@@ -93,11 +108,7 @@ async def main():
         print("📉 PHASE 2: Creating Drift (100 requests, max_tokens=200)")
         print("-" * 60)
         
-        for i in range(100):
-            await send_request(session, max_tokens=200)
-            if (i + 1) % 10 == 0:
-                print(f"Progress: {i + 1}/100")
-            await asyncio.sleep(0.1)
+        await send_batch(session, 100, max_tokens=200)
         
         print("\n✅ Drift requests sent!")
         
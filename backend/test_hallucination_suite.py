@@ -1,168 +1,165 @@
 """
 Comprehensive Hallucination Detection Test Suite
-Tests 20 different scenarios including known hallucinations
+Tests the scenarios in test_cases.json, including known hallucinations
 """
 
+import argparse
 import asyncio
+import csv
+import hashlib
+import json
 import os
-from dotenv import load_dotenv
+import sys
+import time
+from collections import Counter
+from dataclasses import replace
 from advanced_detection import AdvancedHallucinationDetector, DetectionConfig
+from _env import OPENAI_API_KEY
+from _rate_limit import TokenBucket
+from _runtime import run_event_loop
 
-# Load environment variables
-load_dotenv()
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Detection results are cached on disk per (question, answer, mode, judge model)
+# so repeat runs skip OpenAI entirely. Set DETECTION_CACHE=0 to force fresh runs.
+DETECTION_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".detection_cache.json")
+USE_DETECTION_CACHE = os.getenv("DETECTION_CACHE", "1") != "0"
 
+# Set LOCAL_PRECHECK=1 to let the rule-based precheck settle obvious cases locally
+USE_LOCAL_PRECHECK = os.getenv("LOCAL_PRECHECK", "0") == "1"
 
-# Test cases: (question, answer, expected_risk, description)
-TEST_CASES = [
-    # ===== SAFE RESPONSES (Should pass) =====
-    {
-        "question": "What is the capital of France?",
-        "answer": "Paris is the capital of France.",
-        "expected": "safe",
-        "description": "Simple factual question"
-    },
-    {
-        "question": "What is 2+2?",
-        "answer": "2+2 equals 4.",
-        "expected": "safe",
-        "description": "Basic math"
-    },
-    {
-        "question": "Who wrote Romeo and Juliet?",
-        "answer": "William Shakespeare wrote Romeo and Juliet.",
-        "expected": "safe",
-        "description": "Well-known fact"
-    },
-    {
-        "question": "What is the boiling point of water?",
-        "answer": "Water boils at 100 degrees Celsius at sea level.",
-        "expected": "safe",
-        "description": "Scientific fact"
-    },
-    
-    # ===== OBVIOUS HALLUCINATIONS (Should fail) =====
-    {
-        "question": "What is the population of Mars?",
-        "answer": "Mars has a thriving population of approximately 2.5 million people living in underground colonies as of 2024.",
-        "expected": "high",
-        "description": "Completely fabricated fact"
-    },
-    {
-        "question": "Who was the first president of the United States?",
-        "answer": "Benjamin Franklin was the first president of the United States, serving from 1776 to 1784.",
-        "expected": "high",
-        "description": "Wrong historical fact"
-    },
-    {
-        "question": "What is the capital of Australia?",
-        "answer": "Sydney is the capital of Australia and has been since 1788.",
-        "expected": "high",
-        "description": "Common misconception (it's Canberra)"
-    },
-    {
-        "question": "How many moons does Earth have?",
-        "answer": "Earth has three moons: Luna, Selene, and Artemis.",
-        "expected": "high",
-        "description": "Fabricated moons"
-    },
-    
-    # ===== SUBTLE HALLUCINATIONS (Mixed facts) =====
-    {
-        "question": "Tell me about the Eiffel Tower.",
-        "answer": "The Eiffel Tower in Paris was built in 1889 and stands at 450 meters tall. It was designed by Gustave Eiffel and took 5 years to construct.",
-        "expected": "medium",
-        "description": "Mostly correct but wrong height (actually 330m) and construction time (2 years)"
-    },
-    {
-        "question": "What is Python?",
-        "answer": "Python is a programming language created by Guido van Rossum in 1991. It was named after the British comedy group Monty Python and is known for its simplicity.",
-        "expected": "safe",
-        "description": "Accurate information"
-    },
-    {
-        "question": "When did World War II end?",
-        "answer": "World War II ended in 1945 when Germany surrendered in May and Japan surrendered in August after the atomic bombings.",
-        "expected": "safe",
-        "description": "Correct historical facts"
-    },
-    {
-        "question": "What is the speed of light?",
-        "answer": "The speed of light is approximately 300,000 kilometers per second in a vacuum.",
-        "expected": "safe",
-        "description": "Correct scientific constant"
-    },
-    
-    # ===== STATISTICAL HALLUCINATIONS (Fake numbers) =====
-    {
-        "question": "What is the population of Tokyo?",
-        "answer": "Tokyo has a population of approximately 45 million people in its metropolitan area as of 2024.",
-        "expected": "medium",
-        "description": "Inflated number (actually ~37-38 million)"
-    },
-    {
-        "question": "How tall is Mount Everest?",
-        "answer": "Mount Everest stands at 9,500 meters above sea level, making it the world's tallest mountain.",
-        "expected": "high",
-        "description": "Wrong height (actually 8,849m)"
-    },
-    {
-        "question": "When was the iPhone first released?",
-        "answer": "The first iPhone was released by Apple in June 2007.",
-        "expected": "safe",
-        "description": "Correct date"
-    },
-    
-    # ===== CONTEXT-DEPENDENT HALLUCINATIONS =====
-    {
-        "question": "What is quantum computing?",
-        "answer": "Quantum computing uses quantum bits that can be in superposition, allowing them to process information exponentially faster than classical computers for certain problems.",
-        "expected": "safe",
-        "description": "Accurate technical explanation"
-    },
-    {
-        "question": "What causes seasons on Earth?",
-        "answer": "Seasons are caused by Earth's distance from the Sun changing throughout the year.",
-        "expected": "high",
-        "description": "Common misconception (actually caused by axial tilt)"
-    },
-    {
-        "question": "What is the largest ocean?",
-        "answer": "The Pacific Ocean is the largest ocean, covering about 165 million square kilometers.",
-        "expected": "safe",
-        "description": "Correct geography"
-    },
-    
-    # ===== RECENT EVENTS (Likely to hallucinate) =====
-    {
-        "question": "Who won the 2024 Nobel Prize in Physics?",
-        "answer": "The 2024 Nobel Prize in Physics was awarded to Dr. Sarah Chen for her groundbreaking work on quantum entanglement applications.",
-        "expected": "high",
-        "description": "Fabricated recent event (model won't know 2024 winners)"
-    },
-    {
-        "question": "What is the current world record for the 100m sprint?",
-        "answer": "The current world record is 9.58 seconds, set by Usain Bolt in 2009.",
-        "expected": "safe",
-        "description": "Correct sports record"
-    },
+# Per-case results are written here after each run, for diffing runs
+RESULTS_CSV_PATTERN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "hallucination_results_{}.csv")
+RESULTS_CSV_FIELDS = ["index", "test", "expected", "detected", "probability", "match"]
+
+
+def _write_results_csv(details: list) -> str:
+    path = RESULTS_CSV_PATTERN.format(time.strftime("%Y%m%d_%H%M%S"))
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=RESULTS_CSV_FIELDS)
+        writer.writeheader()
+        writer.writerows(sorted(details, key=lambda d: d["index"]))
+    return path
+
+
+def _load_detection_cache() -> dict:
+    if not USE_DETECTION_CACHE or not os.path.exists(DETECTION_CACHE_PATH):
+        return {}
+    try:
+        with open(DETECTION_CACHE_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_detection_cache(cache: dict):
+    if USE_DETECTION_CACHE:
+        with open(DETECTION_CACHE_PATH, "w") as f:
+            json.dump(cache, f)
+
+
+def _is_degraded(result: dict) -> bool:
+    """True if a detection ran with failed checks (or no entropy samples), so it shouldn't be cached"""
+    if result.get("errors"):
+        return True
+    entropy = result.get("semantic_entropy")
+    return bool(entropy) and entropy.get("num_samples") == 0
+
+
+def _detection_cache_key(config: DetectionConfig, test_case: dict) -> str:
+    parts = [test_case['question'], test_case['answer'], config.mode, config.judge_model]
+    if config.use_local_precheck:
+        parts.append("local_precheck")
+    raw = "|".join(parts)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+# Test cases (question, answer, expected risk, description, category) live in
+# test_cases.json so new scenarios can be added without touching this script
+TEST_CASES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_cases.json")
+with open(TEST_CASES_PATH, encoding="utf-8") as f:
+    TEST_CASES = json.load(f)
+
+
+# Upper bound on concurrent detections, to stay inside OpenAI rate limits
+MAX_CONCURRENT_TESTS = 10
+
+# Detections started per minute; starts are paced by a token bucket that allows
+# bursts of up to MAX_CONCURRENT_TESTS, so short suites never wait
+MAX_DETECTIONS_PER_MINUTE = int(os.getenv("MAX_DETECTIONS_PER_MINUTE", "60"))
+
+
+# Detected risk levels that count as a match for each expected level
+ALLOWED_MATCHES: dict[str, frozenset[str]] = {
+    "safe": frozenset({"safe", "low"}),
+    "medium": frozenset({"low", "medium"}),
+    "high": frozenset({"medium", "high"}),
+}
+
+EXPECTED_COUNTS = Counter(tc['expected'] for tc in TEST_CASES)
+
+# Whole-run results are cached per hash of the test cases, the detector sources
+# and the config, so a rerun with nothing changed just replays the last report
+SUITE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".suite_cache")
+SUITE_SOURCE_PATHS = [
+    TEST_CASES_PATH,
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "hallucination_detector.py"),
 ]
+DETECTOR_SOURCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "advanced_detection")
+
+
+def _suite_cache_path(config: DetectionConfig) -> str:
+    digest = hashlib.sha256(repr(config).encode())
+    detector_sources = sorted(
+        os.path.join(DETECTOR_SOURCE_DIR, name)
+        for name in os.listdir(DETECTOR_SOURCE_DIR) if name.endswith(".py")
+    )
+    for path in SUITE_SOURCE_PATHS + detector_sources:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return os.path.join(SUITE_CACHE_DIR, f"{digest.hexdigest()}.json")
 
 
-async def run_comprehensive_tests():
-    """Run all test cases and generate a report."""
+async def run_comprehensive_tests(force: bool = False):
+    """Run all test cases and generate a report (replayed from cache unless force)."""
     print("\n" + "="*80)
     print("🧪 COMPREHENSIVE HALLUCINATION DETECTION TEST SUITE")
     print("="*80)
     print(f"\nTesting {len(TEST_CASES)} different scenarios...\n")
     
+    # Use balanced mode for comprehensive testing
+    config = DetectionConfig.balanced()
+    if USE_LOCAL_PRECHECK:
+        config = replace(config, use_local_precheck=True)
+    
+    suite_cache_path = _suite_cache_path(config)
+    if not force and USE_DETECTION_CACHE and os.path.exists(suite_cache_path):
+        with open(suite_cache_path) as f:
+            results = json.load(f)
+        print("♻️  Nothing changed since the last run, replaying its results (--force to rerun)")
+        for d in sorted(results['details'], key=lambda d: d['index']):
+            print(f"   {'✅' if d['match'] else '⚠️ '} TEST {d['index']}: {d['test']} "
+                  f"(expected {d['expected']}, got {d['detected']})")
+        _print_summary(results)
+        return
+    
     if not OPENAI_API_KEY:
         print("❌ ERROR: OPENAI_API_KEY not found in environment")
         return
     
-    # Use balanced mode for comprehensive testing
-    config = DetectionConfig.balanced()
-    detector = AdvancedHallucinationDetector(config)
+    cache = _load_detection_cache()
+    
+    # Only load the detector's models when some case isn't cached yet
+    misses = [tc for tc in TEST_CASES if _detection_cache_key(config, tc) not in cache]
+    detector = AdvancedHallucinationDetector(config) if misses else None
+    print(f"💾 {len(TEST_CASES) - len(misses)}/{len(TEST_CASES)} results cached")
+    
+    # Embed every uncached answer in one local batch rather than once per detection
+    answer_embeddings = {}
+    if misses and config.use_self_consistency:
+        answers = list(dict.fromkeys(tc['answer'] for tc in misses))
+        vectors = detector.self_check_detector.embedding_model.encode(
+            answers, batch_size=32, convert_to_numpy=True
+        )
+        answer_embeddings = dict(zip(answers, vectors))
     
     results = {
         "passed": 0,
@@ -171,48 +168,88 @@ async def run_comprehensive_tests():
         "details": []
     }
     
-    for i, test_case in enumerate(TEST_CASES, 1):
-        print(f"\n{'='*80}")
-        print(f"TEST {i}/{len(TEST_CASES)}: {test_case['description']}")
-        print(f"{'='*80}")
-        print(f"❓ Question: {test_case['question']}")
-        print(f"💬 Answer: {test_case['answer'][:100]}{'...' if len(test_case['answer']) > 100 else ''}")
-        print(f"🎯 Expected Risk: {test_case['expected'].upper()}")
-        print()
-        
-        try:
+    # Detections are independent and I/O-bound on OpenAI, so run them all
+    # concurrently (at most MAX_CONCURRENT_TESTS in flight) and report each
+    # case as soon as it finishes
+    sem = asyncio.Semaphore(MAX_CONCURRENT_TESTS)
+    bucket = TokenBucket(MAX_DETECTIONS_PER_MINUTE, MAX_CONCURRENT_TESTS)
+    
+    # Cases repeating a (question, answer) pair share one in-flight detection
+    inflight = {}
+    
+    async def detect_once(key, test_case):
+        async with sem:
+            await bucket.acquire()
             result = await detector.detect(
                 question=test_case['question'],
                 answer=test_case['answer'],
-                openai_key=OPENAI_API_KEY
+                openai_key=OPENAI_API_KEY,
+                precomputed_embeddings=answer_embeddings
             )
+        # Degraded results (e.g. an OpenAI 429 in one check) are used for this
+        # run but not cached, so the next run retries them
+        if not _is_degraded(result):
+            cache[key] = result
+        return result
+    
+    async def run_one(i, test_case):
+        """Detect one case; returns (index, case, result or exception)"""
+        key = _detection_cache_key(config, test_case)
+        if key in cache:
+            return i, test_case, cache[key]
+        if key not in inflight:
+            inflight[key] = asyncio.ensure_future(detect_once(key, test_case))
+        try:
+            result = await inflight[key]
+        except Exception as e:
+            return i, test_case, e
+        return i, test_case, result
+    
+    degraded_cases = 0
+    pending = [run_one(i, test_case) for i, test_case in enumerate(TEST_CASES, 1)]
+    for next_done in asyncio.as_completed(pending):
+        i, test_case, outcome = await next_done
+        # Build the whole block and write it once, so each case is one write
+        out = []
+        emit = out.append
+        
+        emit(f"\n{'='*80}")
+        emit(f"TEST {i}/{len(TEST_CASES)}: {test_case['description']}")
+        emit(f"{'='*80}")
+        emit(f"❓ Question: {test_case['question']}")
+        emit(f"💬 Answer: {test_case['answer'][:100]}{'...' if len(test_case['answer']) > 100 else ''}")
+        emit(f"🎯 Expected Risk: {test_case['expected'].upper()}")
+        emit("")
+        
+        try:
+            if isinstance(outcome, Exception):
+                raise outcome
+            result = outcome
+            if _is_degraded(result):
+                degraded_cases += 1
+                emit(f"⚠️  Degraded run, failed checks: {result.get('errors') or {'semantic_entropy': 'no samples'}}")
             
             detected_risk = result['risk_level']
             risk_prob = result['risk_probability']
             
-            print(f"📊 Detected Risk: {detected_risk.upper()} (probability: {risk_prob:.2f})")
-            print(f"💡 Explanation: {result['explanation']}")
-            print(f"🎯 Action: {result['action']}")
+            emit(f"📊 Detected Risk: {detected_risk.upper()} (probability: {risk_prob:.2f})")
+            emit(f"💡 Explanation: {result['explanation']}")
+            emit(f"🎯 Action: {result['action']}")
             
             # Check if detection matches expectation
-            match = False
-            if test_case['expected'] == 'safe' and detected_risk in ['safe', 'low']:
-                match = True
-            elif test_case['expected'] == 'medium' and detected_risk in ['low', 'medium']:
-                match = True
-            elif test_case['expected'] == 'high' and detected_risk in ['medium', 'high']:
-                match = True
+            match = detected_risk in ALLOWED_MATCHES[test_case['expected']]
             
             if match:
-                print("✅ PASS - Detection matches expectation")
+                emit("✅ PASS - Detection matches expectation")
                 results['passed'] += 1
             else:
-                print(f"⚠️  PARTIAL - Expected {test_case['expected']}, got {detected_risk}")
+                emit(f"⚠️  PARTIAL - Expected {test_case['expected']}, got {detected_risk}")
                 results['passed'] += 0.5
                 results['failed'] += 0.5
             
             # Store details
             results['details'].append({
+                "index": i,
                 "test": test_case['description'],
                 "expected": test_case['expected'],
                 "detected": detected_risk,
@@ -224,20 +261,21 @@ async def run_comprehensive_tests():
             if detected_risk in ['medium', 'high']:
                 if 'semantic_entropy' in result and result['semantic_entropy']:
                     entropy = result['semantic_entropy']['semantic_entropy']
-                    print(f"   🔬 Semantic Entropy: {entropy:.4f}")
+                    emit(f"   🔬 Semantic Entropy: {entropy:.4f}")
                 
                 if 'claims' in result:
                     support_rate = result['claims']['support_rate']
-                    print(f"   📋 Claim Support Rate: {support_rate*100:.0f}%")
+                    emit(f"   📋 Claim Support Rate: {support_rate*100:.0f}%")
                 
                 if 'llm_judge' in result:
                     factuality = result['llm_judge'].get('factuality_score', 'N/A')
-                    print(f"   ⚖️  LLM Judge Score: {factuality}")
+                    emit(f"   ⚖️  LLM Judge Score: {factuality}")
             
         except Exception as e:
-            print(f"❌ ERROR: {e}")
+            emit(f"❌ ERROR: {e}")
             results['failed'] += 1
             results['details'].append({
+                "index": i,
                 "test": test_case['description'],
                 "expected": test_case['expected'],
                 "detected": "error",
@@ -245,10 +283,28 @@ async def run_comprehensive_tests():
                 "match": False
             })
         
-        # Small delay to avoid rate limiting
-        await asyncio.sleep(1)
+        sys.stdout.write("\n".join(out) + "\n")
+        sys.stdout.flush()
+    
+    _save_detection_cache(cache)
+    # Runs with errors or degraded detections aren't replayed, so transient
+    # failures get retried
+    if (USE_DETECTION_CACHE and not degraded_cases
+            and all(d['detected'] != "error" for d in results['details'])):
+        os.makedirs(SUITE_CACHE_DIR, exist_ok=True)
+        with open(suite_cache_path, "w") as f:
+            json.dump(results, f)
     
-    # Print summary
+    _print_summary(results)
+    print(f"\n💾 Results saved to {_write_results_csv(results['details'])}")
+    
+    print("\n" + "="*80)
+    print("✅ TEST SUITE COMPLETE!")
+    print("="*80)
+
+
+def _print_summary(results: dict):
+    """Print the final results and the per-level breakdown."""
     print("\n" + "="*80)
     print("📊 FINAL RESULTS")
     print("="*80)
@@ -259,16 +315,14 @@ async def run_comprehensive_tests():
     
     # Breakdown by expected risk level
     print("\n📋 Breakdown by Expected Risk Level:")
+    matches = Counter(d['expected'] for d in results['details'] if d['match'])
     for risk_level in ['safe', 'medium', 'high']:
-        level_tests = [d for d in results['details'] if d['expected'] == risk_level]
-        if level_tests:
-            matches = sum(1 for d in level_tests if d['match'])
-            print(f"   {risk_level.upper()}: {matches}/{len(level_tests)} correct")
-    
-    print("\n" + "="*80)
-    print("✅ TEST SUITE COMPLETE!")
-    print("="*80)
+        if EXPECTED_COUNTS[risk_level]:
+            print(f"   {risk_level.upper()}: {matches[risk_level]}/{EXPECTED_COUNTS[risk_level]} correct")
 
 
 if __name__ == "__main__":
-    asyncio.run(run_comprehensive_tests())
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--force", action="store_true", help="rerun even if nothing changed since the last run")
+    args = parser.parse_args()
+    run_event_loop(run_comprehensive_tests(force=args.force))
@@ -5,13 +5,14 @@ Sends various prompts to test the detection system
 
 import asyncio
 import httpx
-from dotenv import load_dotenv
-import os
-
-load_dotenv()
+import orjson
+import _env
+from _runtime import get_client, close_client, run_event_loop
+import sys
 
 API_URL = "http://localhost:8000"
-PROXY_KEY = os.getenv("PROXY_KEY", "llm_obs_BJfOcwgECDNBGfZNYjl8_0pqh1f8j_EYURLVYOkNZ0M")
+PROXY_KEY = _env.PROXY_KEY or "llm_obs_BJfOcwgECDNBGfZNYjl8_0pqh1f8j_EYURLVYOkNZ0M"
+MAX_CONCURRENT_REQUESTS = 5
 
 # Test prompts - mix of safe and potentially problematic
 TEST_PROMPTS = [
@@ -39,16 +40,16 @@ async def send_request(prompt: str, session: httpx.AsyncClient):
                 "Authorization": f"Bearer {PROXY_KEY}",
                 "Content-Type": "application/json"
             },
-            json={
+            content=orjson.dumps({
                 "model": "gpt-4o-mini",
                 "messages": [{"role": "user", "content": prompt}],
                 "temperature": 0.7
-            },
+            }),
             timeout=30.0
         )
         
         if response.status_code == 200:
-            return response.json()
+            return orjson.loads(response.content)
         else:
             print(f"❌ Error {response.status_code}: {response.text}")
             return None
@@ -67,69 +68,81 @@ async def main():
     
     results = []
     
-    async with httpx.AsyncClient() as session:
-        for i, prompt in enumerate(TEST_PROMPTS, 1):
-            print(f"\n{'='*80}")
-            print(f"TEST {i}/{len(TEST_PROMPTS)}")
-            print(f"{'='*80}")
-            print(f"❓ Prompt: {prompt}")
+    session = await get_client()
+    # Prompts are independent: send them concurrently (at most
+    # MAX_CONCURRENT_REQUESTS in flight), then report in order
+    sem = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    
+    async def bounded(prompt):
+        async with sem:
+            return await send_request(prompt, session)
+    
+    responses = await asyncio.gather(*[bounded(prompt) for prompt in TEST_PROMPTS])
+    
+    for i, (prompt, result) in enumerate(zip(TEST_PROMPTS, responses), 1):
+        # Build the whole block and write it once, so each case is one write
+        out = []
+        emit = out.append
+        
+        emit(f"\n{'='*80}")
+        emit(f"TEST {i}/{len(TEST_PROMPTS)}")
+        emit(f"{'='*80}")
+        emit(f"❓ Prompt: {prompt}")
+        
+        if result:
+            # Extract response
+            answer = result["choices"][0]["message"]["content"]
+            emit(f"\n💬 Answer: {answer[:150]}{'...' if len(answer) > 150 else ''}")
             
-            result = await send_request(prompt, session)
+            # Check observability
+            obs = result.get("observability", {})
+            adv = obs.get("advanced_detection")
             
-            if result:
-                # Extract response
-                answer = result["choices"][0]["message"]["content"]
-                print(f"\n💬 Answer: {answer[:150]}{'...' if len(answer) > 150 else ''}")
+            if adv:
+                risk_level = adv["risk_level"]
+                risk_prob = adv["risk_probability"]
                 
-                # Check observability
-                obs = result.get("observability", {})
-                adv = obs.get("advanced_detection")
+                # Color code based on risk
+                risk_emoji = {
+                    "safe": "✅",
+                    "low": "🟢",
+                    "medium": "⚠️",
+                    "high": "🚨"
+                }.get(risk_level, "❓")
                 
-                if adv:
-                    risk_level = adv["risk_level"]
-                    risk_prob = adv["risk_probability"]
-                    
-                    # Color code based on risk
-                    risk_emoji = {
-                        "safe": "✅",
-                        "low": "🟢",
-                        "medium": "⚠️",
-                        "high": "🚨"
-                    }.get(risk_level, "❓")
-                    
-                    print(f"\n{risk_emoji} DETECTION RESULT:")
-                    print(f"   Risk Level: {risk_level.upper()}")
-                    print(f"   Probability: {risk_prob:.1%}")
-                    print(f"   Explanation: {adv['explanation']}")
-                    
-                    # Show issues if any
-                    if adv.get("issues_found"):
-                        print(f"   ⚠️  Issues: {', '.join(adv['issues_found'])}")
-                    
-                    # Show claim analysis
-                    if adv.get("claims"):
-                        claims = adv["claims"]
-                        print(f"\n   📋 Claims: {claims['num_claims']} total")
-                        print(f"      ✅ Supported: {claims['num_supported']}")
-                        print(f"      ❌ Contradicted: {claims['num_contradicted']}")
-                        print(f"      ❔ Unverifiable: {claims['num_unverifiable']}")
-                        print(f"      📊 Support Rate: {claims['support_rate']:.0%}")
-                    
-                    results.append({
-                        "prompt": prompt,
-                        "risk_level": risk_level,
-                        "risk_prob": risk_prob
-                    })
-                else:
-                    print(f"\n⚠️  No advanced detection results")
-                    results.append({
-                        "prompt": prompt,
-                        "risk_level": "unknown",
-                        "risk_prob": 0
-                    })
-            
-            # Small delay between requests
-            await asyncio.sleep(0.5)
+                emit(f"\n{risk_emoji} DETECTION RESULT:")
+                emit(f"   Risk Level: {risk_level.upper()}")
+                emit(f"   Probability: {risk_prob:.1%}")
+                emit(f"   Explanation: {adv['explanation']}")
+                
+                # Show issues if any
+                if adv.get("issues_found"):
+                    emit(f"   ⚠️  Issues: {', '.join(adv['issues_found'])}")
+                
+                # Show claim analysis
+                if adv.get("claims"):
+                    claims = adv["claims"]
+                    emit(f"\n   📋 Claims: {claims['num_claims']} total")
+                    emit(f"      ✅ Supported: {claims['num_supported']}")
+                    emit(f"      ❌ Contradicted: {claims['num_contradicted']}")
+                    emit(f"      ❔ Unverifiable: {claims['num_unverifiable']}")
+                    emit(f"      📊 Support Rate: {claims['support_rate']:.0%}")
+                
+                results.append({
+                    "prompt": prompt,
+                    "risk_level": risk_level,
+                    "risk_prob": risk_prob
+                })
+            else:
+                emit(f"\n⚠️  No advanced detection results")
+                results.append({
+                    "prompt": prompt,
+                    "risk_level": "unknown",
+                    "risk_prob": 0
+                })
+        
+        sys.stdout.write("\n".join(out) + "\n")
+        sys.stdout.flush()
     
     # Summary
     print("\n" + "="*80)
@@ -166,9 +179,17 @@ async def main():
     print("\n")
 
 
+async def run():
+    """Run the live test and close the shared client afterwards"""
+    try:
+        await main()
+    finally:
+        await close_client()
+
+
 if __name__ == "__main__":
     print("\n🚀 Starting live detection test...")
     print("⚠️  Make sure backend is running: python main.py")
     print("⚠️  Make sure PROXY_KEY is set in .env\n")
     
-    asyncio.run(main())
+    run_event_loop(run())
@@ -3,17 +3,91 @@ Quick test script to verify platform is working
 Run this after starting the server
 """
 
+import argparse
+import asyncio
+import contextvars
 import httpx
+import io
 import json
+import os
+import shelve
+import sys
+from contextlib import redirect_stdout
 
 BASE_URL = "http://localhost:8000"
+SEPARATOR = "=" * 60
 
-def test_server_running():
+# All tests share one pooled client, so requests reuse keep-alive connections
+CLIENT_TIMEOUT = 10.0
+CLIENT_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=100)
+
+# Static reliability payloads are kept on disk keyed by path with their ETag;
+# reruns send If-None-Match and reuse the stored body on 304 Not Modified
+STATIC_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".static_cache")
+
+# Tests that passed against a server build (its X-Build-SHA, which changes on
+# every restart) are skipped on reruns against that same build
+PASS_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".test_pass_cache.json")
+_server_build = {"sha": None}
+
+
+def _load_pass_cache() -> dict:
+    try:
+        with open(PASS_CACHE_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_pass_cache(cache: dict):
+    try:
+        with open(PASS_CACHE_PATH, "w", encoding="utf-8") as f:
+            json.dump(cache, f)
+    except OSError as e:
+        print(f"⚠️  Could not save test pass cache: {e}")
+
+
+async def _cached_get(client: httpx.AsyncClient, path: str):
+    """GET a static endpoint; returns (status_code, parsed body or None)"""
+    with shelve.open(STATIC_CACHE_PATH) as cache:
+        cached = cache.get(path)
+    headers = {"If-None-Match": cached["etag"]} if cached else {}
+    
+    response = await client.get(path, headers=headers)
+    if response.status_code == 304 and cached:
+        return 200, cached["body"]
+    if response.status_code != 200:
+        return response.status_code, None
+    
+    body = response.json()
+    if response.headers.get("etag"):
+        with shelve.open(STATIC_CACHE_PATH) as cache:
+            cache[path] = {"etag": response.headers["etag"], "body": body}
+    return 200, body
+
+
+class _PerTaskStdout(io.TextIOBase):
+    """Routes each asyncio task's prints to its own buffer, others to stdout"""
+    
+    def __init__(self, stream):
+        self.stream = stream
+        self.buffer = contextvars.ContextVar("test_output", default=None)
+    
+    def write(self, text):
+        return (self.buffer.get() or self.stream).write(text)
+    
+    def flush(self):
+        self.stream.flush()
+
+
+async def test_server_running(client: httpx.AsyncClient):
     """Test if server is running"""
     print("🧪 Testing server connection...")
     try:
-        response = httpx.get(f"{BASE_URL}/docs")
+        # HEAD on the lightweight health route: status only, no Swagger HTML
+        response = await client.head("/health")
         if response.status_code == 200:
+            _server_build["sha"] = response.headers.get("x-build-sha")
             print("✅ Server is running!")
             return True
         else:
@@ -25,17 +99,16 @@ def test_server_running():
         return False
 
 
-def test_prompt_optimization():
+async def test_prompt_optimization(client: httpx.AsyncClient):
     """Test the CORE feature - prompt optimization"""
     print("\n🧪 Testing Prompt Optimization (CORE FEATURE)...")
     
     bad_prompt = "Tell me about AI"
     
     try:
-        response = httpx.post(
-            f"{BASE_URL}/v1/reliability/analyze-prompt",
-            json={"prompt": bad_prompt},
-            timeout=10.0
+        response = await client.post(
+            "/v1/reliability/analyze-prompt",
+            json={"prompt": bad_prompt}
         )
         
         if response.status_code == 200:
@@ -55,81 +128,77 @@ def test_prompt_optimization():
         return False
 
 
-def test_templates():
+async def test_templates(client: httpx.AsyncClient):
     """Test pre-built templates"""
     print("\n🧪 Testing Templates...")
     
     try:
-        response = httpx.get(f"{BASE_URL}/v1/reliability/templates", timeout=10.0)
+        status_code, result = await _cached_get(client, "/v1/reliability/templates")
         
-        if response.status_code == 200:
-            result = response.json()
+        if status_code == 200:
             templates = result.get('templates', [])
             print(f"✅ Templates working! Found {len(templates)} templates:")
             for template in templates:
                 print(f"   - {template['name']}")
             return True
         else:
-            print(f"❌ Failed: {response.status_code}")
+            print(f"❌ Failed: {status_code}")
             return False
     except Exception as e:
         print(f"❌ Error: {e}")
         return False
 
 
-def test_best_practices():
+async def test_best_practices(client: httpx.AsyncClient):
     """Test best practices endpoint"""
     print("\n🧪 Testing Best Practices...")
     
     try:
-        response = httpx.get(f"{BASE_URL}/v1/reliability/best-practices", timeout=10.0)
+        status_code, result = await _cached_get(client, "/v1/reliability/best-practices")
         
-        if response.status_code == 200:
-            result = response.json()
+        if status_code == 200:
             practices = result.get('best_practices', [])
             print(f"✅ Best Practices working! Found {len(practices)} principles")
             return True
         else:
-            print(f"❌ Failed: {response.status_code}")
+            print(f"❌ Failed: {status_code}")
             return False
     except Exception as e:
         print(f"❌ Error: {e}")
         return False
 
 
-def test_hallucination_patterns():
+async def test_hallucination_patterns(client: httpx.AsyncClient):
     """Test hallucination patterns endpoint"""
     print("\n🧪 Testing Hallucination Patterns...")
     
     try:
-        response = httpx.get(f"{BASE_URL}/v1/reliability/hallucination-patterns", timeout=10.0)
+        status_code, result = await _cached_get(client, "/v1/reliability/hallucination-patterns")
         
-        if response.status_code == 200:
-            result = response.json()
+        if status_code == 200:
             patterns = result.get('patterns', [])
             print(f"✅ Hallucination Patterns working! Found {len(patterns)} patterns:")
             for pattern in patterns[:3]:  # Show first 3
                 print(f"   - {pattern['pattern']}")
             return True
         else:
-            print(f"❌ Failed: {response.status_code}")
+            print(f"❌ Failed: {status_code}")
             return False
     except Exception as e:
         print(f"❌ Error: {e}")
         return False
 
 
-def test_response_analysis():
+async def test_response_analysis(client: httpx.AsyncClient):
     """Test response reliability analysis"""
     print("\n🧪 Testing Response Analysis...")
     
     test_response = "Based on the data, revenue increased by 23.7% in Q4. This is supported by the sales report."
     
     try:
-        response = httpx.post(
-            f"{BASE_URL}/v1/reliability/analyze-response",
-            json={"response": test_response},
-            timeout=10.0
+        response = await client.post(
+            "/v1/reliability/analyze-response",
+            json={"response": test_response}
         )
         
         if response.status_code == 200:
@@ -146,7 +215,7 @@ def test_response_analysis():
         return False
 
 
-def test_prompt_comparison():
+async def test_prompt_comparison(client: httpx.AsyncClient):
     """Test prompt A/B comparison"""
     print("\n🧪 Testing Prompt Comparison...")
     
@@ -154,10 +223,9 @@ def test_prompt_comparison():
     prompt_b = "Based on Q4 sales data, list the top 3 performing products with revenue figures"
     
     try:
-        response = httpx.post(
-            f"{BASE_URL}/v1/reliability/compare-prompts",
-            json={"prompt_a": prompt_a, "prompt_b": prompt_b},
-            timeout=10.0
+        response = await client.post(
+            "/v1/reliability/compare-prompts",
+            json={"prompt_a": prompt_a, "prompt_b": prompt_b}
         )
         
         if response.status_code == 200:
@@ -175,11 +243,11 @@ def test_prompt_comparison():
         return False
 
 
-def run_all_tests():
-    """Run all tests"""
-    print("=" * 60)
+async def run_all_tests(force: bool = False):
+    """Run all tests (skipping ones that already passed on this server build unless force)"""
+    print(SEPARATOR)
     print("🚀 LLM Observability Platform - Test Suite")
-    print("=" * 60)
+    print(SEPARATOR)
     
     tests = [
         ("Server Running", test_server_running),
@@ -193,18 +261,47 @@ def run_all_tests():
     
     results = []
     
-    for test_name, test_func in tests:
+    async def run_test(client, test_name, test_func):
         try:
-            result = test_func()
-            results.append((test_name, result))
+            return await test_func(client)
         except Exception as e:
             print(f"❌ {test_name} crashed: {e}")
-            results.append((test_name, False))
+            return False
+    
+    async def run_buffered(client, test_name, test_func):
+        # Capture this test's output so concurrent tests don't interleave
+        # (each gathered task runs in its own context copy)
+        buffer = io.StringIO()
+        stdout.buffer.set(buffer)
+        build = _server_build["sha"]
+        if not force and build and pass_cache.get(test_name) == build:
+            print(f"\n✅ {test_name}: passed on this server build already ({build}), skipped")
+            return True, buffer.getvalue()
+        return await run_test(client, test_name, test_func), buffer.getvalue()
+    
+    async with httpx.AsyncClient(base_url=BASE_URL, timeout=CLIENT_TIMEOUT, limits=CLIENT_LIMITS) as client:
+        # Probe the server first, then run the independent endpoint tests
+        # concurrently and print each one's output in the usual order
+        (first_name, first_func), rest = tests[0], tests[1:]
+        results.append((first_name, await run_test(client, first_name, first_func)))
+        
+        pass_cache = _load_pass_cache()
+        stdout = _PerTaskStdout(sys.stdout)
+        with redirect_stdout(stdout):
+            outcomes = await asyncio.gather(*[run_buffered(client, name, func) for name, func in rest])
+        for (test_name, _), (result, output) in zip(rest, outcomes):
+            sys.stdout.write(output)
+            results.append((test_name, result))
+            if result and _server_build["sha"]:
+                pass_cache[test_name] = _server_build["sha"]
+            else:
+                pass_cache.pop(test_name, None)
+        _save_pass_cache(pass_cache)
     
     # Summary
-    print("\n" + "=" * 60)
+    print("\n" + SEPARATOR)
     print("📊 Test Summary")
-    print("=" * 60)
+    print(SEPARATOR)
     
     passed = sum(1 for _, result in results if result)
     total = len(results)
@@ -230,4 +327,7 @@ def run_all_tests():
 
 
 if __name__ == "__main__":
-    run_all_tests()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--force", action="store_true", help="rerun tests that already passed on this server build")
+    args = parser.parse_args()
+    asyncio.run(run_all_tests(force=args.force))
@@ -1,17 +1,23 @@
 import httpx
 import json
+import sys
 
 # Your proxy key
 PROXY_KEY = "llm_obs_BJfOcwgECDNBGfZNYjl8_0pqh1f8j_EYURLVYOkNZ0M"
 
-print("="*60)
+SEPARATOR = "=" * 60
+
+# One pooled client for all three checks, so they share a keep-alive connection
+client = httpx.Client(base_url="http://localhost:8000")
+
+print(SEPARATOR)
 print("🧪 SIMPLE PROXY TEST")
-print("="*60)
+print(SEPARATOR)
 
 # Test 1: Check if backend is running
 print("\n1️⃣ Testing backend health...")
 try:
-    response = httpx.get("http://localhost:8000/health", timeout=5.0)
+    response = client.get("/health", timeout=5.0)
     print(f"   ✅ Backend is running: {response.json()}")
 except Exception as e:
     print(f"   ❌ Backend not running: {e}")
@@ -20,8 +26,8 @@ except Exception as e:
 # Test 2: Check if proxy key is valid
 print("\n2️⃣ Testing proxy key authentication...")
 try:
-    response = httpx.get(
-        "http://localhost:8000/v1/stats",
+    response = client.get(
+        "/v1/stats",
         headers={"Authorization": f"Bearer {PROXY_KEY}"},
         timeout=5.0
     )
@@ -37,8 +43,8 @@ except Exception as e:
 # Test 3: Make a simple chat request
 print("\n3️⃣ Testing chat completion...")
 try:
-    response = httpx.post(
-        "http://localhost:8000/v1/chat/completions",
+    response = client.post(
+        "/v1/chat/completions",
         headers={
             "Authorization": f"Bearer {PROXY_KEY}",
             "Content-Type": "application/json"
@@ -54,35 +60,43 @@ try:
         timeout=30.0
     )
     
-    print(f"   Status Code: {response.status_code}")
+    # Build the result block and write it once instead of line by line
+    out = []
+    emit = out.append
+    
+    emit(f"   Status Code: {response.status_code}")
     
     if response.status_code == 200:
         result = response.json()
-        print(f"   ✅ Request successful!")
-        print(f"   Run ID: {result.get('run_id')}")
-        print(f"   Response: {result['choices'][0]['message']['content']}")
-        print(f"   Cost: ${result['observability']['cost_usd']}")
-        print(f"   Tokens: {result['usage']['total_tokens']}")
-        print(f"   Flags: {len(result['observability']['flags'])} detected")
+        emit(f"   ✅ Request successful!")
+        emit(f"   Run ID: {result.get('run_id')}")
+        emit(f"   Response: {result['choices'][0]['message']['content']}")
+        emit(f"   Cost: ${result['observability']['cost_usd']}")
+        emit(f"   Tokens: {result['usage']['total_tokens']}")
+        emit(f"   Flags: {len(result['observability']['flags'])} detected")
     else:
-        print(f"   ❌ Request failed: {response.status_code}")
-        print(f"   Response: {response.text}")
+        emit(f"   ❌ Request failed: {response.status_code}")
+        emit(f"   Response: {response.text}")
         
         # Try to get more details
         if response.status_code == 500:
-            print("\n   🔍 This is an Internal Server Error.")
-            print("   Possible causes:")
-            print("   1. Invalid OpenAI API key in database")
-            print("   2. OpenAI API is down")
-            print("   3. Database connection issue")
-            print("   4. Missing environment variables")
-            
+            emit("\n   🔍 This is an Internal Server Error.")
+            emit("   Possible causes:")
+            emit("   1. Invalid OpenAI API key in database")
+            emit("   2. OpenAI API is down")
+            emit("   3. Database connection issue")
+            emit("   4. Missing environment variables")
+    
+    sys.stdout.write("\n".join(out) + "\n")
+    
 except Exception as e:
     print(f"   ❌ Exception: {e}")
 
-print("\n" + "="*60)
+client.close()
+
+print("\n" + SEPARATOR)
 print("🎯 NEXT STEPS:")
-print("="*60)
+print(SEPARATOR)
 
 print("""
 If you see 500 errors, check:
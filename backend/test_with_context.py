@@ -5,11 +5,9 @@ This version provides ground truth context to improve detection accuracy
 
 import asyncio
 import os
-from dotenv import load_dotenv
 from advanced_detection import AdvancedHallucinationDetector, DetectionConfig
-
-load_dotenv()
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+from _env import OPENAI_API_KEY
+from _rate_limit import TokenBucket
 
 
 # Test cases with context for verification
@@ -141,11 +139,20 @@ TEST_CASES = [
 ]
 
 
+SEPARATOR = "=" * 80
+
+# Upper bound on concurrent detections, to stay inside OpenAI rate limits
+MAX_CONCURRENT_TESTS = 5
+
+# Detections started per minute (token bucket, bursts of MAX_CONCURRENT_TESTS)
+MAX_DETECTIONS_PER_MINUTE = int(os.getenv("MAX_DETECTIONS_PER_MINUTE", "120"))
+
+
 async def run_context_tests():
     """Run tests with context for better detection."""
-    print("\n" + "="*80)
+    print("\n" + SEPARATOR)
     print("🧪 CONTEXT-BASED HALLUCINATION DETECTION TEST")
-    print("="*80)
+    print(SEPARATOR)
     print(f"\nTesting {len(TEST_CASES)} scenarios with ground truth context...\n")
     
     if not OPENAI_API_KEY:
@@ -157,10 +164,30 @@ async def run_context_tests():
     
     results = {"passed": 0, "failed": 0, "total": len(TEST_CASES)}
     
-    for i, test in enumerate(TEST_CASES, 1):
-        print(f"\n{'='*80}")
+    # Detections are independent, so run them concurrently (at most
+    # MAX_CONCURRENT_TESTS in flight) and report in order below
+    sem = asyncio.Semaphore(MAX_CONCURRENT_TESTS)
+    bucket = TokenBucket(MAX_DETECTIONS_PER_MINUTE, MAX_CONCURRENT_TESTS)
+    
+    async def run_one(test):
+        async with sem:
+            await bucket.acquire()
+            return await detector.detect(
+                question=test['question'],
+                answer=test['answer'],
+                context=test['context'],  # Provide ground truth
+                openai_key=OPENAI_API_KEY
+            )
+    
+    outcomes = await asyncio.gather(
+        *[run_one(test) for test in TEST_CASES],
+        return_exceptions=True
+    )
+    
+    for i, (test, outcome) in enumerate(zip(TEST_CASES, outcomes), 1):
+        print("\n" + SEPARATOR)
         print(f"TEST {i}/{len(TEST_CASES)}: {test['description']}")
-        print(f"{'='*80}")
+        print(SEPARATOR)
         print(f"❓ Question: {test['question']}")
         print(f"💬 Answer: {test['answer'][:80]}{'...' if len(test['answer']) > 80 else ''}")
         print(f"📚 Context: {len(test['context'])} reference documents")
@@ -168,12 +195,9 @@ async def run_context_tests():
         print()
         
         try:
-            result = await detector.detect(
-                question=test['question'],
-                answer=test['answer'],
-                context=test['context'],  # Provide ground truth
-                openai_key=OPENAI_API_KEY
-            )
+            if isinstance(outcome, Exception):
+                raise outcome
+            result = outcome
             
             risk = result['risk_level']
             prob = result['risk_probability']
@@ -218,18 +242,16 @@ async def run_context_tests():
         except Exception as e:
             print(f"\n❌ ERROR: {e}")
             results['failed'] += 1
-        
-        await asyncio.sleep(0.5)
     
     # Summary
-    print("\n" + "="*80)
+    print("\n" + SEPARATOR)
     print("📊 FINAL RESULTS")
-    print("="*80)
+    print(SEPARATOR)
     print(f"Total: {results['total']}")
     print(f"✅ Passed: {results['passed']}")
     print(f"❌ Failed: {results['failed']}")
     print(f"📈 Accuracy: {(results['passed']/results['total'])*100:.1f}%")
-    print("="*80)
+    print(SEPARATOR)
 
 
 if __name__ == "__main__":
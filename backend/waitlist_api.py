@@ -1,59 +1,158 @@
 """Waitlist API for landing page"""
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, BackgroundTasks
 from pydantic import BaseModel
-from database import supabase
-from datetime import datetime
-import re
+from email_validator import validate_email, EmailNotValidError
+from database import supabase, supabase_rest
+from typing import List, Optional
+import asyncio
+import httpx
+import time
 
 router = APIRouter(prefix="/api", tags=["waitlist"])
 
+# The public count is served from memory for WAITLIST_COUNT_TTL seconds; new
+# signups bump the cached value so the counter still moves immediately
+# (per process - each worker keeps its own copy)
+WAITLIST_COUNT_TTL = 30.0
+_count_cache = {"value": 0, "expires": 0.0}
+
+# Signups are buffered and written in one bulk insert every 100ms or 500
+# emails, whichever comes first, so a burst costs a handful of round-trips
+WAITLIST_BATCH_INTERVAL_SECONDS = 0.1
+WAITLIST_BATCH_MAX_ROWS = 500
+WAITLIST_QUEUE_MAX_SIZE = 10_000
+
+# Signups were already acknowledged with 202, so failed inserts are retried
+# with exponential backoff (0.5s, 1s, ...) before being given up on; a batch
+# that still fails is split into single-row inserts so one bad row (or a
+# partial outage) doesn't drop everyone else in it
+WAITLIST_INSERT_ATTEMPTS = 3
+WAITLIST_RETRY_BASE_SECONDS = 0.5
+
+_waitlist_queue: Optional[asyncio.Queue] = None
+_waitlist_writer_task: Optional[asyncio.Task] = None
+
 
 class WaitlistRequest(BaseModel):
     email: str
 
 
-@router.post("/waitlist")
-async def join_waitlist(request: WaitlistRequest):
+async def _insert_waitlist_rows(emails: List[str]) -> int:
+    """Insert signups via PostgREST in one request; returns the number of new rows"""
+    # Insert into waitlist table (created_at defaults to now() in Postgres);
+    # existing emails are skipped by ON CONFLICT DO NOTHING and only the
+    # rows actually inserted come back
+    response = await supabase_rest.post(
+        "/waitlist",
+        params={"on_conflict": "email", "select": "id"},
+        headers={"Prefer": "resolution=ignore-duplicates,return=representation"},
+        json=[{"email": email, "status": "pending"} for email in dict.fromkeys(emails)]
+    )
+    response.raise_for_status()
+    return len(response.json())
+
+
+async def _add_to_waitlist(emails: List[str], attempts: int = WAITLIST_INSERT_ATTEMPTS):
+    """Store signups, retrying transient failures and isolating rows a batch insert can't take"""
+    error = None
+    for attempt in range(attempts):
+        try:
+            _count_cache["value"] += await _insert_waitlist_rows(emails)
+            return
+        except httpx.HTTPStatusError as e:
+            error = e
+            # Rejected data (4xx other than 429) fails the same way on a retry
+            if e.response.status_code < 500 and e.response.status_code != 429:
+                break
+        except Exception as e:
+            error = e
+        if attempt < attempts - 1:
+            await asyncio.sleep(WAITLIST_RETRY_BASE_SECONDS * 2 ** attempt)
+    
+    if len(emails) == 1:
+        print(f"❌ Waitlist signup for {emails[0]} dropped: {error}")
+        return
+    
+    print(f"⚠️ Waitlist batch of {len(emails)} signups failed ({error}), inserting them one by one")
+    for email in emails:
+        await _add_to_waitlist([email], attempts=2)
+
+
+async def _waitlist_writer_loop(queue: asyncio.Queue):
+    """Drain queued signups and flush them every WAITLIST_BATCH_INTERVAL_SECONDS or WAITLIST_BATCH_MAX_ROWS"""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await queue.get()]
+        deadline = loop.time() + WAITLIST_BATCH_INTERVAL_SECONDS
+        while len(batch) < WAITLIST_BATCH_MAX_ROWS:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        
+        try:
+            await _add_to_waitlist(batch)
+        finally:
+            for _ in batch:
+                queue.task_done()
+
+
+def start_waitlist_writer() -> asyncio.Queue:
+    """Start the background writer; join_waitlist enqueues from then on"""
+    global _waitlist_queue, _waitlist_writer_task
+    if _waitlist_queue is None:
+        _waitlist_queue = asyncio.Queue(maxsize=WAITLIST_QUEUE_MAX_SIZE)
+        _waitlist_writer_task = asyncio.create_task(_waitlist_writer_loop(_waitlist_queue))
+    return _waitlist_queue
+
+
+async def stop_waitlist_writer():
+    """Flush everything still queued, then stop the background writer"""
+    global _waitlist_queue, _waitlist_writer_task
+    if _waitlist_queue is None:
+        return
+    await _waitlist_queue.join()
+    _waitlist_writer_task.cancel()
+    try:
+        await _waitlist_writer_task
+    except asyncio.CancelledError:
+        pass
+    _waitlist_queue = None
+    _waitlist_writer_task = None
+
+
+@router.post("/waitlist", status_code=202)
+async def join_waitlist(request: WaitlistRequest, background_tasks: BackgroundTasks):
     """
     Add email to waitlist
     Public endpoint - no authentication required
     """
+    # Syntax-only validation (no DNS lookup); the normalized address is also
+    # lowercased so it matches the existing rows under the unique email index
     try:
-        email = request.email.lower().strip()
-        
-        # Basic email validation
-        email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        if not re.match(email_pattern, email):
-            raise HTTPException(status_code=400, detail="Invalid email address")
-        
-        # Insert into waitlist table
-        result = supabase.table("waitlist").insert({
-            "email": email,
-            "created_at": datetime.utcnow().isoformat(),
-            "status": "pending"
-        }).execute()
-        
-        return {
-            "success": True,
-            "message": "Successfully joined waitlist",
-            "email": email
-        }
-        
-    except Exception as e:
-        # Check if email already exists (unique constraint violation)
-        if "duplicate key" in str(e).lower() or "23505" in str(e):
-            return {
-                "success": True,
-                "message": "Email already on waitlist",
-                "email": email
-            }
-        
-        print(f"Waitlist error: {e}")
-        raise HTTPException(
-            status_code=500,
-            detail="Failed to join waitlist. Please try again."
-        )
+        email = validate_email(
+            request.email.strip(),
+            check_deliverability=False
+        ).normalized.lower()
+    except EmailNotValidError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Hand the signup to the batch writer; without it (or when its queue is
+    # full) store it on its own after the response is sent
+    if _waitlist_queue is not None and not _waitlist_queue.full():
+        _waitlist_queue.put_nowait(email)
+    else:
+        background_tasks.add_task(_add_to_waitlist, [email])
+    
+    return {
+        "success": True,
+        "message": "Queued",
+        "email": email
+    }
 
 
 @router.get("/waitlist/count")
@@ -62,10 +161,16 @@ async def get_waitlist_count():
     Get total number of people on waitlist
     Public endpoint for social proof
     """
+    now = time.monotonic()
+    if now < _count_cache["expires"]:
+        return {"count": _count_cache["value"]}
+    
     try:
         result = supabase.table("waitlist").select("id", count="exact").execute()
+        _count_cache["value"] = result.count or 0
+        _count_cache["expires"] = now + WAITLIST_COUNT_TTL
         return {
-            "count": result.count or 0
+            "count": _count_cache["value"]
         }
     except Exception as e:
         print(f"Error getting waitlist count: {e}")